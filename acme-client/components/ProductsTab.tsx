@@ -44,7 +44,7 @@ export default function ProductsTab({ showToast }: ProductsTabProps) {
     }
   };
 
-  const handleDelete = async (id: number) => {
+  const handleDelete = async (id: string) => {
     if (!confirm('Are you sure you want to delete this product?')) return;
 
     try {
@@ -62,13 +62,34 @@ export default function ProductsTab({ showToast }: ProductsTabProps) {
 
     try {
       const response = await productsApi.bulkDelete();
-      showToast(`Successfully deleted ${response.data.count} products`, 'success');
-      loadProducts();
+      showToast(`Deleting about ${response.data.count} products in the background`, 'success');
+      pollBulkDelete(response.data.task_id);
     } catch (error) {
       showToast('Error deleting products', 'error');
     }
   };
 
+  const pollBulkDelete = (taskId: string) => {
+    const interval = setInterval(async () => {
+      try {
+        const response = await productsApi.getBulkDeleteStatus(taskId);
+        const data = response.data;
+
+        if (data.status === 'completed') {
+          clearInterval(interval);
+          showToast(`Successfully deleted ${data.current} products`, 'success');
+          loadProducts();
+        } else if (data.status === 'failed') {
+          clearInterval(interval);
+          showToast(`Bulk delete failed: ${data.message}`, 'error');
+          loadProducts();
+        }
+      } catch (error) {
+        console.error('Error polling bulk delete:', error);
+      }
+    }, 1000);
+  };
+
   const handleEdit = (product: Product) => {
     setEditingProduct(product);
     setShowModal(true);
@@ -3,6 +3,9 @@
 import { useState, useRef } from 'react';
 import { uploadApi } from '@/lib/api';
 
+// File types the import accepts, matched on the file name
+const IMPORT_EXTENSIONS = ['.csv', '.csv.gz', '.csv.zst', '.parquet', '.ndjson', '.jsonl'];
+
 interface UploadTabProps {
   showToast: (message: string, type: string) => void;
 }
@@ -23,8 +26,8 @@ export default function UploadTab({ showToast }: UploadTabProps) {
   };
 
   const handleFile = async (file: File) => {
-    if (!file.name.endsWith('.csv')) {
-      showToast('Please select a CSV file', 'error');
+    if (!IMPORT_EXTENSIONS.some((ext) => file.name.toLowerCase().endsWith(ext))) {
+      showToast('Please select a CSV, compressed CSV, Parquet or NDJSON file', 'error');
       return;
     }
 
@@ -37,36 +40,65 @@ export default function UploadTab({ showToast }: UploadTabProps) {
       const uploadTaskId = response.data.task_id;
       setTaskId(uploadTaskId);
       showToast('Upload started successfully', 'success');
-      startProgressPolling(uploadTaskId);
+      startProgressStream(uploadTaskId);
     } catch (error) {
       showToast('Error uploading file', 'error');
       resetUpload();
     }
   };
 
+  const showProgress = (data: any) => {
+    setProgress(data.percentage);
+    setStatus(data.status);
+    
+    if (data.total > 0) {
+      setDetails(`Processed ${data.current.toLocaleString()} of ${data.total.toLocaleString()} rows`);
+    } else {
+      setDetails(data.message || 'Processing...');
+    }
+
+    if (data.status === 'completed') {
+      if (data.rejected_rows > 0) {
+        showToast(`Import completed, ${data.rejected_rows.toLocaleString()} rows were rejected`, 'info');
+      } else {
+        showToast('Import completed successfully!', 'success');
+      }
+      setTimeout(resetUpload, 3000);
+      return true;
+    } else if (data.status === 'failed') {
+      showToast(`Import failed: ${data.message}`, 'error');
+      setTimeout(resetUpload, 5000);
+      return true;
+    }
+    return false;
+  };
+
+  const startProgressStream = (uploadTaskId: string) => {
+    // Progress is pushed by the server; fall back to polling if the stream breaks
+    const source = new EventSource(uploadApi.progressUrl(uploadTaskId));
+    let finished = false;
+
+    source.onmessage = (event) => {
+      finished = showProgress(JSON.parse(event.data));
+      if (finished) {
+        source.close();
+      }
+    };
+
+    source.onerror = () => {
+      source.close();
+      if (!finished) {
+        startProgressPolling(uploadTaskId);
+      }
+    };
+  };
+
   const startProgressPolling = (uploadTaskId: string) => {
     const interval = setInterval(async () => {
       try {
         const response = await uploadApi.getStatus(uploadTaskId);
-        const data = response.data;
-
-        setProgress(data.percentage);
-        setStatus(data.status);
-        
-        if (data.total > 0) {
-          setDetails(`Processed ${data.current.toLocaleString()} of ${data.total.toLocaleString()} rows`);
-        } else {
-          setDetails(data.message || 'Processing...');
-        }
-
-        if (data.status === 'completed') {
-          clearInterval(interval);
-          showToast('Import completed successfully!', 'success');
-          setTimeout(resetUpload, 3000);
-        } else if (data.status === 'failed') {
+        if (showProgress(response.data)) {
           clearInterval(interval);
-          showToast(`Import failed: ${data.message}`, 'error');
-          setTimeout(resetUpload, 5000);
         }
       } catch (error) {
         console.error('Error polling progress:', error);
@@ -114,12 +146,12 @@ export default function UploadTab({ showToast }: UploadTabProps) {
             <div className="upload-icon">📁</div>
             <p>Drag and drop your CSV file here, or click to browse</p>
             <p style={{ color: '#6c757d', margin: '10px 0 20px' }}>
-              Supports CSV files up to 500,000 records
+              Supports CSV (also .csv.gz / .csv.zst), Parquet and NDJSON files
             </p>
             <input
               ref={fileInputRef}
               type="file"
-              accept=".csv"
+              accept={IMPORT_EXTENSIONS.join(',')}
               onChange={handleFileSelect}
               style={{ display: 'none' }}
             />
@@ -144,7 +176,7 @@ export default function UploadTab({ showToast }: UploadTabProps) {
 
         <div style={{ marginTop: '30px', padding: '20px', background: '#e7f3ff', borderLeft: '4px solid #667eea', borderRadius: '6px' }}>
           <h3 style={{ marginBottom: '10px', color: '#333' }}>CSV Format Requirements</h3>
-          <p>Your CSV file should contain the following columns:</p>
+          <p>Your file should contain the following columns (fields for NDJSON):</p>
           <ul style={{ margin: '10px 0 10px 20px' }}>
             <li><strong>sku</strong> - Unique product identifier (case-insensitive)</li>
             <li><strong>name</strong> - Product name</li>
@@ -31,7 +31,7 @@ export default function WebhooksTab({ showToast }: WebhooksTabProps) {
     }
   };
 
-  const handleDelete = async (id: number) => {
+  const handleDelete = async (id: string) => {
     if (!confirm('Are you sure you want to delete this webhook?')) return;
 
     try {
@@ -43,7 +43,7 @@ export default function WebhooksTab({ showToast }: WebhooksTabProps) {
     }
   };
 
-  const handleTest = async (id: number) => {
+  const handleTest = async (id: string) => {
     try {
       const response = await webhooksApi.test(id);
       const result = response.data;
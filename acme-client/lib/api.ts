@@ -12,11 +12,12 @@ export const api = axios.create({
 // Products API
 export const productsApi = {
   getAll: (params: any) => api.get('/api/products', { params }),
-  getById: (id: number) => api.get(`/api/products/${id}`),
+  getById: (id: string) => api.get(`/api/products/${id}`),
   create: (data: any) => api.post('/api/products', data),
-  update: (id: number, data: any) => api.put(`/api/products/${id}`, data),
-  delete: (id: number) => api.delete(`/api/products/${id}`),
-  bulkDelete: () => api.delete('/api/products'),
+  update: (id: string, data: any) => api.put(`/api/products/${id}`, data),
+  delete: (id: string) => api.delete(`/api/products/${id}`),
+  bulkDelete: (params?: any) => api.delete('/api/products', { params }),
+  getBulkDeleteStatus: (taskId: string) => api.get(`/api/products/bulk-delete/status/${taskId}`),
   exportToExcel: (params: any) => api.get('/api/products/export/excel', { 
     params,
     responseType: 'blob'
@@ -35,15 +36,16 @@ export const uploadApi = {
     });
   },
   getStatus: (taskId: string) => api.get(`/api/upload/status/${taskId}`),
+  progressUrl: (taskId: string) => `${API_URL}/api/upload/progress/${taskId}`,
 };
 
 // Webhooks API
 export const webhooksApi = {
   getAll: () => api.get('/api/webhooks'),
   create: (data: any) => api.post('/api/webhooks', data),
-  update: (id: number, data: any) => api.put(`/api/webhooks/${id}`, data),
-  delete: (id: number) => api.delete(`/api/webhooks/${id}`),
-  test: (id: number) => api.post(`/api/webhooks/${id}/test`),
+  update: (id: string, data: any) => api.put(`/api/webhooks/${id}`, data),
+  delete: (id: string) => api.delete(`/api/webhooks/${id}`),
+  test: (id: string) => api.post(`/api/webhooks/${id}/test`),
 };
 
 export default api;
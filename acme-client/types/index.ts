@@ -1,5 +1,5 @@
 export interface Product {
-  id: number;
+  id: string;
   sku: string;
   name: string;
   description?: string;
@@ -18,7 +18,7 @@ export interface ProductCreate {
 }
 
 export interface Webhook {
-  id: number;
+  id: string;
   url: string;
   event_type: string;
   enabled: boolean;
@@ -28,12 +28,14 @@ export interface Webhook {
 }
 
 export interface UploadTask {
-  id: number;
+  id: string;
   task_id: string;
   filename: string;
   status: string;
   total_rows: number;
   processed_rows: number;
+  total_bytes?: number;
+  processed_bytes?: number;
   error_message?: string;
   created_at: string;
 }
@@ -43,6 +45,8 @@ export interface TaskStatus {
   current: number;
   total: number;
   percentage: number;
+  bytes_processed?: number;
+  bytes_total?: number;
   message?: string;
 }
 
@@ -0,0 +1,177 @@
+"""
+Set-based batch writes for the product API
+
+A batch is validated item by item in one pass, then applied with a single
+statement per operation: items travel as one JSONB parameter that
+jsonb_to_recordset expands server-side. Items are keyed on lower(sku),
+matching the case-insensitive unique SKU index, and the last item wins
+when a batch repeats a SKU. An update sets only the fields an item
+carries, so description and price can be cleared with an explicit null;
+null for the required name or active leaves them as they are.
+"""
+import json
+from typing import Any, Dict, List, Tuple
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from schemas import ProductCreate, ProductBatchUpdate, ProductBatchDelete
+
+BATCH_OPERATIONS = ("create", "upsert", "update", "delete")
+
+ITEM_SCHEMAS = {
+    "create": ProductCreate,
+    "upsert": ProductCreate,
+    "update": ProductBatchUpdate,
+    "delete": ProductBatchDelete,
+}
+
+ITEMS = """
+    jsonb_to_recordset(CAST(:items AS jsonb))
+        AS i(sku text, name text, description text, price double precision, active boolean)
+"""
+
+CREATE_SQL = f"""
+    INSERT INTO products (id, sku, name, description, price, active)
+    SELECT gen_random_uuid(), i.sku, i.name, i.description, i.price, i.active
+    FROM {ITEMS}
+    ORDER BY lower(i.sku)
+    ON CONFLICT DO NOTHING
+    RETURNING lower(sku), true
+"""
+
+UPSERT_SQL = f"""
+    INSERT INTO products (id, sku, name, description, price, active)
+    SELECT gen_random_uuid(), i.sku, i.name, i.description, i.price, i.active
+    FROM {ITEMS}
+    ORDER BY lower(i.sku)
+    ON CONFLICT ((lower(sku))) DO UPDATE SET
+        name = EXCLUDED.name,
+        description = EXCLUDED.description,
+        price = EXCLUDED.price,
+        active = EXCLUDED.active,
+        updated_at = now()
+    RETURNING lower(sku), xmax = 0
+"""
+
+UPDATE_SQL = """
+    UPDATE products AS p SET
+        name = coalesce(i.name, p.name),
+        description = CASE WHEN e.item ? 'description' THEN i.description ELSE p.description END,
+        price = CASE WHEN e.item ? 'price' THEN i.price ELSE p.price END,
+        active = coalesce(i.active, p.active),
+        updated_at = now()
+    FROM jsonb_array_elements(CAST(:items AS jsonb)) AS e(item),
+        jsonb_to_record(e.item)
+            AS i(sku text, name text, description text, price double precision, active boolean)
+    WHERE lower(p.sku) = lower(i.sku)
+    RETURNING lower(p.sku), false
+"""
+
+DELETE_SQL = """
+    DELETE FROM products
+    WHERE lower(sku) = ANY(:keys)
+    RETURNING lower(sku), false
+"""
+
+# Status of an item whose key the statement did not return
+MISSED = {
+    "create": ("failed", "SKU already exists"),
+    "update": ("failed", "Product not found"),
+    "delete": ("failed", "Product not found"),
+}
+
+
+def parse_batch_body(body: bytes, ndjson: bool) -> List[Any]:
+    """Decode a JSON array or NDJSON body into raw items; raises ValueError if it is malformed"""
+    if not ndjson:
+        items = json.loads(body)
+        if not isinstance(items, list):
+            raise ValueError("Expected a JSON array of products")
+        return items
+
+    items = []
+    for line_number, line in enumerate(body.splitlines(), 1):
+        if not line.strip():
+            continue
+        try:
+            items.append(json.loads(line))
+        except ValueError as e:
+            raise ValueError(f"Line {line_number}: {e}") from e
+    return items
+
+
+def _error(e: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in err['loc']) or 'item'}: {err['msg']}" for err in e.errors())
+
+
+def validate_batch(operation: str, raw_items: List[Any]) -> Tuple[Dict[str, Tuple[int, BaseModel]], List[Dict[str, Any]]]:
+    """
+    Validate every item of a batch, with SKUs stripped before validation
+
+    Returns ({lower(sku): (index, item)} of the items to apply, per-item
+    results). Results of invalid or superseded items are filled in here;
+    the others are completed by apply_batch.
+    """
+    schema = ITEM_SCHEMAS[operation]
+    results = []
+    valid = {}
+
+    for index, raw in enumerate(raw_items):
+        if isinstance(raw, dict) and isinstance(raw.get("sku"), str):
+            raw = {**raw, "sku": raw["sku"].strip()}
+        try:
+            item = schema.model_validate(raw)
+        except ValidationError as e:
+            sku = raw.get("sku") if isinstance(raw, dict) else None
+            results.append({"index": index, "sku": sku, "status": "invalid", "error": _error(e)})
+            continue
+
+        results.append({"index": index, "sku": item.sku, "status": None, "error": None})
+
+        key = item.sku.lower()
+        if key in valid:
+            earlier = results[valid[key][0]]
+            earlier["status"] = "skipped"
+            earlier["error"] = f"Superseded by item {index} with the same SKU"
+        valid[key] = (index, item)
+
+    return valid, results
+
+
+def apply_batch(
+    db: Session,
+    operation: str,
+    valid: Dict[str, Tuple[int, BaseModel]],
+    results: List[Dict[str, Any]]
+) -> Dict[str, int]:
+    """
+    Apply validated items with one statement and fill in their results
+
+    Does not commit. Returns counts of created, updated and deleted products.
+    """
+    counts = {"created": 0, "updated": 0, "deleted": 0}
+    if not valid:
+        return counts
+
+    if operation == "delete":
+        rows = db.execute(text(DELETE_SQL), {"keys": list(valid)}).all()
+    else:
+        items = [item.model_dump(exclude_unset=operation == "update") for _, item in valid.values()]
+        sql = {"create": CREATE_SQL, "upsert": UPSERT_SQL, "update": UPDATE_SQL}[operation]
+        rows = db.execute(text(sql), {"items": json.dumps(items)}).all()
+
+    applied = {key: inserted for key, inserted in rows}
+    for key, (index, _) in valid.items():
+        result = results[index]
+        if key not in applied:
+            result["status"], result["error"] = MISSED[operation]
+        elif operation == "delete":
+            result["status"] = "deleted"
+        else:
+            result["status"] = "created" if applied[key] else "updated"
+        if result["status"] in counts:
+            counts[result["status"]] += 1
+
+    return counts
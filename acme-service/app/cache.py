@@ -0,0 +1,209 @@
+"""
+Read-through cache for product detail and list responses
+
+Responses are cached as JSON-ready dicts under keys that embed a cache
+generation kept in Redis. Every commit that bumps the catalog version
+(product writes, batch writes, bulk delete batches, committed import
+blocks) increments the generation through the hook in app/catalog.py, so
+all processes stop reading older entries; those simply age out. Each
+process rereads the generation at most every product_cache_generation_ttl
+seconds (its own invalidations apply at once), so with the memory backend
+a cache hit makes no network call, and other processes see a write within
+that interval.
+
+Async handlers use lookup_async/store_async, which run the calls that need
+Redis in the threadpool instead of blocking the event loop.
+
+Backends:
+- memory: a per-process LRU with a TTL, bounded by entry count
+- redis: shared by all API processes, entries expire with the TTL
+- none: caching disabled
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import redis
+from fastapi.concurrency import run_in_threadpool
+
+from config import settings
+from dependencies.redis_client import redis_client
+
+GENERATION_KEY = "products:cache:generation"
+KEY_PREFIX = "products:cache"
+
+CACHE_KINDS = ("detail", "list")
+
+
+class LRUBackend:
+    """Bounded in-process LRU; entries carry their own expiry"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class RedisBackend:
+    """Entries shared by every process, stored as JSON with a TTL"""
+
+    def __init__(self, client: redis.Redis):
+        self.client = client
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self.client.get(key)
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        self.client.set(key, json.dumps(value), px=int(ttl * 1000))
+
+    def size(self) -> Optional[int]:
+        return None
+
+
+class ProductCache:
+    def __init__(self, backend, ttl: float, generation_ttl: float = settings.product_cache_generation_ttl):
+        self.backend = backend  # None disables caching
+        self.ttl = ttl
+        self.generation_ttl = generation_ttl
+        self._lock = threading.Lock()
+        self._stats = {kind: {"hits": 0, "misses": 0, "errors": 0} for kind in CACHE_KINDS}
+        self._invalidations = 0
+        self._generation = 0
+        self._generation_expires_at = 0.0
+
+    def _count(self, kind: str, outcome: str) -> None:
+        with self._lock:
+            self._stats[kind][outcome] += 1
+
+    def _generation_is_fresh(self) -> bool:
+        return time.monotonic() < self._generation_expires_at
+
+    def _set_generation(self, generation: int) -> None:
+        with self._lock:
+            self._generation = generation
+            self._generation_expires_at = time.monotonic() + self.generation_ttl
+
+    def _current_generation(self) -> int:
+        if not self._generation_is_fresh():
+            self._set_generation(int(redis_client.get(GENERATION_KEY) or 0))
+        return self._generation
+
+    def _key(self, kind: str, params: Dict[str, Any]) -> str:
+        generation = self._current_generation()
+        digest = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+        return f"{KEY_PREFIX}:{generation}:{kind}:{digest}"
+
+    def lookup(self, kind: str, params: Dict[str, Any]) -> Tuple[Optional[str], Optional[Any]]:
+        """
+        Returns (key, cached value); the value is None on a miss
+
+        Pass the key back to store() after computing the response, so a write
+        committed in between stores it under the old generation where it is
+        never read. A failing Redis is counted and treated as a miss with no
+        key, so reads keep working uncached.
+        """
+        if self.backend is None:
+            return None, None
+        try:
+            key = self._key(kind, params)
+            value = self.backend.get(key)
+        except redis.RedisError:
+            self._count(kind, "errors")
+            return None, None
+        self._count(kind, "misses" if value is None else "hits")
+        return key, value
+
+    def _is_local(self) -> bool:
+        """True if lookups and stores need no Redis call right now"""
+        return isinstance(self.backend, LRUBackend) and self._generation_is_fresh()
+
+    async def lookup_async(self, kind: str, params: Dict[str, Any]) -> Tuple[Optional[str], Optional[Any]]:
+        """lookup() for async handlers; Redis calls go to the threadpool"""
+        if self.backend is None or self._is_local():
+            return self.lookup(kind, params)
+        return await run_in_threadpool(self.lookup, kind, params)
+
+    def store(self, kind: str, key: Optional[str], value: Any) -> None:
+        if key is None:
+            return
+        try:
+            self.backend.set(key, value, self.ttl)
+        except redis.RedisError:
+            self._count(kind, "errors")
+
+    async def store_async(self, kind: str, key: Optional[str], value: Any) -> None:
+        """store() for async handlers; a Redis write goes to the threadpool"""
+        if key is None or isinstance(self.backend, LRUBackend):
+            self.store(kind, key, value)
+        else:
+            await run_in_threadpool(self.store, kind, key, value)
+
+    def invalidate(self) -> None:
+        """Retire every cached response; in this process at once, in others within generation_ttl"""
+        if self.backend is None:
+            return
+        self._set_generation(redis_client.incr(GENERATION_KEY))
+        with self._lock:
+            self._invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters of this process"""
+        with self._lock:
+            kinds = {kind: dict(counts) for kind, counts in self._stats.items()}
+            invalidations = self._invalidations
+        for counts in kinds.values():
+            lookups = counts["hits"] + counts["misses"]
+            counts["hit_ratio"] = round(counts["hits"] / lookups, 4) if lookups else None
+        return {
+            "backend": settings.product_cache_backend,
+            "ttl": self.ttl,
+            "generation": self._generation,
+            "entries": self.backend.size() if self.backend is not None else None,
+            "invalidations": invalidations,
+            **kinds
+        }
+
+
+def _make_backend():
+    if settings.product_cache_backend == "memory":
+        return LRUBackend(settings.product_cache_max_entries)
+    if settings.product_cache_backend == "redis":
+        return RedisBackend(redis_client)
+    return None
+
+
+product_cache = ProductCache(_make_backend(), settings.product_cache_ttl)
+
+
+def invalidate_product_cache() -> None:
+    """Called after a commit that changed products; a Redis outage only delays invalidation until the TTL"""
+    try:
+        product_cache.invalidate()
+    except redis.RedisError:
+        pass
@@ -0,0 +1,41 @@
+"""
+Catalog version counter
+
+A single-row counter that is bumped in the same transaction as every
+write to products. Anything derived from the catalog (cached exports,
+cached reads) can key on it and is invalidated as soon as products change.
+
+Sessions that bump the version also invalidate the product read cache
+once their transaction commits, so readers never cache pre-commit data
+under the new generation.
+"""
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app.cache import invalidate_product_cache
+
+
+def bump_catalog_version(db: Session) -> None:
+    """Increment the catalog version; call right before committing a product write"""
+    db.execute(text(
+        "INSERT INTO catalog_state (id, version, updated_at) VALUES (1, 1, now()) "
+        "ON CONFLICT (id) DO UPDATE SET version = catalog_state.version + 1, updated_at = now()"
+    ))
+    db.info["catalog_changed"] = True
+
+
+def get_catalog_version(db: Session) -> int:
+    """Current catalog version (0 until the first product write)"""
+    version = db.execute(text("SELECT version FROM catalog_state WHERE id = 1")).scalar()
+    return version or 0
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    if session.info.pop("catalog_changed", False):
+        invalidate_product_cache()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    session.info.pop("catalog_changed", None)
@@ -0,0 +1,100 @@
+"""
+Adaptive sizing of import batches
+
+An import loads and commits one record-aligned block at a time. Instead
+of a fixed block size, BlockSizer measures every committed block (rows,
+bytes, seconds from read to commit) and sizes the next one so it takes
+about import_target_batch_seconds, within import_min_batch_rows and
+import_max_batch_rows. Bytes per row are tracked as a moving average, so
+wide rows (long descriptions) get smaller blocks and narrow rows larger
+ones. Upsert statements inside a block are further capped by
+import_max_statement_bytes (see app.loaders).
+"""
+from typing import Any, Dict, List, Optional
+
+from config import settings
+
+SMOOTHING = 0.3  # weight of the newest block in the moving averages
+MAX_GROWTH = 2.0  # a block is at most this many times the rows of the previous one
+MAX_BLOCK_BYTES = 256 * 1024 * 1024  # bounds the memory of one block regardless of row counts
+RECENT_BATCHES = 20  # batches kept in the recorded stats
+
+
+class BlockSizer:
+    """
+    Callable returning the byte size of the next block; feed it with observe()
+
+    next_bytes starts as None unless restored from the stats of an earlier
+    run; the consumer sets the initial size that suits its loader.
+    """
+
+    def __init__(self, previous: Optional[Dict[str, Any]] = None):
+        self.min_rows = settings.import_min_batch_rows
+        self.max_rows = settings.import_max_batch_rows
+        self.target_seconds = settings.import_target_batch_seconds
+
+        self.next_bytes: Optional[int] = None
+        self.bytes_per_row: Optional[float] = None
+        self.rows_per_second: Optional[float] = None
+        self.batches = 0
+        self.rows = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.smallest: Optional[int] = None
+        self.largest: Optional[int] = None
+        self.recent: List[List[Any]] = []
+
+        if previous:
+            # A resumed import continues with the sizes and totals it had reached
+            self.next_bytes = previous.get("next_block_bytes")
+            self.bytes_per_row = previous.get("bytes_per_row")
+            self.rows_per_second = previous.get("recent_rows_per_second")
+            self.batches = previous.get("batches", 0)
+            self.rows = previous.get("rows", 0)
+            self.bytes = previous.get("bytes", 0)
+            self.seconds = previous.get("seconds", 0.0)
+            self.smallest = previous.get("min_batch_rows")
+            self.largest = previous.get("max_batch_rows")
+            self.recent = previous.get("recent", [])
+
+    def __call__(self) -> int:
+        return self.next_bytes
+
+    def _average(self, current: Optional[float], value: float) -> float:
+        return value if current is None else current + SMOOTHING * (value - current)
+
+    def observe(self, rows: int, nbytes: int, seconds: float) -> None:
+        """Record a committed block and size the next one"""
+        self.batches += 1
+        self.rows += rows
+        self.bytes += nbytes
+        self.seconds += seconds
+        self.smallest = rows if self.smallest is None else min(self.smallest, rows)
+        self.largest = rows if self.largest is None else max(self.largest, rows)
+        self.recent = (self.recent + [[rows, nbytes, round(seconds * 1000)]])[-RECENT_BATCHES:]
+
+        if rows == 0 or seconds <= 0:
+            return
+        self.bytes_per_row = self._average(self.bytes_per_row, nbytes / rows)
+        self.rows_per_second = self._average(self.rows_per_second, rows / seconds)
+
+        target_rows = self.rows_per_second * self.target_seconds
+        target_rows = min(target_rows, max(rows, self.min_rows) * MAX_GROWTH)
+        target_rows = max(self.min_rows, min(self.max_rows, target_rows))
+        self.next_bytes = max(1, min(MAX_BLOCK_BYTES, int(target_rows * self.bytes_per_row)))
+
+    def summary(self) -> Dict[str, Any]:
+        """Chosen sizes and throughput, recorded on the task for tuning"""
+        return {
+            "batches": self.batches,
+            "rows": self.rows,
+            "bytes": self.bytes,
+            "seconds": round(self.seconds, 3),
+            "rows_per_second": round(self.rows / self.seconds) if self.seconds else None,
+            "recent_rows_per_second": round(self.rows_per_second) if self.rows_per_second else None,
+            "bytes_per_row": round(self.bytes_per_row, 1) if self.bytes_per_row else None,
+            "min_batch_rows": self.smallest,
+            "max_batch_rows": self.largest,
+            "next_block_bytes": self.next_bytes,
+            "recent": self.recent  # [rows, bytes, ms] per batch, newest last
+        }
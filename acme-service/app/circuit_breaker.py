@@ -0,0 +1,96 @@
+"""
+Per-URL circuit breakers for webhook delivery, shared through Redis
+
+After webhook_breaker_threshold consecutive failures the circuit for a URL
+opens for webhook_breaker_cooldown seconds, during which deliveries to it
+are not attempted at all; deliveries of a run still queued when the
+circuit opens are dropped by the delivery engine (see record_result).
+
+When the cooldown ends the circuit is half-open: it still counts as open,
+except for the one caller that claims the trial (claim_trial), which
+sends a single delivery. Success closes the circuit, failure opens it
+again straight away. A tripped circuit nobody delivers to is forgotten
+after a while, like a failure count.
+"""
+import hashlib
+from typing import Iterable, Set
+
+from config import settings
+from dependencies.redis_client import redis_client
+
+KEY = "webhooks:breaker:{digest}:{part}"
+
+
+def _key(url: str, part: str) -> str:
+    return KEY.format(digest=hashlib.sha1(url.encode()).hexdigest(), part=part)
+
+
+def _cooldown_ms() -> int:
+    return int(settings.webhook_breaker_cooldown * 1000)
+
+
+def _memory_seconds() -> int:
+    """How long failure counts and tripped circuits are kept without new failures"""
+    return max(int(settings.webhook_breaker_cooldown * 10), 60)
+
+
+def open_circuits(urls: Iterable[str]) -> Set[str]:
+    """The subset of urls whose circuit is currently open or half-open"""
+    urls = list(set(urls))
+    if not urls:
+        return set()
+    pipe = redis_client.pipeline(transaction=False)
+    for url in urls:
+        pipe.exists(_key(url, "open"), _key(url, "tripped"))
+    return {url for url, is_open in zip(urls, pipe.execute()) if is_open}
+
+
+def claim_trial(url: str) -> bool:
+    """
+    Claim the trial delivery of a half-open circuit
+
+    True for exactly one caller per cooldown; the holder sends one delivery
+    and records its result, which releases the trial. False while the
+    circuit cools down or is closed.
+    """
+    if redis_client.exists(_key(url, "open")) or not redis_client.exists(_key(url, "tripped")):
+        return False
+    return bool(redis_client.set(_key(url, "trial"), 1, nx=True, px=_cooldown_ms()))
+
+
+def record_success(url: str) -> None:
+    redis_client.delete(_key(url, "failures"), _key(url, "tripped"), _key(url, "trial"))
+
+
+def record_failure(url: str) -> bool:
+    """Count a failed delivery; returns True if the circuit is now open"""
+    if redis_client.exists(_key(url, "tripped")):
+        # Failed trial after a cooldown
+        pipe = redis_client.pipeline()
+        pipe.set(_key(url, "open"), 1, px=_cooldown_ms())
+        pipe.set(_key(url, "tripped"), 1, ex=_memory_seconds())
+        pipe.delete(_key(url, "trial"))
+        pipe.execute()
+        return True
+
+    pipe = redis_client.pipeline()
+    pipe.incr(_key(url, "failures"))
+    pipe.expire(_key(url, "failures"), _memory_seconds())
+    failures, _ = pipe.execute()
+    if failures < settings.webhook_breaker_threshold:
+        return False
+
+    pipe = redis_client.pipeline()
+    pipe.set(_key(url, "open"), 1, px=_cooldown_ms())
+    pipe.set(_key(url, "tripped"), 1, ex=_memory_seconds())
+    pipe.delete(_key(url, "failures"))
+    pipe.execute()
+    return True
+
+
+def record_result(result) -> bool:
+    """Feed a delivery result (app.delivery.DeliveryResult) to its URL's breaker; True if the circuit is now open"""
+    if result.ok:
+        record_success(result.url)
+        return False
+    return record_failure(result.url)
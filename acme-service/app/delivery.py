@@ -0,0 +1,196 @@
+"""
+Concurrent webhook delivery
+
+Each process keeps one event loop running in a background thread with a
+long-lived httpx.AsyncClient, so connections (and TLS sessions) are pooled
+across events instead of being set up again for every delivery. Deliveries
+of an event are sent concurrently, bounded by a global limit and a
+per-host limit, so one slow endpoint no longer holds up the others.
+
+An on_result callback (the circuit breaker) sees every result as it comes
+in. Once it reports a URL's circuit open, that URL's remaining deliveries
+of the run are not sent: queued ones are skipped and in-flight ones
+cancelled, so a dead endpoint costs at most one timeout per run.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class DeliveryResult(NamedTuple):
+    webhook_id: Any
+    url: str
+    status_code: Optional[int]
+    latency_ms: int
+    error: Optional[str]
+    skipped: bool = False  # not sent, the URL's circuit opened during the run
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code is not None and 200 <= self.status_code < 300
+
+
+class DeliveryEngine:
+    """Fans out webhook POSTs over a pooled client owned by this process"""
+
+    def __init__(self, max_concurrency: int, max_per_host: int, timeout: float, connect_timeout: float):
+        self.max_concurrency = max_concurrency
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._global_limit: Optional[asyncio.Semaphore] = None
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+
+    def _start(self) -> None:
+        """Start the loop thread; done again after a fork since threads do not survive it"""
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, name="webhook-delivery", daemon=True)
+        thread.start()
+
+        async def setup():
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency
+                )
+            )
+            self._global_limit = asyncio.Semaphore(self.max_concurrency)
+            self._host_limits = {}
+
+        asyncio.run_coroutine_threadsafe(setup(), loop).result()
+        self._loop = loop
+        self._pid = os.getpid()
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._pid != os.getpid():
+                self._start()
+            return self._loop
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc.lower()
+        limit = self._host_limits.get(host)
+        if limit is None:
+            limit = self._host_limits[host] = asyncio.Semaphore(self.max_per_host)
+        return limit
+
+    async def _post(self, webhook_id: Any, url: str, content: bytes, tripped: Set[str]) -> DeliveryResult:
+        async with self._global_limit, self._host_limit(url):
+            if url in tripped:
+                return DeliveryResult(webhook_id, url, None, 0, "Circuit open", skipped=True)
+            start = time.perf_counter()
+            try:
+                response = await self._client.post(
+                    url, content=content, headers={"Content-Type": "application/json"}
+                )
+                status_code, error = response.status_code, None
+            except httpx.HTTPError as e:
+                status_code, error = None, f"{type(e).__name__}: {e}"
+            latency_ms = int((time.perf_counter() - start) * 1000)
+
+        return DeliveryResult(webhook_id, url, status_code, latency_ms, error)
+
+    async def _post_all(
+        self, deliveries: List[Tuple[Any, str, bytes]], on_result: Optional[Callable[[DeliveryResult], bool]]
+    ) -> List[DeliveryResult]:
+        loop = asyncio.get_running_loop()
+        tripped: Set[str] = set()  # URLs whose circuit opened during this run
+        pending: Dict[str, Set[asyncio.Task]] = {}  # tasks per URL that have not got a result yet
+
+        async def send(webhook_id: Any, url: str, content: bytes) -> DeliveryResult:
+            task = asyncio.current_task()
+            try:
+                result = await self._post(webhook_id, url, content, tripped)
+            except asyncio.CancelledError:
+                return DeliveryResult(webhook_id, url, None, 0, "Circuit open", skipped=True)
+            finally:
+                pending[url].discard(task)
+
+            # The callback talks to Redis, keep it off the delivery loop
+            if on_result is not None and not result.skipped and url not in tripped:
+                if await loop.run_in_executor(None, on_result, result) and url not in tripped:
+                    tripped.add(url)
+                    for other in pending[url]:
+                        other.cancel()
+            return result
+
+        tasks = []
+        for webhook_id, url, content in deliveries:
+            task = asyncio.ensure_future(send(webhook_id, url, content))
+            pending.setdefault(url, set()).add(task)
+            tasks.append(task)
+        return await asyncio.gather(*tasks)
+
+    def deliver(self, targets: Iterable[Tuple[Any, str]], body: Dict[str, Any]) -> List[DeliveryResult]:
+        """POST the same JSON body to every (webhook_id, url) target concurrently"""
+        content = json.dumps(body, default=str).encode("utf-8")
+        return self._run([(webhook_id, url, content) for webhook_id, url in targets])
+
+    def deliver_each(
+        self,
+        deliveries: Iterable[Tuple[Any, str, Any]],
+        on_result: Optional[Callable[[DeliveryResult], bool]] = None
+    ) -> List[DeliveryResult]:
+        """
+        POST a separate JSON body per (webhook_id, url, body) delivery concurrently
+
+        on_result is called with every result and returns True when the
+        URL's circuit is now open; the URL's other deliveries then come back
+        with skipped set.
+        """
+        return self._run([
+            (webhook_id, url, json.dumps(body, default=str).encode("utf-8"))
+            for webhook_id, url, body in deliveries
+        ], on_result)
+
+    def _run(
+        self, deliveries: List[Tuple[Any, str, bytes]], on_result: Optional[Callable[[DeliveryResult], bool]] = None
+    ) -> List[DeliveryResult]:
+        """
+        Send deliveries on the process loop and wait for all of them
+
+        Results are in the order of deliveries. Transport errors are
+        reported in the result, never raised.
+        """
+        if not deliveries:
+            return []
+
+        loop = self._ensure_started()
+        results = asyncio.run_coroutine_threadsafe(self._post_all(deliveries, on_result), loop).result()
+
+        for result in results:
+            if result.skipped:
+                continue
+            if result.ok:
+                logger.info(f"Webhook {result.webhook_id} delivered: {result.status_code} in {result.latency_ms} ms")
+            else:
+                logger.error(
+                    f"Webhook {result.webhook_id} failed: {result.error or result.status_code} "
+                    f"after {result.latency_ms} ms"
+                )
+        return results
+
+
+delivery_engine = DeliveryEngine(
+    max_concurrency=settings.webhook_max_concurrency,
+    max_per_host=settings.webhook_max_per_host,
+    timeout=settings.webhook_timeout,
+    connect_timeout=settings.webhook_connect_timeout
+)
@@ -0,0 +1,70 @@
+"""
+Column-wise normalization of import chunks into product upsert batches
+"""
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+from typing import Dict, Any, List
+
+
+def _text_column(df: pd.DataFrame, column: str) -> pd.Series:
+    """Return a column as strings, or an all-null column when it is missing"""
+    if column in df.columns:
+        values = df[column]
+        return values.astype(str).where(values.notna(), None)
+    # pd.Series(None, dtype=object) would hold NaN, which binds as a float
+    return pd.Series([None] * len(df), index=df.index, dtype=object)
+
+
+def normalize_chunk(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Normalize a raw chunk into product columns
+
+    Works on whole columns: strips SKU/name, maps nulls to None, coerces
+    price to float and drops rows without a SKU. When a SKU appears more
+    than once in the chunk the last occurrence wins, matching the order
+    in which the rows would have been upserted one by one. Rows are
+    expected to have passed app.validation.validate_chunk, so a price that
+    still fails to parse (e.g. whitespace only) becomes null.
+    """
+    df.columns = df.columns.str.strip().str.lower()
+
+    sku = _text_column(df, 'sku').fillna('').astype(str).str.strip()
+    name = _text_column(df, 'name').fillna('').astype(str).str.strip()
+    description = _text_column(df, 'description')
+
+    if 'price' in df.columns and is_numeric_dtype(df['price']):
+        # Typed formats (Parquet) hand over numbers as is
+        price = df['price'].astype(float)
+    elif 'price' in df.columns:
+        price = pd.to_numeric(df['price'].str.strip(), errors='coerce').astype(float)
+    else:
+        price = pd.Series(float('nan'), index=df.index)  # stored as NULL, as before
+
+    frame = pd.DataFrame({
+        'sku': sku,
+        'name': name,
+        'description': description,
+        'price': price,
+        'active': True  # Default to active
+    })
+
+    frame = frame[frame['sku'] != '']
+    frame = frame.drop_duplicates(subset='sku', keep='last')
+
+    # Sorted so concurrent loaders lock existing rows in the same order
+    return frame.sort_values('sku', kind='stable')
+
+
+def to_upsert_params(frame: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Convert a normalized frame into the parameter list for a batch upsert; nulls bind as None, never NaN"""
+    frame = frame.astype(object).where(frame.notna(), None)
+    return [
+        {'sku': s, 'name': n, 'description': d, 'price': p, 'active': a}
+        for s, n, d, p, a in zip(
+            frame['sku'].tolist(),
+            frame['name'].tolist(),
+            frame['description'].tolist(),
+            frame['price'].tolist(),
+            frame['active'].tolist(),
+        )
+    ]
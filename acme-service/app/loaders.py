@@ -0,0 +1,173 @@
+"""
+Database loaders for normalized product batches
+
+Two ingest engines share the same input (a frame from app.ingest):
+- upsert: INSERT ... ON CONFLICT statements bounded by
+  import_max_statement_bytes and import_max_batch_rows
+- copy: COPY FROM STDIN into a temporary staging table, then a single
+  set-based merge into products
+"""
+import io
+import logging
+from typing import List, NamedTuple, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, literal_column, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.ingest import to_upsert_params
+from config import settings
+from models import Product, content_hash_sql
+
+logger = logging.getLogger(__name__)
+
+# Estimated bytes a row adds to an INSERT statement besides its text
+# columns: id, price, active, quoting and separators
+ROW_OVERHEAD_BYTES = 80
+
+STAGING_TABLE = 'products_staging'
+STAGING_COLUMNS = ['sku', 'name', 'description', 'price', 'active']
+
+
+class LoadStats(NamedTuple):
+    """Row counts for one loaded batch"""
+    loaded: int = 0
+    inserted: int = 0
+    updated: int = 0
+    rejected: int = 0  # set by the import pipeline, rows that failed validation
+
+    @property
+    def unchanged(self) -> int:
+        return self.loaded - self.inserted - self.updated
+
+
+def _changed_clause(excluded: str, target: str) -> str:
+    """SQL condition that is true when the incoming row's content differs from the stored row"""
+    incoming = content_hash_sql(f"{excluded}.name", f"{excluded}.description", f"{excluded}.price")
+    return f"{incoming} IS DISTINCT FROM {target}.content_hash"
+
+
+def statement_bounds(frame: pd.DataFrame, max_rows: int, max_bytes: int) -> List[Tuple[int, int]]:
+    """
+    Split a frame into (start, stop) row ranges for separate statements
+
+    Each range stays under max_rows rows and, by estimated SQL size,
+    under max_bytes; a single row larger than max_bytes gets a statement
+    of its own.
+    """
+    sizes = (
+        frame['sku'].str.len().to_numpy(dtype=float)
+        + frame['name'].str.len().to_numpy(dtype=float)
+        + frame['description'].str.len().fillna(0).to_numpy(dtype=float)
+        + ROW_OVERHEAD_BYTES
+    )
+    ends = np.cumsum(sizes)
+
+    bounds = []
+    start = 0
+    while start < len(frame):
+        base = ends[start - 1] if start else 0.0
+        stop = int(np.searchsorted(ends, base + max_bytes, side='right'))
+        stop = min(max(stop, start + 1), start + max_rows, len(frame))
+        bounds.append((start, stop))
+        start = stop
+    return bounds
+
+
+def upsert_products(db: Session, frame: pd.DataFrame, delta: bool = False) -> LoadStats:
+    """
+    Upsert a normalized frame with INSERT ... ON CONFLICT statements
+
+    Statements are split by statement_bounds, so rows with huge
+    descriptions never add up to an oversized statement. In delta mode rows
+    whose content hash matches the stored row are left untouched by the
+    database (no new row version, no updated_at bump).
+    """
+    products_data = to_upsert_params(frame)
+    inserted = updated = 0
+
+    for start, stop in statement_bounds(frame, settings.import_max_batch_rows, settings.import_max_statement_bytes):
+        stmt = insert(Product).values(products_data[start:stop])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['sku'],
+            set_={
+                'name': stmt.excluded.name,
+                'description': stmt.excluded.description,
+                'price': stmt.excluded.price,
+                'updated_at': func.now(),
+            },
+            where=text(_changed_clause('excluded', 'products')) if delta else None
+        )
+        # xmax is 0 only for freshly inserted row versions
+        written = db.execute(stmt.returning(literal_column('xmax = 0'))).scalars().all()
+        batch_inserted = sum(1 for is_insert in written if is_insert)
+        inserted += batch_inserted
+        updated += len(written) - batch_inserted
+    return LoadStats(len(products_data), inserted, updated)
+
+
+def supports_copy(db: Session) -> bool:
+    """Check whether the session's DBAPI driver can stream COPY FROM STDIN"""
+    cursor = db.connection().connection.cursor()
+    try:
+        return hasattr(cursor, 'copy_expert')
+    finally:
+        cursor.close()
+
+
+def copy_products(db: Session, frame: pd.DataFrame, delta: bool = False) -> LoadStats:
+    """
+    Load a normalized frame through a temporary staging table
+
+    Rows are streamed with COPY FROM STDIN and merged into products with
+    one INSERT ... SELECT ... ON CONFLICT statement. The staging table is
+    created once per connection and emptied on every commit. In delta mode
+    unchanged rows are skipped by the merge, as in upsert_products.
+    """
+    if frame.empty:
+        return LoadStats()
+
+    db.execute(text(
+        f"CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} ("
+        "sku varchar(255), name varchar(500), description text, "
+        "price double precision, active boolean"
+        ") ON COMMIT DELETE ROWS"
+    ))
+
+    buffer = io.StringIO()
+    frame.to_csv(buffer, header=False, index=False, columns=STAGING_COLUMNS)
+    buffer.seek(0)
+
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {STAGING_TABLE} ({', '.join(STAGING_COLUMNS)}) FROM STDIN "
+            "WITH (FORMAT csv, FORCE_NOT_NULL (sku, name))",
+            buffer
+        )
+    finally:
+        cursor.close()
+
+    where = f" WHERE {_changed_clause('EXCLUDED', 'products')}" if delta else ""
+    inserted, written = db.execute(text(
+        "WITH merged AS ("
+        "INSERT INTO products (id, sku, name, description, price, active) "
+        f"SELECT gen_random_uuid(), sku, name, description, price, active FROM {STAGING_TABLE} "
+        "ON CONFLICT (sku) DO UPDATE SET "
+        "name = EXCLUDED.name, description = EXCLUDED.description, price = EXCLUDED.price, "
+        f"updated_at = now(){where} "
+        "RETURNING xmax = 0 AS inserted"
+        ") SELECT count(*) FILTER (WHERE inserted), count(*) FROM merged"
+    )).one()
+    return LoadStats(len(frame), inserted, written - inserted)
+
+
+def get_loader(db: Session, mode: str):
+    """Pick the loader for an ingest mode, falling back to upsert when COPY is unavailable"""
+    if mode == 'copy':
+        if supports_copy(db):
+            return copy_products
+        logger.warning("COPY is not supported by the database driver, falling back to upsert")
+    return upsert_products
@@ -0,0 +1,56 @@
+"""
+Keyset pagination helpers for product listings
+
+Pages are ordered by (created_at, id), which is backed by an index, and
+continued with an opaque cursor holding the last row's key instead of an
+OFFSET that PostgreSQL would have to walk past.
+"""
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Tuple, Union
+
+from sqlalchemy import Select
+from sqlalchemy.orm import Query, Session
+
+
+def encode_cursor(created_at: datetime, product_id: uuid.UUID) -> str:
+    """Build an opaque cursor pointing just after the given row"""
+    raw = json.dumps([created_at.isoformat(), str(product_id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    """Parse a cursor produced by encode_cursor; raises ValueError if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, product_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), uuid.UUID(product_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def estimate_count(db: Session, query: Union[Query, Select]) -> int:
+    """
+    Row estimate for a query taken from the planner (EXPLAIN), without scanning the table
+
+    Accepts an ORM Query or a select(); with an AsyncSession call it
+    through run_sync.
+    """
+    dialect = db.get_bind().dialect
+    compiled = getattr(query, "statement", query).compile(dialect=dialect)
+
+    # exec_driver_sql skips SQLAlchemy's type processing, so apply it here (e.g. UUID -> str)
+    params = {}
+    for key, value in compiled.params.items():
+        processor = compiled.binds[key].type.bind_processor(dialect)
+        params[key] = processor(value) if processor else value
+    if compiled.positional:
+        params = tuple(params[key] for key in compiled.positiontup)
+
+    result = db.connection().exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", params)
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
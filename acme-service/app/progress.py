@@ -0,0 +1,232 @@
+"""
+Upload progress: status snapshots and push delivery over Redis pub/sub
+
+Import tasks publish a TaskStatusResponse on the task's channel as
+committed blocks advance and when the import completes or fails. In the
+API process, ProgressHub keeps one subscription per task, however many
+clients watch it, and fans each message out to every watcher's queue.
+
+ProgressReporter rate-limits the intermediate updates an import sends to
+the Celery result backend and to watchers; the final status is always sent.
+"""
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, Optional, Set
+
+import redis
+import redis.asyncio as aioredis
+
+from config import settings
+from dependencies.redis_client import redis_client
+from models import UploadTask
+from schemas import TaskStatusResponse
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "uploads:progress:"
+TERMINAL_STATUSES = ("completed", "failed")
+WATCHER_QUEUE_SIZE = 16  # a slow watcher skips to the newest events
+
+
+def upload_status(upload_task: UploadTask, state: Optional[str], info) -> TaskStatusResponse:
+    """
+    Combine the Celery task state with the recorded upload task
+
+    The recorded final state wins over the last (rate-limited) progress update.
+    """
+    if state == 'PROGRESS' and upload_task.status not in TERMINAL_STATUSES:
+        rejected_rows = info.get('rejected_rows', 0)
+    else:
+        rejected_rows = upload_task.rejected_rows or 0
+    rejected = {
+        'rejected_rows': rejected_rows,
+        'rejected_url': f"/api/upload/{upload_task.task_id}/rejected" if rejected_rows else None
+    }
+    
+    if upload_task.status == "completed":
+        return TaskStatusResponse(
+            status="completed",
+            current=upload_task.processed_rows,
+            total=upload_task.total_rows,
+            percentage=100,
+            bytes_processed=upload_task.processed_bytes or 0,
+            bytes_total=upload_task.total_bytes or 0,
+            message="Upload completed successfully",
+            **rejected
+        )
+    elif upload_task.status == "failed":
+        return TaskStatusResponse(
+            status="failed",
+            current=upload_task.processed_rows,
+            total=upload_task.total_rows,
+            percentage=0,
+            bytes_processed=upload_task.processed_bytes or 0,
+            bytes_total=upload_task.total_bytes or 0,
+            message=upload_task.error_message,
+            **rejected
+        )
+    elif state == 'PROGRESS':
+        return TaskStatusResponse(
+            status="processing",
+            current=info.get('current', 0),
+            total=info.get('total', 0),
+            percentage=info.get('percentage', 0),
+            bytes_processed=info.get('bytes_processed', 0),
+            bytes_total=info.get('bytes_total', 0),
+            **rejected
+        )
+    else:
+        total_bytes = upload_task.total_bytes or 0
+        processed_bytes = upload_task.processed_bytes or 0
+        return TaskStatusResponse(
+            status=upload_task.status,
+            current=upload_task.processed_rows,
+            total=upload_task.total_rows,
+            percentage=int(processed_bytes / total_bytes * 100) if total_bytes > 0 else 0,
+            bytes_processed=processed_bytes,
+            bytes_total=total_bytes,
+            **rejected
+        )
+
+
+def publish_progress(task_id: str, status: TaskStatusResponse) -> None:
+    """Push a status to the task's watchers; never fails the import"""
+    try:
+        redis_client.publish(CHANNEL_PREFIX + task_id, status.model_dump_json())
+    except redis.RedisError as e:
+        logger.warning(f"Could not publish progress of {task_id}: {e}")
+
+
+class ProgressReporter:
+    """
+    Sends an import's progress to the result backend and its watchers
+
+    Intermediate updates go out at most once per interval, the first one
+    immediately; finish() always publishes the recorded final state.
+    """
+
+    def __init__(self, task_id: str, celery_task=None, interval: float = settings.progress_interval_ms / 1000):
+        self.task_id = task_id
+        self.celery_task = celery_task
+        self.interval = interval
+        self._next_at = 0.0
+
+    def due(self) -> bool:
+        """True if an update may be sent now; claims the slot"""
+        now = time.monotonic()
+        if now < self._next_at:
+            return False
+        self._next_at = now + self.interval
+        return True
+
+    def progress(self, upload_task: UploadTask, meta: Dict[str, Any]) -> None:
+        """Report PROGRESS state meta, unless an update was sent less than an interval ago"""
+        if not self.due():
+            return
+        if self.celery_task is not None:
+            self.celery_task.update_state(state='PROGRESS', meta=meta)
+        publish_progress(self.task_id, upload_status(upload_task, 'PROGRESS', meta))
+
+    def finish(self, upload_task: UploadTask) -> None:
+        publish_progress(self.task_id, upload_status(upload_task, None, None))
+
+
+class ProgressHub:
+    """Fans one Redis subscription per task out to every watcher in this process"""
+
+    def __init__(self, redis_url: str):
+        self.redis_url = redis_url
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client: Optional[aioredis.Redis] = None
+        self._pubsub = None
+        self._reader: Optional[asyncio.Task] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._watchers: Dict[str, Set[asyncio.Queue]] = {}
+        self._channels: Set[str] = set()
+
+    def _ensure_started(self) -> None:
+        """Bind to the running event loop; asyncio objects cannot be shared across loops"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._client = aioredis.Redis.from_url(self.redis_url)
+            self._pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+            self._reader = None
+            self._lock = asyncio.Lock()
+            self._watchers = {}
+            self._channels = set()
+
+    async def subscribe(self, task_id: str) -> asyncio.Queue:
+        """Queue receiving every status published for task_id; pass it to unsubscribe() when done"""
+        self._ensure_started()
+        queue = asyncio.Queue(maxsize=WATCHER_QUEUE_SIZE)
+        self._watchers.setdefault(task_id, set()).add(queue)
+
+        async with self._lock:
+            if task_id not in self._channels:
+                await self._pubsub.subscribe(CHANNEL_PREFIX + task_id)
+                self._channels.add(task_id)
+
+        if self._reader is None or self._reader.done():
+            self._reader = asyncio.create_task(self._read())
+        return queue
+
+    def unsubscribe(self, task_id: str, queue: asyncio.Queue) -> None:
+        """
+        Remove a watcher; the last one out releases the Redis subscription
+
+        Synchronous so it can run from a cancelled stream, the release
+        itself happens in a separate task.
+        """
+        watchers = self._watchers.get(task_id)
+        if watchers is None:
+            return
+        watchers.discard(queue)
+        if not watchers:
+            asyncio.create_task(self._release(task_id))
+
+    async def _release(self, task_id: str) -> None:
+        async with self._lock:
+            # A new watcher may have arrived in the meantime
+            if self._watchers.get(task_id) or task_id not in self._channels:
+                return
+            self._watchers.pop(task_id, None)
+            self._channels.discard(task_id)
+            try:
+                await self._pubsub.unsubscribe(CHANNEL_PREFIX + task_id)
+            except redis.RedisError as e:
+                logger.warning(f"Could not unsubscribe from progress of {task_id}: {e}")
+
+    def _dispatch(self, task_id: str, event: Dict[str, Any]) -> None:
+        for queue in self._watchers.get(task_id, ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    async def _read(self) -> None:
+        """Deliver messages while any channel is subscribed"""
+        while self._channels:
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except redis.RedisError as e:
+                # The client resubscribes its channels when it reconnects
+                logger.warning(f"Progress subscription failed: {e}")
+                await asyncio.sleep(1.0)
+                continue
+            if message is None or message["type"] != "message":
+                continue
+            task_id = message["channel"].decode("utf-8")[len(CHANNEL_PREFIX):]
+            self._dispatch(task_id, json.loads(message["data"]))
+
+    async def close(self) -> None:
+        if self._reader is not None:
+            self._reader.cancel()
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            await self._client.aclose()
+        self._loop = None
+
+
+progress_hub = ProgressHub(settings.redis_url)
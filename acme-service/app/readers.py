@@ -0,0 +1,382 @@
+"""
+Import file readers
+
+CSV files are read as raw byte blocks that always end on a record
+boundary, i.e. a newline outside of a quoted field. Every block can be
+parsed on its own, and the byte offset after each block is exact, which
+is what progress reporting and checkpoints are based on.
+
+The reader classes at the bottom put every supported upload format
+behind the same interface: frames of raw product columns plus a position
+to resume from, feeding the same validation, normalization and load
+stage. Pick one with open_reader() by file name.
+"""
+import gzip
+import io
+import os
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple, Type, Union
+
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+QUOTE = b'"'
+NEWLINE = b'\n'
+
+
+def last_record_end(buf: bytes) -> int:
+    """
+    Return the index just past the last complete record in buf, or -1
+
+    buf must start on a record boundary. A newline ends a record when the
+    number of quote characters before it is even.
+    """
+    quotes_total = buf.count(QUOTE)
+    idx = buf.rfind(NEWLINE)
+    while idx >= 0:
+        if (quotes_total - buf.count(QUOTE, idx)) % 2 == 0:
+            return idx + 1
+        idx = buf.rfind(NEWLINE, 0, idx)
+    return -1
+
+
+def read_header(f: BinaryIO) -> Tuple[List[str], int]:
+    """Parse the header record and return (column names, byte offset of the first data record)"""
+    f.seek(0)
+    buf = b''
+    while True:
+        chunk = f.read(64 * 1024)
+        buf += chunk
+        idx = buf.find(NEWLINE)
+        while idx >= 0 and buf.count(QUOTE, 0, idx) % 2:
+            idx = buf.find(NEWLINE, idx + 1)
+        if idx >= 0 or not chunk:
+            break
+
+    header_end = idx + 1 if idx >= 0 else len(buf)
+    columns = pd.read_csv(io.BytesIO(buf[:header_end]), nrows=0).columns
+    return [str(column) for column in columns], header_end
+
+
+def last_line_end(buf: bytes) -> int:
+    """Return the index just past the last newline in buf, or -1; for formats without quoting"""
+    idx = buf.rfind(NEWLINE)
+    return idx + 1 if idx >= 0 else -1
+
+
+def iter_record_blocks(
+    f: BinaryIO,
+    start: int,
+    end: Optional[int] = None,
+    block_size: Union[int, Callable[[], int]] = 4 * 1024 * 1024,
+    record_end: Callable[[bytes], int] = last_record_end
+) -> Iterator[Tuple[bytes, int]]:
+    """
+    Yield (block, end_offset) pairs of whole records between start and end
+
+    start must be a record boundary; end defaults to the end of the file.
+    A record larger than block_size simply makes its block larger.
+    block_size may be a callable, asked for the size of every read, so the
+    consumer can resize blocks as it goes. record_end finds the last
+    record boundary in a buffer (CSV quoting rules by default).
+    """
+    f.seek(start)
+    position = start
+    pending = b''
+
+    while True:
+        size = block_size() if callable(block_size) else block_size
+        if end is not None:
+            size = min(size, end - position)
+        chunk = f.read(size) if size > 0 else b''
+        position += len(chunk)
+
+        if not chunk:
+            if pending:
+                yield pending, position
+            return
+
+        buf = pending + chunk
+        cut = record_end(buf)
+        if cut < 0:
+            pending = buf
+            continue
+
+        pending = buf[cut:]
+        yield buf[:cut], position - len(pending)
+
+
+def parse_block(block: bytes, columns: List[str]) -> pd.DataFrame:
+    """Parse a record-aligned block into a DataFrame of raw string columns"""
+    return pd.read_csv(io.BytesIO(block), header=None, names=columns, dtype=str)
+
+
+def split_record_ranges(
+    f: BinaryIO,
+    start: int,
+    parts: int,
+    scan_size: int = 8 * 1024 * 1024
+) -> List[Tuple[int, int]]:
+    """
+    Split the data section of a CSV file into record-aligned byte ranges
+
+    Ranges are roughly equal in size. Each boundary is the first record end
+    at or after its target offset, so quoted newlines never split a record.
+    Quote parity has to be tracked from start, which means one sequential
+    scan of the file with bytes.count (no parsing).
+    """
+    f.seek(0, io.SEEK_END)
+    size = f.tell()
+    if parts <= 1 or size <= start:
+        return [(start, size)]
+
+    step = (size - start) / parts
+    targets = [int(start + step * k) for k in range(1, parts)]
+    boundaries = [start]
+
+    f.seek(start)
+    block_start = start
+    quotes_before = 0
+    t = 0
+    while t < len(targets):
+        block = f.read(scan_size)
+        if not block:
+            break
+
+        while t < len(targets):
+            rel = max(targets[t] - block_start, 0)
+            if rel >= len(block):
+                break
+
+            quotes = quotes_before + block.count(QUOTE, 0, rel)
+            idx = block.find(NEWLINE, rel)
+            while idx >= 0 and (quotes + block.count(QUOTE, rel, idx)) % 2:
+                quotes += block.count(QUOTE, rel, idx)
+                rel = idx
+                idx = block.find(NEWLINE, idx + 1)
+
+            if idx < 0:
+                # No record end left in this block, continue in the next one
+                targets[t] = block_start + len(block)
+                break
+
+            boundary = block_start + idx + 1
+            if boundaries[-1] < boundary < size:
+                boundaries.append(boundary)
+            t += 1
+
+        quotes_before += block.count(QUOTE)
+        block_start += len(block)
+
+    boundaries.append(size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+# Columns the import pipeline uses; other columns are not read where the
+# format allows it
+PRODUCT_COLUMNS = ('sku', 'name', 'description', 'price')
+
+
+def _text(value: Any) -> str:
+    """str() of a value, with integral floats written as integers (1.0 -> "1")"""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def as_text(df: pd.DataFrame, keep_numeric: Tuple[str, ...] = ()) -> pd.DataFrame:
+    """
+    Turn typed columns into strings with nulls kept, like a CSV parsed with dtype=str
+
+    Integer columns with nulls arrive as floats; their values are written
+    without the decimal part, so SKU 1 stays "1" as it would in a CSV.
+    """
+    for column in df.columns:
+        values = df[column]
+        if str(column).strip().lower() in keep_numeric and is_numeric_dtype(values):
+            continue
+        if values.dtype != object or not values.map(type, na_action='ignore').eq(str).all():
+            df[column] = values.map(_text, na_action='ignore').astype(object).where(values.notna(), None)
+    return df
+
+
+class ImportReader:
+    """
+    Reads an import file as frames of raw product columns
+
+    blocks() yields (frame, bytes read, position) per block; passing a
+    position back as start resumes right after that block. Positions are
+    byte offsets unless a reader says otherwise, and progress() maps them
+    to bytes of the file on disk.
+    """
+
+    splittable = False  # can be imported in parallel byte ranges (split_record_ranges)
+
+    def __init__(self, path: str):
+        self.path = path
+        self.data_start = 0
+        self.columns = list(PRODUCT_COLUMNS)  # source columns; readers of files with a header replace them
+
+    def __enter__(self) -> "ImportReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        pass
+
+    def blocks(
+        self, start: int, end: Optional[int], block_size: Union[int, Callable[[], int]]
+    ) -> Iterator[Tuple[pd.DataFrame, int, int]]:
+        raise NotImplementedError
+
+    def progress(self, position: int) -> int:
+        return position
+
+
+class CsvReader(ImportReader):
+    """Plain CSV, read in record-aligned byte blocks; pass columns to skip reading the header"""
+
+    splittable = True
+
+    def __init__(self, path: str, columns: Optional[List[str]] = None):
+        super().__init__(path)
+        self.file = open(path, 'rb')
+        if columns is None:
+            self.columns, self.data_start = read_header(self.file)
+        else:
+            self.columns = columns
+
+    def close(self) -> None:
+        self.file.close()
+
+    def blocks(self, start, end, block_size):
+        for block, offset in iter_record_blocks(self.file, start, end, block_size=block_size):
+            yield parse_block(block, self.columns), len(block), offset
+
+
+class CompressedCsvReader(CsvReader):
+    """
+    gzip or zstd compressed CSV, decompressed as a stream
+
+    Positions are offsets in the decompressed CSV, so record-aligned blocks
+    work as for plain CSV; resuming decompresses and skips up to the
+    checkpoint. progress() reports compressed bytes consumed.
+    """
+
+    splittable = False
+
+    def __init__(self, path: str, codec: str):
+        self.codec = codec
+        ImportReader.__init__(self, path)
+        self.raw = open(path, 'rb')
+        self.file = self._decompress()
+        self.columns, self.data_start = read_header(self.file)
+
+    def _decompress(self) -> BinaryIO:
+        """A fresh decompressed stream from the start of the file"""
+        self.raw.seek(0)
+        if self.codec == 'gzip':
+            return gzip.GzipFile(fileobj=self.raw, mode='rb')
+        import zstandard
+        return zstandard.ZstdDecompressor().stream_reader(self.raw, read_across_frames=True, closefd=False)
+
+    def close(self) -> None:
+        self.file.close()
+        self.raw.close()
+
+    def blocks(self, start, end, block_size):
+        # The header was read from this stream, decompression streams cannot seek back
+        self.file.close()
+        self.file = self._decompress()
+        return super().blocks(start, end, block_size)
+
+    def progress(self, position: int) -> int:
+        return self.raw.tell()
+
+
+class NdjsonReader(ImportReader):
+    """Newline-delimited JSON objects, read in line-aligned byte blocks"""
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self.file = open(path, 'rb')
+
+    def close(self) -> None:
+        self.file.close()
+
+    def blocks(self, start, end, block_size):
+        for block, offset in iter_record_blocks(
+            self.file, start, end, block_size=block_size, record_end=last_line_end
+        ):
+            frame = pd.read_json(io.BytesIO(block), lines=True, dtype=False, convert_dates=False)
+            yield as_text(frame), len(block), offset
+
+
+class ParquetReader(ImportReader):
+    """
+    Parquet, read one row group at a time without text parsing
+
+    Positions are row group indexes; only the product columns are read and
+    a numeric price column stays numeric. block_size is ignored, a row
+    group is the unit of the file's own layout.
+    """
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        import pyarrow.parquet as pq
+        self.file = pq.ParquetFile(path)
+        metadata = self.file.metadata
+        self.columns = [
+            name for name in self.file.schema_arrow.names
+            if name.strip().lower() in PRODUCT_COLUMNS
+        ]
+        # Bytes of the file before each row group ends, for progress
+        self.row_group_ends = []
+        position = 0
+        for i in range(metadata.num_row_groups):
+            row_group = metadata.row_group(i)
+            position += sum(row_group.column(c).total_compressed_size for c in range(row_group.num_columns))
+            self.row_group_ends.append(position)
+        self.file_size = os.path.getsize(path)
+
+    def close(self) -> None:
+        self.file.close()
+
+    def blocks(self, start, end, block_size):
+        stop = self.file.num_row_groups if end is None else min(end, self.file.num_row_groups)
+        for index in range(start, stop):
+            table = self.file.read_row_group(index, columns=self.columns)
+            yield as_text(table.to_pandas(), keep_numeric=('price',)), table.nbytes, index + 1
+
+    def progress(self, position: int) -> int:
+        if position >= len(self.row_group_ends):
+            return self.file_size
+        return self.row_group_ends[position - 1] if position > 0 else 0
+
+
+# File name suffixes of the supported upload formats, longest match wins
+IMPORT_FORMATS: Dict[str, Tuple[Type[ImportReader], Dict[str, str]]] = {
+    '.csv': (CsvReader, {}),
+    '.csv.gz': (CompressedCsvReader, {'codec': 'gzip'}),
+    '.csv.zst': (CompressedCsvReader, {'codec': 'zstd'}),
+    '.ndjson': (NdjsonReader, {}),
+    '.jsonl': (NdjsonReader, {}),
+    '.parquet': (ParquetReader, {}),
+}
+
+
+def import_format(filename: str) -> Optional[str]:
+    """The IMPORT_FORMATS suffix of a file name, or None if the format is not supported"""
+    lowered = filename.lower()
+    matches = [suffix for suffix in IMPORT_FORMATS if lowered.endswith(suffix)]
+    return max(matches, key=len) if matches else None
+
+
+def open_reader(path: str) -> ImportReader:
+    """Open the reader for a file by its name; raises ValueError for unsupported formats"""
+    suffix = import_format(path)
+    if suffix is None:
+        raise ValueError(f"Unsupported import file format: {os.path.basename(path)}")
+    reader_class, options = IMPORT_FORMATS[suffix]
+    return reader_class(path, **options)
@@ -0,0 +1,104 @@
+"""
+Indexed product search shared by the list and export endpoints
+
+Every mode is served by an index on products:
+- contains: substring match on SKU/name (pg_trgm GIN indexes on lower(sku)
+  and lower(name)) or a word match in the full-text vector, which also
+  covers the description
+- prefix: every word of the term as a word prefix in the full-text vector,
+  for type-ahead search
+- fulltext: web-search syntax ("quoted phrases", -exclusions, or) against
+  the full-text vector, ranked by ts_rank
+- fuzzy: trigram similarity on SKU/name, ranked by similarity, tolerant
+  of typos
+"""
+import re
+from typing import Optional, Tuple
+
+from sqlalchemy import func, literal, literal_column, or_
+from sqlalchemy.orm import Query
+
+from models import Product
+
+SEARCH_MODES = ("contains", "prefix", "fulltext", "fuzzy")
+
+# Must match the configuration of the generated search_vector column
+TS_CONFIG = literal_column("'simple'::regconfig")
+
+LIKE_ESCAPE = "!"
+
+
+def _like_pattern(term: str) -> str:
+    escaped = term.lower().replace("!", "!!").replace("%", "!%").replace("_", "!_")
+    return f"%{escaped}%"
+
+
+def _prefix_tsquery(term: str) -> Optional[str]:
+    """Turn free text into a tsquery string matching every word as a prefix"""
+    words = re.findall(r"[^\W_]+", term.lower())
+    if not words:
+        return None
+    return " & ".join(f"{word}:*" for word in words)
+
+
+def apply_search(query: Query, term: str, mode: str = "contains") -> Tuple[Query, Optional[object]]:
+    """
+    Filter a Product query by a search term
+
+    Returns the filtered query and, for ranked modes, a relevance expression
+    to order by (higher is better); the rank is None for unranked modes.
+    """
+    if mode == "contains":
+        pattern = _like_pattern(term)
+        query = query.filter(
+            or_(
+                func.lower(Product.sku).like(pattern, escape=LIKE_ESCAPE),
+                func.lower(Product.name).like(pattern, escape=LIKE_ESCAPE),
+                Product.search_vector.op("@@")(func.plainto_tsquery(TS_CONFIG, term))
+            )
+        )
+        return query, None
+
+    if mode == "prefix":
+        tsquery = _prefix_tsquery(term)
+        if tsquery is None:
+            return query.filter(literal(False)), None
+        return query.filter(Product.search_vector.op("@@")(func.to_tsquery(TS_CONFIG, tsquery))), None
+
+    if mode == "fulltext":
+        tsquery = func.websearch_to_tsquery(TS_CONFIG, term)
+        query = query.filter(Product.search_vector.op("@@")(tsquery))
+        return query, func.ts_rank(Product.search_vector, tsquery)
+
+    if mode == "fuzzy":
+        lowered = term.lower()
+        query = query.filter(
+            or_(
+                func.lower(Product.sku).op("%")(lowered),
+                func.lower(Product.name).op("%")(lowered)
+            )
+        )
+        rank = func.greatest(
+            func.similarity(func.lower(Product.sku), lowered),
+            func.similarity(func.lower(Product.name), lowered)
+        )
+        return query, rank
+
+    raise ValueError(f"Unknown search mode: {mode}")
+
+
+def filter_products(
+    query: Query,
+    search: Optional[str] = None,
+    search_mode: str = "contains",
+    active: Optional[bool] = None
+) -> Tuple[Query, Optional[object]]:
+    """Apply the product listing filters (search term and active flag); returns (query, rank)"""
+    rank = None
+    if search:
+        query, rank = apply_search(query, search, search_mode)
+
+    if active is not None:
+        query = query.filter(Product.active == active)
+
+    return query, rank
@@ -0,0 +1,83 @@
+"""
+Per-process cache of enabled webhook subscriptions
+
+All enabled webhooks are loaded with one query and grouped by event type.
+The cache is reloaded when its TTL runs out or when the subscription
+version in Redis changes; routes/webhooks.py bumps that version after
+every create, update and delete, so changes reach every process on its
+next lookup. Looking up an event type nobody subscribes to costs no
+database round-trip.
+"""
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from config import settings
+from dependencies.database import SessionLocal
+from dependencies.redis_client import redis_client
+from models import Webhook
+
+VERSION_KEY = "webhooks:subscriptions:version"
+
+
+class WebhookTarget(NamedTuple):
+    id: Any
+    url: str
+    batch_enabled: bool
+    batch_max_events: Optional[int]
+
+
+class SubscriptionCache:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._by_event: Dict[str, List[WebhookTarget]] = {}
+        self._version: Optional[bytes] = None
+        self._expires_at = 0.0
+
+    def _load(self) -> Dict[str, List[WebhookTarget]]:
+        db = SessionLocal()
+        try:
+            rows = db.query(
+                Webhook.event_type,
+                Webhook.id,
+                Webhook.url,
+                Webhook.batch_enabled,
+                Webhook.batch_max_events
+            ).filter(Webhook.enabled == True).all()
+        finally:
+            db.close()
+
+        by_event = defaultdict(list)
+        for event_type, *target in rows:
+            by_event[event_type].append(WebhookTarget(*target))
+        return dict(by_event)
+
+    def get(self, event_type: str) -> List[WebhookTarget]:
+        """Enabled webhooks subscribed to event_type"""
+        version = redis_client.get(VERSION_KEY)
+        with self._lock:
+            if version != self._version or time.monotonic() >= self._expires_at:
+                # Read the version before loading, so a change made during the load triggers another one
+                self._by_event = self._load()
+                self._version = version
+                self._expires_at = time.monotonic() + self.ttl
+            return self._by_event.get(event_type, [])
+
+    def clear(self) -> None:
+        with self._lock:
+            self._expires_at = 0.0
+
+
+subscription_cache = SubscriptionCache(ttl=settings.webhook_subscription_ttl)
+
+
+def get_subscribers(event_type: str) -> List[WebhookTarget]:
+    return subscription_cache.get(event_type)
+
+
+def invalidate_subscriptions() -> None:
+    """Make every process reload its subscriptions on the next lookup; call after committing a change"""
+    redis_client.incr(VERSION_KEY)
+    subscription_cache.clear()
@@ -1,21 +1,119 @@
-import pandas as pd
-import httpx
-from sqlalchemy.dialects.postgresql import insert
+import json
+import os
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from celery import group
+from celery.exceptions import SoftTimeLimitExceeded
 from dependencies.celery_app import celery_app
 from dependencies.database import SessionLocal
-from models import Product, UploadTask, Webhook
-from typing import Dict, Any
+from app.ingest import normalize_chunk
+from app.readers import ImportReader, CsvReader, open_reader, split_record_ranges
+from app.loaders import get_loader, copy_products
+from app.catalog import bump_catalog_version
+from app.chunking import BlockSizer
+from app.validation import RejectedRowsFile, rejected_path, validate_chunk
+from app.exporters import EXPORT_FORMATS, iter_product_rows, iter_csv, iter_ndjson, write_xlsx
+from app.pagination import estimate_count
+from app.search import filter_products
+from app.delivery import delivery_engine
+from app.webhook_buffer import push_event, pop_events, release_flush
+from app.subscriptions import get_subscribers
+from app.circuit_breaker import open_circuits, claim_trial, record_result
+from app.progress import ProgressReporter, upload_status, publish_progress
+from config import settings
+from models import Product, UploadTask, UploadRange, ExportTask, DeleteTask, Webhook, WebhookDelivery
+from typing import Dict, Any, List, Optional
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+EXPORT_PROGRESS_ROWS = 10_000  # rows between export progress updates
 
-@celery_app.task(bind=True)
+
+def _ingest_blocks(
+    db, reader: ImportReader, start, end, ingest_mode, delta, sizer: BlockSizer, rejects: RejectedRowsFile
+):
+    """
+    Validate, normalize and load the reader's blocks between start and end
+
+    Yields (rows read, LoadStats, end position) after each block is loaded
+    and before it is committed, so callers can record progress in the same
+    transaction as the data. Rows failing validation are written to rejects
+    and counted in LoadStats.rejected; callers record rejects.size with the
+    block. Each block is sized by sizer, which is fed with the block's time
+    from read to commit once the caller resumes.
+    """
+    # Pick the ingest engine; COPY loads start with much larger blocks
+    load_products = get_loader(db, ingest_mode)
+    if sizer.next_bytes is None:
+        sizer.next_bytes = settings.copy_block_size if load_products is copy_products else settings.import_block_size
+    
+    started = time.perf_counter()
+    for df_chunk, nbytes, position in reader.blocks(start, end, sizer):
+        
+        # Set invalid rows aside, clean and prepare the rest column-wise, then load the batch
+        valid, rejected = validate_chunk(df_chunk)
+        rejects.append(rejected)
+        stats = load_products(db, normalize_chunk(valid), delta=delta)._replace(rejected=len(rejected))
+        if stats.inserted or stats.updated:
+            bump_catalog_version(db)
+        yield len(df_chunk), stats, position
+        
+        finished = time.perf_counter()
+        sizer.observe(len(df_chunk), nbytes, finished - started)
+        started = finished
+
+
+def _import_summary(upload_task: UploadTask) -> Dict[str, Any]:
+    """Webhook payload for a finished import"""
+    return {
+        'task_id': upload_task.task_id,
+        'total_rows': upload_task.processed_rows,
+        'inserted': upload_task.inserted_rows,
+        'updated': upload_task.updated_rows,
+        'unchanged': upload_task.unchanged_rows,
+        'rejected': upload_task.rejected_rows,
+        'filename': upload_task.filename
+    }
+
+
+def _publish_upload_status(db, task_id: str):
+    """Push the recorded state of an import to its progress watchers"""
+    upload_task = db.query(UploadTask).filter(UploadTask.task_id == task_id).first()
+    if upload_task:
+        publish_progress(task_id, upload_status(upload_task, None, None))
+
+
+def _mark_failed(db, task_id: str, error: Exception, range_id: Optional[str] = None):
+    """Record a failed import on its UploadTask, and on the UploadRange that failed if given"""
+    db.rollback()
+    db.query(UploadTask).filter(UploadTask.task_id == task_id).update(
+        {UploadTask.status: "failed", UploadTask.error_message: str(error)},
+        synchronize_session=False
+    )
+    if range_id is not None:
+        # A range left at "processing" would never be dispatched again on resume
+        db.query(UploadRange).filter(UploadRange.id == uuid.UUID(range_id)).update(
+            {UploadRange.status: "failed"},
+            synchronize_session=False
+        )
+    db.commit()
+    _publish_upload_status(db, task_id)
+
+
+@celery_app.task(bind=True, acks_late=True, reject_on_worker_lost=True, max_retries=settings.import_max_retries)
 def process_csv_upload(self, file_path: str, task_id: str):
     """
     Process CSV file upload asynchronously
     Handles large files efficiently with batch processing
+
+    Every committed block checkpoints its position on the UploadTask, so
+    a rerun (resume endpoint, redelivery after a worker crash, or the retry
+    scheduled at the soft time limit) continues where the last run stopped.
+    The file format is picked by name (see app.readers.IMPORT_FORMATS).
     """
     db = SessionLocal()
     
@@ -25,124 +123,749 @@ def process_csv_upload(self, file_path: str, task_id: str):
         if not upload_task:
             raise Exception(f"Upload task {task_id} not found")
         
+        if upload_task.status == "completed":
+            return {
+                'status': 'completed',
+                'total_processed': upload_task.processed_rows
+            }
+        
         upload_task.status = "processing"
-        db.commit()
+        upload_task.attempts += 1
         
-        # Read CSV file in chunks for memory efficiency
-        chunk_size = 1000
-        total_processed = 0
+        # Single pass over the file: progress is measured in bytes consumed,
+        # the exact row total is only known once the last block is parsed
+        total_bytes = os.path.getsize(file_path)
+        upload_task.total_bytes = total_bytes
+        db.commit()
         
-        # First pass: count total rows
-        try:
-            df_count = pd.read_csv(file_path, nrows=0)
-            total_rows = sum(1 for _ in open(file_path)) - 1  # Subtract header
-            upload_task.total_rows = total_rows
-            db.commit()
-        except Exception as e:
-            logger.error(f"Error counting rows: {e}")
-            total_rows = 0
-        
-        # Process CSV in chunks
-        for chunk_index, df_chunk in enumerate(pd.read_csv(file_path, chunksize=chunk_size)):
-            # Clean and prepare data
-            df_chunk.columns = df_chunk.columns.str.strip().str.lower()
+        with open_reader(file_path) as reader:
+            if upload_task.parallel and reader.splittable:
+                return _dispatch_parallel_import(db, upload_task, reader, file_path)
+            if upload_task.parallel:
+                # Compressed and columnar files cannot be split into byte ranges
+                logger.info(f"Import {task_id}: {upload_task.filename} is imported sequentially")
+                upload_task.parallel = False
+                db.commit()
             
-            # Prepare products for batch insert/update
-            products_data = []
-            for _, row in df_chunk.iterrows():
-                product_dict = {
-                    'sku': str(row.get('sku', '')).strip(),
-                    'name': str(row.get('name', '')).strip(),
-                    'description': str(row.get('description', '')) if pd.notna(row.get('description')) else None,
-                    'price': float(row.get('price', 0)) if pd.notna(row.get('price')) else None,
-                    'active': True  # Default to active
-                }
-                
-                if product_dict['sku']:  # Only process if SKU exists
-                    products_data.append(product_dict)
+            # Continue after the last committed block, if any
+            start = max(upload_task.checkpoint_offset, reader.data_start)
+            if start > reader.data_start:
+                logger.info(f"Resuming import {task_id} at position {start} (block {upload_task.checkpoint_chunk})")
+            
+            # Running totals live in locals and are written with a query-level
+            # UPDATE: touching upload_task after each commit would reload the row
+            total_read = upload_task.rows_read
+            total_processed = upload_task.processed_rows
+            inserted = upload_task.inserted_rows
+            updated = upload_task.updated_rows
+            unchanged = upload_task.unchanged_rows
+            rejected = upload_task.rejected_rows
+            chunks = upload_task.checkpoint_chunk
+            reporter = ProgressReporter(task_id, self)
+            sizer = BlockSizer(previous=upload_task.chunk_stats)
+            rejects = RejectedRowsFile(rejected_path(task_id), upload_task.rejected_bytes, reader.columns)
             
-            # Batch upsert using PostgreSQL's INSERT ... ON CONFLICT
-            if products_data:
-                stmt = insert(Product).values(products_data)
-                stmt = stmt.on_conflict_do_update(
-                    index_elements=['sku'],
-                    set_={
-                        'name': stmt.excluded.name,
-                        'description': stmt.excluded.description,
-                        'price': stmt.excluded.price,
-                    }
+            # Process the file in adaptively sized, record-aligned blocks
+            for rows_read, stats, position in _ingest_blocks(
+                db, reader, start, None, upload_task.ingest_mode, upload_task.delta, sizer, rejects
+            ):
+                offset = reader.progress(position)
+                total_read += rows_read
+                total_processed += stats.loaded
+                inserted += stats.inserted
+                updated += stats.updated
+                unchanged += stats.unchanged
+                rejected += stats.rejected
+                chunks += 1
+                
+                # Update progress and checkpoint in the same transaction as the data
+                db.query(UploadTask).filter(UploadTask.task_id == task_id).update(
+                    {
+                        UploadTask.rows_read: total_read,
+                        UploadTask.processed_rows: total_processed,
+                        UploadTask.inserted_rows: inserted,
+                        UploadTask.updated_rows: updated,
+                        UploadTask.unchanged_rows: unchanged,
+                        UploadTask.rejected_rows: rejected,
+                        UploadTask.rejected_bytes: rejects.size,
+                        UploadTask.processed_bytes: offset,
+                        UploadTask.checkpoint_offset: position,
+                        UploadTask.checkpoint_chunk: chunks,
+                        UploadTask.chunk_stats: sizer.summary(),
+                    },
+                    synchronize_session=False
                 )
-                db.execute(stmt)
                 db.commit()
+                
+                # Update Celery task state for polling clients and push it to
+                # streaming ones, at most once per progress interval
+                reporter.progress(upload_task, {
+                    'current': total_processed,
+                    'total': int(total_read * total_bytes / offset) if offset else total_read,  # estimate
+                    'percentage': int(offset / total_bytes * 100),
+                    'bytes_processed': offset,
+                    'bytes_total': total_bytes,
+                    'rejected_rows': rejected
+                })
+        
+        # Mark as completed
+        upload_task.status = "completed"
+        upload_task.total_rows = total_read
+        upload_task.processed_rows = total_processed
+        upload_task.processed_bytes = total_bytes
+        upload_task.chunk_stats = sizer.summary()
+        db.commit()
+        ProgressReporter(task_id).finish(upload_task)
+        
+        # Trigger webhooks
+        enqueue_webhook_event('product.imported', _import_summary(upload_task))
+        
+        return {
+            'status': 'completed',
+            'total_processed': total_processed
+        }
+        
+    except SoftTimeLimitExceeded as e:
+        _retry_from_checkpoint(self, db, task_id, e)
+    except Exception as e:
+        logger.error(f"Error processing CSV: {e}")
+        _mark_failed(db, task_id, e)
+        raise
+    finally:
+        db.close()
+
+
+def _retry_from_checkpoint(task, db, task_id: str, error: Exception, range_id: Optional[str] = None):
+    """Reschedule an import (or one range of it) that hit the soft time limit; it resumes from its checkpoint"""
+    db.rollback()
+    if task.request.retries < task.max_retries:
+        logger.warning(f"Import {task_id} hit the time limit, continuing from checkpoint")
+        raise task.retry(exc=error, countdown=settings.import_retry_delay)
+    _mark_failed(db, task_id, error, range_id)
+    raise error
+
+
+def is_stalled(row) -> bool:
+    """
+    True for an UploadTask or UploadRange left at "processing" by a worker that died
+
+    Every committed block moves updated_at, and the hard time limit ends
+    any run long before import_stalled_after, so a row that has not moved
+    for that long has no live worker (killed at the limit or by the OOM
+    killer) and is safe to run again.
+    """
+    if row.status != "processing":
+        return False
+    last_moved = row.updated_at or row.created_at
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.import_stalled_after)
+    return last_moved is not None and last_moved < cutoff
+
+
+def _dispatch_parallel_import(db, upload_task: UploadTask, reader: CsvReader, file_path: str):
+    """
+    Split the file into record-aligned ranges and fan them out as a group
+
+    Ranges are stored as UploadRange rows on the first run; a resumed
+    import only dispatches pending, failed and stalled ranges, ranges still
+    processing are left to the worker that holds them. The range that
+    completes last finalizes the import.
+    """
+    ranges = db.query(UploadRange).filter(
+        UploadRange.task_id == upload_task.task_id
+    ).order_by(UploadRange.start_offset).all()
+    
+    if not ranges:
+        total_bytes = upload_task.total_bytes
+        parts = max(1, min(
+            settings.parallel_import_ranges,
+            -(-(total_bytes - reader.data_start) // settings.parallel_import_min_range_size)
+        ))
+        ranges = [
+            UploadRange(task_id=upload_task.task_id, start_offset=start, end_offset=end, checkpoint_offset=start)
+            for start, end in split_record_ranges(reader.file, reader.data_start, parts)
+        ]
+        db.add_all(ranges)
+        upload_task.ranges_total = len(ranges)
+        upload_task.ranges_completed = 0
+        upload_task.processed_bytes = reader.data_start
+        db.commit()
+    
+    if all(upload_range.status == "completed" for upload_range in ranges):
+        finalize_parallel_import.delay(upload_task.task_id)
+        return {
+            'status': 'dispatched',
+            'ranges': 0
+        }
+    
+    pending = [
+        upload_range for upload_range in ranges
+        if upload_range.status in ("pending", "failed") or is_stalled(upload_range)
+    ]
+    if pending:
+        group(
+            import_csv_range.s(
+                file_path, upload_task.task_id, str(upload_range.id), reader.columns, upload_task.ingest_mode, upload_task.delta
+            )
+            for upload_range in pending
+        ).apply_async()
+    
+    logger.info(f"Import {upload_task.task_id}: dispatched {len(pending)} of {len(ranges)} ranges")
+    return {
+        'status': 'dispatched',
+        'ranges': len(pending)
+    }
+
+
+@celery_app.task(bind=True, acks_late=True, reject_on_worker_lost=True, max_retries=settings.import_max_retries)
+def import_csv_range(
+    self, file_path: str, task_id: str, range_id: str, columns, ingest_mode: str, delta: bool = False
+):
+    """
+    Import one record-aligned byte range of a CSV file
+
+    Progress is added to the parent UploadTask atomically, and the range's
+    own checkpoint is moved forward, in the same transaction as each loaded
+    block.
+    """
+    db = SessionLocal()
+    
+    try:
+        upload_range = db.query(UploadRange).filter(UploadRange.id == uuid.UUID(range_id)).first()
+        if upload_range.status == "completed":
+            return {'status': 'completed'}
+        
+        upload_range.status = "processing"
+        db.commit()
+        
+        position = upload_range.checkpoint_offset
+        reporter = ProgressReporter(task_id)
+        sizer = BlockSizer(previous=upload_range.chunk_stats)
+        rejects = RejectedRowsFile(
+            rejected_path(task_id, upload_range.start_offset), upload_range.rejected_bytes, columns
+        )
+        with CsvReader(file_path, columns) as reader:
+            for rows_read, stats, offset in _ingest_blocks(
+                db, reader, position, upload_range.end_offset, ingest_mode, delta, sizer, rejects
+            ):
+                db.query(UploadTask).filter(UploadTask.task_id == task_id).update(
+                    {
+                        UploadTask.rows_read: UploadTask.rows_read + rows_read,
+                        UploadTask.processed_rows: UploadTask.processed_rows + stats.loaded,
+                        UploadTask.inserted_rows: UploadTask.inserted_rows + stats.inserted,
+                        UploadTask.updated_rows: UploadTask.updated_rows + stats.updated,
+                        UploadTask.unchanged_rows: UploadTask.unchanged_rows + stats.unchanged,
+                        UploadTask.rejected_rows: UploadTask.rejected_rows + stats.rejected,
+                        UploadTask.processed_bytes: UploadTask.processed_bytes + (offset - position),
+                    },
+                    synchronize_session=False
+                )
+                upload_range.checkpoint_offset = offset
+                upload_range.rejected_bytes = rejects.size
+                upload_range.chunk_stats = sizer.summary()
+                db.commit()
+                position = offset
+                if reporter.due():
+                    _publish_upload_status(db, task_id)
+        
+        upload_range.status = "completed"
+        upload_range.chunk_stats = sizer.summary()
+        db.query(UploadTask).filter(UploadTask.task_id == task_id).update(
+            {UploadTask.ranges_completed: UploadTask.ranges_completed + 1},
+            synchronize_session=False
+        )
+        db.commit()
+        
+        # Counted after our own commit, so at least the last range to finish sees none left
+        remaining = db.query(UploadRange).filter(
+            UploadRange.task_id == task_id,
+            UploadRange.status != "completed"
+        ).count()
+        if not remaining:
+            finalize_parallel_import.delay(task_id)
+        
+        return {'status': 'completed'}
+        
+    except SoftTimeLimitExceeded as e:
+        _retry_from_checkpoint(self, db, task_id, e, range_id)
+    except Exception as e:
+        logger.error(f"Error importing range {range_id} of {task_id}: {e}")
+        _mark_failed(db, task_id, e, range_id)
+        raise
+    finally:
+        db.close()
+
+
+@celery_app.task
+def finalize_parallel_import(task_id: str):
+    """
+    Record exact totals of a parallel import and fire the import webhook once
+
+    Two ranges finishing together may both call this; the conditional
+    update lets only the first one complete the import.
+    """
+    db = SessionLocal()
+    
+    try:
+        claimed = db.query(UploadTask).filter(
+            UploadTask.task_id == task_id,
+            UploadTask.status != "completed"
+        ).update(
+            {
+                UploadTask.status: "completed",
+                UploadTask.total_rows: UploadTask.rows_read,
+                UploadTask.processed_bytes: UploadTask.total_bytes,
+            },
+            synchronize_session=False
+        )
+        db.commit()
+        if not claimed:
+            return {'status': 'completed'}
+        
+        upload_task = db.query(UploadTask).filter(UploadTask.task_id == task_id).first()
+        ProgressReporter(task_id).finish(upload_task)
+        
+        # Trigger webhooks
+        enqueue_webhook_event('product.imported', _import_summary(upload_task))
+        
+        return {
+            'status': 'completed',
+            'total_processed': upload_task.processed_rows
+        }
+    finally:
+        db.close()
+
+
+@celery_app.task(bind=True)
+def export_products_task(self, task_id: str):
+    """
+    Write a product export to the exports directory
+
+    Rows stream from a server-side cursor straight into the output file, so
+    the worker's memory stays flat. The file is written under a temporary
+    name and moved into place once complete.
+    """
+    db = SessionLocal()
+    
+    try:
+        export_task = db.query(ExportTask).filter(ExportTask.task_id == task_id).first()
+        if not export_task:
+            raise Exception(f"Export task {task_id} not found")
+        
+        query, _ = filter_products(
+            db.query(Product), export_task.search, export_task.search_mode, export_task.active
+        )
+        export_task.status = "processing"
+        export_task.total_rows = estimate_count(db, query)
+        db.commit()
+        
+        extension, _ = EXPORT_FORMATS[export_task.export_format]
+        os.makedirs(settings.export_dir, exist_ok=True)
+        file_path = os.path.join(settings.export_dir, f"{task_id}.{extension}")
+        partial_path = f"{file_path}.part"
+        
+        # Progress goes to the result backend only: committing the session
+        # would close the server-side cursor the rows are streamed from
+        total_rows = export_task.total_rows
+        written = 0
+        
+        def tracked(rows):
+            nonlocal written
+            for row in rows:
+                yield row
+                written += 1
+                if written % EXPORT_PROGRESS_ROWS == 0:
+                    self.update_state(
+                        state='PROGRESS',
+                        meta={
+                            'current': written,
+                            'total': max(total_rows, written),
+                            'percentage': min(int(written / total_rows * 100), 99) if total_rows > 0 else 0
+                        }
+                    )
+        
+        rows = tracked(iter_product_rows(db, query))
+        if export_task.export_format == "excel":
+            write_xlsx(rows, partial_path)
+        else:
+            encode = iter_csv if export_task.export_format == "csv" else iter_ndjson
+            with open(partial_path, 'wb') as f:
+                for chunk in encode(rows):
+                    f.write(chunk)
+        os.replace(partial_path, file_path)
+        
+        # Mark as completed and expire exports of the same filter made from older catalog versions
+        export_task.status = "completed"
+        export_task.total_rows = written
+        export_task.processed_rows = written
+        export_task.file_path = file_path
+        
+        stale = db.query(ExportTask).filter(
+            ExportTask.filter_key == export_task.filter_key,
+            ExportTask.catalog_version < export_task.catalog_version,
+            ExportTask.status == "completed"
+        ).all()
+        for old in stale:
+            if old.file_path and os.path.exists(old.file_path):
+                os.remove(old.file_path)
+            old.status = "expired"
+        db.commit()
+        
+        return {
+            'status': 'completed',
+            'total_processed': written
+        }
+        
+    except Exception as e:
+        logger.error(f"Error exporting products: {e}")
+        db.rollback()
+        db.query(ExportTask).filter(ExportTask.task_id == task_id).update(
+            {ExportTask.status: "failed", ExportTask.error_message: str(e)},
+            synchronize_session=False
+        )
+        db.commit()
+        raise
+    finally:
+        db.close()
+
+
+@celery_app.task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def bulk_delete_products_task(self, task_id: str):
+    """
+    Delete the products matching a delete task's filters in key-range batches
+
+    Each batch takes the next bulk_delete_batch_size matching ids in id
+    order after the last deleted one, deletes them and records progress in
+    a short transaction of its own, so locks are held briefly and the task
+    can pick up where it stopped if the worker is lost.
+    """
+    db = SessionLocal()
+    
+    try:
+        delete_task = db.query(DeleteTask).filter(DeleteTask.task_id == task_id).first()
+        if not delete_task:
+            raise Exception(f"Delete task {task_id} not found")
+        if delete_task.status == "completed":
+            return {'status': 'completed', 'total_processed': delete_task.deleted_rows}
+        
+        query, _ = filter_products(
+            db.query(Product), delete_task.search, delete_task.search_mode, delete_task.active
+        )
+        delete_task.status = "processing"
+        if not delete_task.deleted_rows:
+            delete_task.total_rows = estimate_count(db, query)
+        db.commit()
+        
+        while True:
+            batch = query.with_entities(Product.id).order_by(Product.id)
+            if delete_task.last_product_id is not None:
+                batch = batch.filter(Product.id > delete_task.last_product_id)
+            ids = [row[0] for row in batch.limit(settings.bulk_delete_batch_size).all()]
+            if not ids:
+                break
             
-            total_processed += len(products_data)
-            
-            # Update progress
-            upload_task.processed_rows = total_processed
+            deleted = db.query(Product).filter(Product.id.in_(ids)).delete(synchronize_session=False)
+            delete_task.deleted_rows += deleted
+            delete_task.last_product_id = ids[-1]
+            if deleted:
+                bump_catalog_version(db)
             db.commit()
             
-            # Update Celery task state for real-time progress
+            total = max(delete_task.total_rows, delete_task.deleted_rows)
             self.update_state(
                 state='PROGRESS',
                 meta={
-                    'current': total_processed,
-                    'total': total_rows,
-                    'percentage': int((total_processed / total_rows * 100)) if total_rows > 0 else 0
+                    'current': delete_task.deleted_rows,
+                    'total': total,
+                    'percentage': min(int(delete_task.deleted_rows / total * 100), 99) if total > 0 else 0
                 }
             )
         
-        # Mark as completed
-        upload_task.status = "completed"
-        upload_task.processed_rows = total_processed
+        delete_task.status = "completed"
+        delete_task.total_rows = delete_task.deleted_rows
         db.commit()
         
         # Trigger webhooks
-        trigger_webhooks_async.delay('product.imported', {
-            'task_id': task_id,
-            'total_rows': total_processed,
-            'filename': upload_task.filename
+        enqueue_webhook_event('products.bulk_deleted', {
+            'count': delete_task.deleted_rows,
+            'search': delete_task.search,
+            'active': delete_task.active
         })
         
         return {
             'status': 'completed',
-            'total_processed': total_processed
+            'total_processed': delete_task.deleted_rows
         }
         
     except Exception as e:
-        logger.error(f"Error processing CSV: {e}")
-        upload_task.status = "failed"
-        upload_task.error_message = str(e)
+        logger.error(f"Error deleting products: {e}")
+        db.rollback()
+        db.query(DeleteTask).filter(DeleteTask.task_id == task_id).update(
+            {DeleteTask.status: "failed", DeleteTask.error_message: str(e)},
+            synchronize_session=False
+        )
         db.commit()
         raise
     finally:
         db.close()
 
 
+def _retry_delay(attempts: int) -> float:
+    """Exponential backoff with jitter for the retry after the given number of failed attempts"""
+    delay = min(settings.webhook_retry_base_delay * 2 ** (attempts - 1), settings.webhook_retry_max_delay)
+    return random.uniform(delay / 2, delay)
+
+
+def _postpone(delivery: WebhookDelivery, now: datetime) -> None:
+    """Reschedule a delivery that was not attempted because its URL's circuit is open"""
+    delivery.status = "retrying"
+    delivery.last_error = "Circuit open"
+    delivery.next_attempt_at = now + timedelta(seconds=settings.webhook_breaker_cooldown)
+
+
+def _record_attempt(delivery: WebhookDelivery, result, now: datetime) -> None:
+    """Store the outcome of one attempt on the delivery log row; the engine already fed the circuit breaker"""
+    if result.skipped:
+        _postpone(delivery, now)
+        return
+    
+    delivery.attempts = (delivery.attempts or 0) + 1
+    delivery.last_status_code = result.status_code
+    delivery.last_latency_ms = result.latency_ms
+    delivery.last_error = result.error or (None if result.ok else f"HTTP {result.status_code}")
+    
+    if result.ok:
+        delivery.status = "delivered"
+        delivery.delivered_at = now
+        delivery.next_attempt_at = None
+        return
+    
+    if delivery.attempts >= settings.webhook_max_attempts:
+        delivery.status = "dead"
+        delivery.next_attempt_at = None
+        logger.error(f"Webhook delivery {delivery.id} is dead after {delivery.attempts} attempts")
+    else:
+        delivery.status = "retrying"
+        delivery.next_attempt_at = now + timedelta(seconds=_retry_delay(delivery.attempts))
+
+
+def _deliver_events(
+    db, event_type: str, payloads: List[Dict[str, Any]], batched: Optional[bool] = None
+) -> List[Dict[str, Any]]:
+    """
+    Deliver events to every enabled webhook subscribed to event_type
+
+    batched limits the subscribers to those with (True) or without (False)
+    batching enabled; None delivers to all of them.
+
+    Webhooks with batching enabled get the events as arrays of up to
+    batch_max_events; the others get one POST per event. All deliveries go
+    out concurrently through the worker's pooled delivery engine, except
+    those to URLs with an open circuit, which are not attempted, also when
+    the circuit opens while the deliveries are going out. A half-open URL
+    gets one trial delivery if this run claims the trial. Every delivery is
+    written to the delivery log, and failed or skipped ones are scheduled
+    for retry.
+    """
+    webhooks = [
+        webhook for webhook in get_subscribers(event_type)
+        if batched is None or bool(webhook.batch_enabled) == batched
+    ]
+    if not webhooks:
+        return []
+    
+    deliveries = []
+    for webhook in webhooks:
+        if webhook.batch_enabled:
+            size = webhook.batch_max_events or settings.webhook_batch_max_events
+            for i in range(0, len(payloads), size):
+                batch = payloads[i:i + size]
+                deliveries.append((webhook, {'event': event_type, 'count': len(batch), 'data': batch}))
+        else:
+            deliveries.extend((webhook, {'event': event_type, 'data': payload}) for payload in payloads)
+    
+    # Round-trip bodies through JSON so the log stores exactly what is sent
+    deliveries = [(webhook, json.loads(json.dumps(body, default=str))) for webhook, body in deliveries]
+    
+    # Half-open URLs whose trial we claim get exactly one delivery, the trial
+    open_urls = open_circuits(webhook.url for webhook, _ in deliveries)
+    trials = {url for url in open_urls if claim_trial(url)}
+    sendable = []
+    for webhook, _ in deliveries:
+        sendable.append(webhook.url not in open_urls or webhook.url in trials)
+        trials.discard(webhook.url)
+    to_send = [delivery for delivery, send in zip(deliveries, sendable) if send]
+    results = delivery_engine.deliver_each(
+        ((webhook.id, webhook.url, body) for webhook, body in to_send),
+        on_result=record_result
+    )
+    
+    now = datetime.now(timezone.utc)
+    log = []
+    for webhook, body in deliveries:
+        log.append(WebhookDelivery(
+            id=uuid.uuid4(),
+            webhook_id=webhook.id,
+            event_type=event_type,
+            url=webhook.url,
+            body=body,
+            status="pending",
+            attempts=0
+        ))
+    
+    sent = [delivery for delivery, send in zip(log, sendable) if send]
+    for delivery, result in zip(sent, results):
+        _record_attempt(delivery, result, now)
+    for delivery, send in zip(log, sendable):
+        if not send:
+            _postpone(delivery, now)
+    db.add_all(log)
+    
+    outcomes = {
+        result.webhook_id: {
+            'id': result.webhook_id,
+            'last_status_code': result.status_code,
+            'last_latency_ms': result.latency_ms,
+            'last_error': result.error,
+            'last_delivered_at': now
+        }
+        for result in results
+        if not result.skipped
+    }
+    db.bulk_update_mappings(Webhook, list(outcomes.values()))
+    db.commit()
+    
+    for delivery in log:
+        if delivery.status == "retrying":
+            retry_webhook_delivery.apply_async(
+                args=[str(delivery.id)],
+                eta=delivery.next_attempt_at
+            )
+    
+    return [
+        {
+            'delivery_id': str(delivery.id),
+            'webhook_id': str(delivery.webhook_id),
+            'status': delivery.status,
+            'status_code': delivery.last_status_code,
+            'latency_ms': delivery.last_latency_ms,
+            'error': delivery.last_error
+        }
+        for delivery in log
+    ]
+
+
+@celery_app.task(bind=True, max_retries=None)
+def retry_webhook_delivery(self, delivery_id: str):
+    """
+    Attempt a logged webhook delivery again
+
+    Reschedules itself with exponential backoff until the delivery succeeds
+    or reaches webhook_max_attempts, at which point it is dead-lettered and
+    can only be sent again through the replay endpoint. While the circuit
+    for the URL is open the attempt is postponed without being counted.
+    """
+    db = SessionLocal()
+    
+    try:
+        delivery = db.query(WebhookDelivery).filter(WebhookDelivery.id == uuid.UUID(delivery_id)).first()
+        if not delivery or delivery.status != "retrying":
+            return {'status': delivery.status if delivery else 'missing'}
+        
+        webhook = db.query(Webhook).filter(Webhook.id == delivery.webhook_id).first()
+        if not webhook:
+            delivery.status = "dead"
+            delivery.last_error = "Webhook was deleted"
+            db.commit()
+            return {'status': delivery.status}
+        
+        now = datetime.now(timezone.utc)
+        if open_circuits([delivery.url]) and not claim_trial(delivery.url):
+            delivery.next_attempt_at = now + timedelta(seconds=settings.webhook_breaker_cooldown)
+            db.commit()
+            raise self.retry(countdown=settings.webhook_breaker_cooldown)
+        
+        result = delivery_engine.deliver_each(
+            [(delivery.webhook_id, delivery.url, delivery.body)], on_result=record_result
+        )[0]
+        _record_attempt(delivery, result, now)
+        webhook.last_status_code = result.status_code
+        webhook.last_latency_ms = result.latency_ms
+        webhook.last_error = result.error
+        webhook.last_delivered_at = now
+        db.commit()
+        
+        if delivery.status == "retrying":
+            raise self.retry(eta=delivery.next_attempt_at)
+        
+        return {
+            'status': delivery.status,
+            'attempts': delivery.attempts,
+            'status_code': delivery.last_status_code
+        }
+    finally:
+        db.close()
+
+
 @celery_app.task
-def trigger_webhooks_async(event_type: str, payload: Dict[str, Any]):
+def trigger_webhooks_async(event_type: str, payload: Dict[str, Any], batched: Optional[bool] = None):
     """
     Trigger webhooks asynchronously
     """
     db = SessionLocal()
     
     try:
-        webhooks = db.query(Webhook).filter(
-            Webhook.event_type == event_type,
-            Webhook.enabled == True
-        ).all()
-        
-        for webhook in webhooks:
-            try:
-                with httpx.Client(timeout=10.0) as client:
-                    response = client.post(
-                        webhook.url,
-                        json={
-                            'event': event_type,
-                            'data': payload
-                        }
-                    )
-                    logger.info(f"Webhook {webhook.id} triggered: {response.status_code}")
-            except Exception as e:
-                logger.error(f"Error triggering webhook {webhook.id}: {e}")
+        return _deliver_events(db, event_type, [payload], batched)
+    finally:
+        db.close()
+
+
+@celery_app.task
+def flush_webhook_events(event_type: str):
+    """
+    Deliver the events buffered for event_type since the last flush to the
+    webhooks with batching enabled
+    """
+    release_flush(event_type)
+    db = SessionLocal()
+    
+    try:
+        results = []
+        while True:
+            payloads = pop_events(event_type, settings.webhook_batch_max_events)
+            if not payloads:
+                break
+            results.extend(_deliver_events(db, event_type, payloads, batched=True))
+        return results
     finally:
         db.close()
+
+
+def enqueue_webhook_event(event_type: str, payload: Dict[str, Any]) -> None:
+    """
+    Queue an event for webhook delivery
+
+    Coalescing is opt-in per webhook: for subscribers with batch_enabled
+    and webhook_coalesce_window_ms set, events are buffered in Redis and
+    one flush task per event type and window delivers all of them (sooner
+    once webhook_batch_max_events have piled up). Every other subscriber
+    gets its own task per event right away, as does everyone with a window
+    of 0. Events without subscribers are dropped here.
+    """
+    # Nobody listening: no broker task, no buffering, no database query
+    subscribers = get_subscribers(event_type)
+    if not subscribers:
+        return
+    
+    window_ms = settings.webhook_coalesce_window_ms
+    batching = [bool(webhook.batch_enabled) for webhook in subscribers]
+    if window_ms <= 0 or not any(batching):
+        trigger_webhooks_async.delay(event_type, payload)
+        return
+    if not all(batching):
+        trigger_webhooks_async.delay(event_type, payload, batched=False)
+    
+    buffered, schedule = push_event(event_type, payload, window_ms)
+    if schedule:
+        flush_webhook_events.apply_async(args=[event_type], countdown=window_ms / 1000)
+    elif buffered % settings.webhook_batch_max_events == 0:
+        flush_webhook_events.delay(event_type)
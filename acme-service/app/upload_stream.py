@@ -0,0 +1,158 @@
+"""
+Streaming multipart upload receiver
+
+Parses a multipart/form-data request body as it arrives and writes the
+file field straight to its final path in large chunks, hashing the
+content in the same pass. Nothing is spooled to a temporary file first,
+and the upload is aborted as soon as it grows past the size limit.
+"""
+import hashlib
+import os
+from typing import BinaryIO, Callable, Optional
+
+import anyio
+from fastapi import HTTPException, Request
+from multipart.exceptions import MultipartParseError
+from multipart.multipart import MultipartParser, parse_options_header
+
+WRITE_SIZE = 1024 * 1024  # flush to disk in 1 MiB chunks
+ENVELOPE_ALLOWANCE = 64 * 1024  # multipart boundaries and part headers
+
+
+class StreamedFile:
+    """A file field that has been written to disk"""
+
+    def __init__(self, filename: str, path: str, size: int, sha256: str):
+        self.filename = filename
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+
+
+class _FileFieldReceiver:
+    """multipart parser callbacks that collect one file field"""
+
+    def __init__(self, field_name: str, open_destination: Callable[[str], str], max_size: int):
+        self.field_name = field_name
+        self.open_destination = open_destination
+        self.max_size = max_size
+
+        self.filename: Optional[str] = None
+        self.path: Optional[str] = None
+        self.file: Optional[BinaryIO] = None
+        self.size = 0
+        self.hasher = hashlib.sha256()
+        self.pending = bytearray()
+
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+        self._in_file = False
+
+    def callbacks(self):
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+        }
+
+    def on_part_begin(self) -> None:
+        self._disposition = b""
+        self._in_file = False
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def on_header_end(self) -> None:
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._disposition)
+        name = options.get(b"name", b"").decode("utf-8", errors="replace")
+        if name != self.field_name or b"filename" not in options or self.file is not None:
+            return
+
+        self.filename = os.path.basename(options[b"filename"].decode("utf-8", errors="replace"))
+        self.path = self.open_destination(self.filename)
+        self.file = open(self.path, "wb")
+        self._in_file = True
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if not self._in_file:
+            return
+        self.size += end - start
+        if self.size > self.max_size:
+            raise HTTPException(status_code=413, detail="File exceeds maximum upload size")
+        self.pending += data[start:end]
+
+    def on_part_end(self) -> None:
+        self._in_file = False
+
+    def flush(self) -> None:
+        """Hash and write buffered bytes; called in a worker thread"""
+        data = bytes(self.pending)
+        self.pending.clear()
+        self.hasher.update(data)
+        self.file.write(data)
+
+    def discard(self) -> None:
+        if self.file is not None:
+            self.file.close()
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+async def receive_file(
+    request: Request,
+    field_name: str,
+    open_destination: Callable[[str], str],
+    max_size: int
+) -> StreamedFile:
+    """
+    Stream one file field of a multipart request to disk
+
+    open_destination receives the client filename (already stripped of any
+    directory part) and returns the path to write to; it may raise
+    HTTPException to reject the upload before any content is stored.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload")
+
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_size + ENVELOPE_ALLOWANCE:
+        raise HTTPException(status_code=413, detail="File exceeds maximum upload size")
+
+    receiver = _FileFieldReceiver(field_name, open_destination, max_size)
+    parser = MultipartParser(params[b"boundary"], receiver.callbacks())
+
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            if len(receiver.pending) >= WRITE_SIZE:
+                await anyio.to_thread.run_sync(receiver.flush)
+        parser.finalize()
+
+        if receiver.file is None:
+            raise HTTPException(status_code=400, detail=f"Missing file field '{field_name}'")
+
+        await anyio.to_thread.run_sync(receiver.flush)
+        receiver.file.close()
+    except MultipartParseError as e:
+        receiver.discard()
+        raise HTTPException(status_code=400, detail=f"Malformed multipart body: {e}")
+    except BaseException:
+        receiver.discard()
+        raise
+
+    return StreamedFile(receiver.filename, receiver.path, receiver.size, receiver.hasher.hexdigest())
@@ -0,0 +1,97 @@
+"""
+Column-wise validation of CSV chunks and the rejected-rows report
+
+validate_chunk splits a raw chunk into rows that can be loaded and rows
+that cannot, instead of letting one bad value fail the whole import.
+Rejected rows keep their raw values plus an error column, so the report
+can be fixed and uploaded again as is.
+
+The report is appended to per committed block. Its size is checkpointed
+in the same transaction as the block, and a resumed run truncates the
+file back to that size, so rows of an uncommitted block are never
+reported twice. Every block is written with the same columns, the
+source's plus error, even when a block (an NDJSON one) lacks some.
+Parallel imports write one part per range; the download endpoint
+concatenates them.
+"""
+import os
+from typing import Iterable, Optional, Tuple
+
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+from config import settings
+from models import Product
+
+MAX_LENGTHS = {
+    'sku': Product.__table__.c.sku.type.length,
+    'name': Product.__table__.c.name.type.length,
+}
+
+ERROR_COLUMN = 'error'
+
+
+def validate_chunk(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Split a raw chunk into (valid rows, rejected rows)
+
+    Checks required SKU and name, their maximum lengths in products and a
+    numeric price (a typed numeric column passes as is). Rejected rows
+    carry every failed check in the error column. Column names are
+    normalized as in normalize_chunk.
+    """
+    df.columns = df.columns.str.strip().str.lower()
+    errors = pd.Series('', index=df.index, dtype=object)
+
+    def check(failed: pd.Series, message: str):
+        nonlocal errors
+        errors = errors.mask(failed, errors + '; ' + message)
+
+    for column, max_length in MAX_LENGTHS.items():
+        if column not in df.columns:
+            check(pd.Series(True, index=df.index), f'{column} is required')
+            continue
+        values = df[column].str.strip()
+        check(values.isna() | (values == ''), f'{column} is required')
+        check(values.str.len() > max_length, f'{column} is longer than {max_length} characters')
+
+    if 'price' in df.columns and not is_numeric_dtype(df['price']):
+        raw = df['price'].str.strip()
+        given = raw.notna() & (raw != '')
+        check(given & pd.to_numeric(raw.where(given), errors='coerce').isna(), 'price is not a number')
+
+    invalid = errors != ''
+    if not invalid.any():
+        return df, df.iloc[0:0]
+    rejected = df[invalid].assign(**{ERROR_COLUMN: errors[invalid].str.slice(2)})
+    return df[~invalid], rejected
+
+
+def rejected_path(task_id: str, part: Optional[int] = None) -> str:
+    """Report file of an import, or of one range (by start offset) of a parallel import"""
+    name = task_id if part is None else f"{task_id}.{part:015d}"
+    return os.path.join(settings.rejected_dir, f"{name}.csv")
+
+
+class RejectedRowsFile:
+    """Append-only CSV of rejected rows with the source columns plus error; size is the committed length"""
+
+    def __init__(self, path: str, committed_size: int, columns: Iterable[str]):
+        self.path = path
+        self.size = committed_size or 0
+        names = [str(column).strip().lower() for column in columns]
+        self.columns = list(dict.fromkeys(name for name in names if name != ERROR_COLUMN)) + [ERROR_COLUMN]
+
+        # Drop rows written by an attempt that did not commit them
+        if os.path.exists(self.path) and os.path.getsize(self.path) > self.size:
+            os.truncate(self.path, self.size)
+
+    def append(self, rejected: pd.DataFrame) -> None:
+        """Write rejected rows; record self.size in the transaction that commits the block"""
+        if rejected.empty:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        data = rejected.reindex(columns=self.columns).to_csv(header=self.size == 0, index=False).encode('utf-8')
+        with open(self.path, 'ab') as f:
+            f.write(data)
+        self.size += len(data)
@@ -0,0 +1,41 @@
+"""
+Redis buffer of pending webhook events
+
+Events are appended to one list per event type. The first event of a
+window also claims a flush marker (SET NX with the window as expiry), and
+only that caller schedules the flush task, so a burst of N events costs
+one broker task instead of N.
+"""
+import json
+from typing import Any, Dict, List, Tuple
+
+from dependencies.redis_client import redis_client
+
+EVENTS_KEY = "webhooks:events:{event_type}"
+FLUSH_KEY = "webhooks:flush:{event_type}"
+
+
+def push_event(event_type: str, payload: Dict[str, Any], window_ms: int) -> Tuple[int, bool]:
+    """
+    Buffer an event; returns (events now buffered, whether the caller must schedule a flush)
+    """
+    pipe = redis_client.pipeline()
+    pipe.rpush(EVENTS_KEY.format(event_type=event_type), json.dumps(payload, default=str))
+    pipe.set(FLUSH_KEY.format(event_type=event_type), 1, nx=True, px=max(window_ms * 2, 1000))
+    buffered, claimed = pipe.execute()
+    return buffered, bool(claimed)
+
+
+def release_flush(event_type: str) -> None:
+    """Let the next buffered event schedule a new flush; called before draining"""
+    redis_client.delete(FLUSH_KEY.format(event_type=event_type))
+
+
+def pop_events(event_type: str, limit: int) -> List[Dict[str, Any]]:
+    """Atomically take up to limit buffered events, oldest first"""
+    key = EVENTS_KEY.format(event_type=event_type)
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.lrange(key, 0, limit - 1)
+    pipe.ltrim(key, limit, -1)
+    raw, _ = pipe.execute()
+    return [json.loads(item) for item in raw]
@@ -0,0 +1,119 @@
+"""
+Async vs Sync Read Endpoint Benchmark
+Starts the API twice, once with ASYNC_READS=false (sync handlers on the
+threadpool with psycopg2) and once with ASYNC_READS=true (async handlers
+on asyncpg), and drives the read-heavy endpoints with concurrent clients.
+Reports requests/s and p50/p99 latency per endpoint.
+
+Uses the database configured in .env, which should already contain
+products (e.g. imported from SAMPLE_CSV_GENERATOR output). Run from the
+acme-service directory:
+    python benchmarks/async_reads_benchmark.py [concurrency] [requests_per_endpoint]
+"""
+
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+HOST = "127.0.0.1"
+PORT = 8765
+BASE_URL = f"http://{HOST}:{PORT}"
+
+
+def start_server(async_reads: bool) -> subprocess.Popen:
+    env = dict(os.environ, ASYNC_READS="true" if async_reads else "false")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", HOST, "--port", str(PORT), "--log-level", "warning"],
+        env=env,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{BASE_URL}/api/health").status_code == 200:
+                return server
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("API did not start")
+
+
+async def load(client: httpx.AsyncClient, path: str, concurrency: int, total: int):
+    latencies = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                response = await client.get(path)
+                ok = response.status_code == 200
+            except httpx.HTTPError:
+                # e.g. the server dropping the connection when its pool is exhausted
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            if not ok:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "rps": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)] * 1000,
+        "errors": errors
+    }
+
+
+async def run_endpoints(concurrency: int, total: int) -> dict:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=BASE_URL, limits=limits, timeout=60) as client:
+        page = (await client.get("/api/products", params={"limit": 1, "count": "none"})).json()
+        if not page["items"]:
+            raise RuntimeError("No products in the database, import a CSV first")
+        product_id = page["items"][0]["id"]
+
+        endpoints = {
+            "list (count=estimated)": "/api/products?limit=50&count=estimated",
+            "list (count=exact)": "/api/products?limit=50&count=exact",
+            "product detail": f"/api/products/{product_id}",
+            "webhooks": "/api/webhooks",
+        }
+
+        # Warm up pools on both sides
+        await load(client, endpoints["product detail"], concurrency, concurrency * 2)
+        return {name: await load(client, path, concurrency, total) for name, path in endpoints.items()}
+
+
+if __name__ == '__main__':
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    total = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    results = {}
+    for label, async_reads in (("sync", False), ("async", True)):
+        server = start_server(async_reads)
+        try:
+            results[label] = asyncio.run(run_endpoints(concurrency, total))
+        finally:
+            server.terminate()
+            server.wait()
+
+    print("=" * 78)
+    print(f"Read endpoints ({concurrency} concurrent clients, {total:,} requests per endpoint)")
+    print("=" * 78)
+    print(f"{'endpoint':<24} {'mode':<6} {'req/s':>10} {'p50 ms':>10} {'p99 ms':>10} {'errors':>8}")
+    for name in results["sync"]:
+        for label in ("sync", "async"):
+            r = results[label][name]
+            print(f"{name:<24} {label:<6} {r['rps']:>10,.0f} {r['p50_ms']:>10.1f} {r['p99_ms']:>10.1f} {r['errors']:>8}")
+        print("-" * 78)
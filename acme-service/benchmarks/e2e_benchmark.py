@@ -0,0 +1,460 @@
+"""
+End-to-end Import and Read Benchmark
+Generates datasets with SAMPLE_CSV_GENERATOR (10k, 1M and 10M rows by
+default), imports each one with process_csv_upload run eagerly in this
+process, then drives the list, search and export endpoints through the
+ASGI test client against the imported catalog.
+
+Per import it reports rows/s, peak RSS and wall and database time per
+stage (read, validate, normalize, load, checkpoint = progress bookkeeping
+and commit). Database time is measured on the psycopg2 connections, so it
+covers statements, COPY, fetches and commits. Per endpoint it reports
+requests/s, p50/p99 latency and errors; the export also reports rows/s.
+
+Results are written as JSON (--output). Pass an earlier results file as
+--baseline to print the change of every throughput figure and exit with
+status 1 when one dropped by more than --tolerance.
+
+No Celery worker or broker is needed, but PostgreSQL and Redis from .env
+are. The products table is EMPTIED before every import, so point .env at
+a scratch database. The product cache is off unless PRODUCT_CACHE_BACKEND
+is set, so reads hit the database. Run from the acme-service directory:
+    python benchmarks/e2e_benchmark.py [--sizes 10k,1m,10m] [--mode upsert|copy]
+        [--requests 200] [--data-dir DIR] [--output FILE] [--baseline FILE]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+os.environ.setdefault("PRODUCT_CACHE_BACKEND", "none")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psycopg2.extensions  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import create_engine, text  # noqa: E402
+
+import app.loaders as loaders  # noqa: E402
+import app.tasks as tasks  # noqa: E402
+import main  # noqa: E402
+from SAMPLE_CSV_GENERATOR import generate_sample_csv  # noqa: E402
+from config import settings  # noqa: E402
+from dependencies.celery_app import celery_app  # noqa: E402
+from dependencies.database import SessionLocal, init_db  # noqa: E402
+from models import UploadTask  # noqa: E402
+
+STAGES = ("read", "validate", "normalize", "load", "checkpoint")
+DEFAULT_SIZES = "10k,1m,10m"
+RSS_SAMPLE_SECONDS = 0.02
+LIST_LIMIT = 50
+
+
+# --- Measurement -----------------------------------------------------------
+
+class StageClock:
+    """Wall and database seconds per import stage; the current stage is the innermost timed call"""
+
+    def __init__(self):
+        self.active = False
+        self.stage = None
+        self.wall = {}
+        self.db = {}
+
+    def start(self):
+        self.active = True
+        self.stage = None
+        self.wall = dict.fromkeys(STAGES, 0.0)
+        self.db = dict.fromkeys(STAGES, 0.0)
+
+    def stop(self):
+        self.active = False
+
+    @contextlib.contextmanager
+    def timed(self, stage):
+        outer, self.stage = self.stage, stage
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.wall[stage] += time.perf_counter() - start
+            self.stage = outer
+
+    def add_db(self, seconds):
+        if self.active:
+            # Round-trips outside a timed call happen between blocks: checkpoint and commit
+            self.db[self.stage or "checkpoint"] += seconds
+
+
+clock = StageClock()
+
+
+def _timed_method(base, name):
+    def method(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return getattr(base, name)(self, *args, **kwargs)
+        finally:
+            clock.add_db(time.perf_counter() - start)
+    return method
+
+
+class TimedCursor(psycopg2.extensions.cursor):
+    """Adds the time of every round-trip to the current stage"""
+
+    execute = _timed_method(psycopg2.extensions.cursor, "execute")
+    executemany = _timed_method(psycopg2.extensions.cursor, "executemany")
+    copy_expert = _timed_method(psycopg2.extensions.cursor, "copy_expert")
+    fetchone = _timed_method(psycopg2.extensions.cursor, "fetchone")
+    fetchmany = _timed_method(psycopg2.extensions.cursor, "fetchmany")
+    fetchall = _timed_method(psycopg2.extensions.cursor, "fetchall")
+
+
+class TimedConnection(psycopg2.extensions.connection):
+    commit = _timed_method(psycopg2.extensions.connection, "commit")
+    rollback = _timed_method(psycopg2.extensions.connection, "rollback")
+
+    def cursor(self, *args, **kwargs):
+        kwargs.setdefault("cursor_factory", TimedCursor)
+        return super().cursor(*args, **kwargs)
+
+
+class PeakRss:
+    """Peak resident set size while the block runs, sampled from /proc (ru_maxrss elsewhere)"""
+
+    def __enter__(self):
+        self.peak = 0
+        self._stop = threading.Event()
+        self._statm = "/proc/self/statm" if os.path.exists("/proc/self/statm") else None
+        if self._statm:
+            self._thread = threading.Thread(target=self._sample, daemon=True)
+            self._thread.start()
+        return self
+
+    def _rss(self):
+        with open(self._statm) as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self._rss())
+            self._stop.wait(RSS_SAMPLE_SECONDS)
+
+    def __exit__(self, *exc):
+        if self._statm:
+            self._stop.set()
+            self._thread.join()
+            self.peak = max(self.peak, self._rss())
+        else:
+            # Process-wide peak; kilobytes on Linux, bytes on macOS
+            maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            self.peak = maxrss if sys.platform == "darwin" else maxrss * 1024
+
+    @property
+    def mb(self):
+        return round(self.peak / (1024 * 1024), 1)
+
+
+def instrument():
+    """Time the import stages and every database round-trip, without changing what runs"""
+    engine = create_engine(
+        settings.postgres_url,
+        pool_size=10,
+        max_overflow=20,
+        connect_args={"connection_factory": TimedConnection}
+    )
+    SessionLocal.configure(bind=engine)
+
+    def timed(stage, func):
+        def wrapper(*args, **kwargs):
+            with clock.timed(stage):
+                return func(*args, **kwargs)
+        return wrapper
+
+    def timed_blocks(blocks):
+        def wrapper(*args, **kwargs):
+            iterator = blocks(*args, **kwargs)
+            while True:
+                with clock.timed("read"):
+                    block = next(iterator, None)
+                if block is None:
+                    return
+                yield block
+        return wrapper
+
+    open_reader = tasks.open_reader
+
+    def timed_open_reader(path):
+        reader = open_reader(path)
+        reader.blocks = timed_blocks(reader.blocks)
+        return reader
+
+    tasks.open_reader = timed_open_reader
+    # get_loader picks from the loaders module, and tasks compares against copy_products
+    loaders.upsert_products = timed("load", loaders.upsert_products)
+    loaders.copy_products = tasks.copy_products = timed("load", loaders.copy_products)
+    tasks.validate_chunk = timed("validate", tasks.validate_chunk)
+    tasks.normalize_chunk = timed("normalize", tasks.normalize_chunk)
+
+    # Any task the import schedules (webhooks) runs in this process, never via the broker
+    celery_app.conf.task_always_eager = True
+    celery_app.conf.task_eager_propagates = True
+    return engine
+
+
+# --- Datasets and imports --------------------------------------------------
+
+def parse_size(value):
+    value = value.strip().lower()
+    for suffix, factor in (("k", 1_000), ("m", 1_000_000)):
+        if value.endswith(suffix):
+            return int(float(value[:-1]) * factor)
+    return int(value)
+
+
+def dataset(data_dir, rows):
+    """Path of a generated dataset; files already in data_dir are reused"""
+    path = os.path.join(data_dir, f"products_{rows}.csv")
+    if not os.path.exists(path):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_sample_csv(path + ".tmp", rows)
+        os.replace(path + ".tmp", path)
+        print(f"Generated {rows:,} rows in {time.perf_counter() - start:.1f} s")
+    return path
+
+
+def reset_products(engine):
+    with engine.begin() as conn:
+        conn.execute(text("TRUNCATE products"))
+
+
+def run_import(engine, path, mode):
+    task_id = f"benchmark-{uuid.uuid4()}"
+    db = SessionLocal()
+    try:
+        db.add(UploadTask(task_id=task_id, filename=os.path.basename(path), status="pending", ingest_mode=mode))
+        db.commit()
+
+        clock.start()
+        with PeakRss() as rss:
+            start = time.perf_counter()
+            try:
+                tasks.process_csv_upload.apply(args=[path, task_id], task_id=task_id).get()
+            finally:
+                clock.stop()
+            elapsed = time.perf_counter() - start
+        stage_wall, stage_db = clock.wall, clock.db
+        stage_wall["checkpoint"] = max(0.0, elapsed - sum(stage_wall.values()))
+
+        upload_task = db.query(UploadTask).filter(UploadTask.task_id == task_id).first()
+        rows = upload_task.processed_rows
+        result = {
+            "mode": mode,
+            "status": upload_task.status,
+            "rows": rows,
+            "rejected_rows": upload_task.rejected_rows,
+            "file_bytes": os.path.getsize(path),
+            "seconds": round(elapsed, 3),
+            "rows_per_second": round(rows / elapsed) if elapsed else None,
+            "peak_rss_mb": rss.mb,
+            "db_seconds": round(sum(stage_db.values()), 3),
+            "stages": {
+                stage: {"seconds": round(stage_wall[stage], 3), "db_seconds": round(stage_db[stage], 3)}
+                for stage in STAGES
+            },
+            "batches": (upload_task.chunk_stats or {}).get("batches")
+        }
+
+        db.delete(upload_task)
+        db.commit()
+    finally:
+        db.close()
+
+    # Fresh statistics, as autovacuum would have after a real import
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE products"))
+    return result
+
+
+# --- Endpoints -------------------------------------------------------------
+
+def load(client, path, params, total):
+    latencies = []
+    errors = 0
+    start = time.perf_counter()
+    for _ in range(total):
+        request_start = time.perf_counter()
+        if client.get(path, params=params).status_code != 200:
+            errors += 1
+        latencies.append(time.perf_counter() - request_start)
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "rps": round(total / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p99_ms": round(latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)] * 1000, 2),
+        "errors": errors
+    }
+
+
+def export(client, export_format):
+    rows = 0
+    size = 0
+    with PeakRss() as rss:
+        start = time.perf_counter()
+        with client.stream("GET", f"/api/products/export/{export_format}") as response:
+            ok = response.status_code == 200
+            for chunk in response.iter_bytes():
+                size += len(chunk)
+                rows += chunk.count(b"\n")
+        elapsed = time.perf_counter() - start
+    rows = max(0, rows - 1)  # header
+    return {
+        "rows": rows,
+        "bytes": size,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(rows / elapsed) if elapsed else None,
+        "peak_rss_mb": rss.mb,
+        "errors": 0 if ok else 1
+    }
+
+
+def run_endpoints(client, total):
+    # One untimed request per endpoint warms up pools and plans
+    endpoints = {
+        "list": ("/api/products", {"limit": LIST_LIMIT}),
+        "list (count=estimated)": ("/api/products", {"limit": LIST_LIMIT, "count": "estimated"}),
+        "search (contains)": ("/api/products", {"limit": LIST_LIMIT, "search": "Blue Widget"}),
+        "search (fulltext)": ("/api/products", {"limit": LIST_LIMIT, "search": "blue widget", "search_mode": "fulltext"}),
+    }
+    results = {}
+    for name, (path, params) in endpoints.items():
+        client.get(path, params=params)
+        results[name] = load(client, path, params, total)
+    results["export (csv)"] = export(client, "csv")
+    return results
+
+
+# --- Reporting -------------------------------------------------------------
+
+def environment(engine):
+    with engine.connect() as conn:
+        server = conn.execute(text("SHOW server_version")).scalar()
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "postgres": server,
+        "async_reads": settings.async_reads,
+        "product_cache_backend": settings.product_cache_backend,
+        "import_block_size": settings.import_block_size,
+        "copy_block_size": settings.copy_block_size,
+        "import_target_batch_seconds": settings.import_target_batch_seconds
+    }
+
+
+def print_run(rows, run):
+    imported = run["import"]
+    print("=" * 78)
+    print(f"{rows:,} rows: import ({imported['mode']}) {imported['rows_per_second']:,} rows/s, "
+          f"{imported['seconds']} s, peak RSS {imported['peak_rss_mb']} MB, DB {imported['db_seconds']} s")
+    print("=" * 78)
+    print(f"{'stage':<24} {'seconds':>10} {'db seconds':>12}")
+    for stage, times in imported["stages"].items():
+        print(f"{stage:<24} {times['seconds']:>10.2f} {times['db_seconds']:>12.2f}")
+    print("-" * 78)
+    print(f"{'endpoint':<24} {'req/s':>10} {'p50 ms':>10} {'p99 ms':>10} {'errors':>8}")
+    for name, r in run["endpoints"].items():
+        if "rps" in r:
+            print(f"{name:<24} {r['rps']:>10,.1f} {r['p50_ms']:>10.1f} {r['p99_ms']:>10.1f} {r['errors']:>8}")
+        else:
+            print(f"{name:<24} {r['rows_per_second']:>10,} rows/s, {r['seconds']} s, peak RSS {r['peak_rss_mb']} MB")
+
+
+def throughputs(results):
+    """Flatten every higher-is-better figure to {name: value}"""
+    figures = {}
+    for rows, run in results["runs"].items():
+        figures[f"{rows} import rows/s"] = run["import"]["rows_per_second"]
+        for name, r in run["endpoints"].items():
+            figures[f"{rows} {name} " + ("req/s" if "rps" in r else "rows/s")] = r.get("rps", r.get("rows_per_second"))
+    return figures
+
+
+def compare(results, baseline_path, tolerance):
+    """Print changes against a baseline; True if nothing dropped by more than tolerance"""
+    with open(baseline_path) as f:
+        before = throughputs(json.load(f))
+    after = throughputs(results)
+
+    print("=" * 78)
+    print(f"Compared with {baseline_path} (tolerance {tolerance:.0%})")
+    print("=" * 78)
+    ok = True
+    for name, value in after.items():
+        old = before.get(name)
+        if not old or value is None:
+            continue
+        change = value / old - 1
+        regressed = change < -tolerance
+        ok = ok and not regressed
+        print(f"{name:<48} {old:>12,.1f} -> {value:>12,.1f} {change:>+8.1%}{'  REGRESSION' if regressed else ''}")
+    return ok
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="End-to-end import and read benchmark")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="dataset row counts, e.g. 10k,1m,10m")
+    parser.add_argument("--mode", default="upsert", choices=("upsert", "copy"), help="ingest engine")
+    parser.add_argument("--requests", type=int, default=200, help="requests per list/search endpoint")
+    parser.add_argument("--data-dir", help="where datasets are generated and reused (default: a temporary directory)")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON results file")
+    parser.add_argument("--baseline", help="earlier JSON results to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed throughput drop against the baseline")
+    args = parser.parse_args()
+
+    engine = instrument()
+    init_db()
+    results = {"environment": environment(engine), "runs": {}}
+
+    with contextlib.ExitStack() as stack:
+        data_dir = args.data_dir or stack.enter_context(tempfile.TemporaryDirectory())
+        os.makedirs(data_dir, exist_ok=True)
+        client = stack.enter_context(TestClient(main.app))
+
+        for rows in (parse_size(size) for size in args.sizes.split(",")):
+            path = dataset(data_dir, rows)
+            reset_products(engine)
+            run = {"import": run_import(engine, path, args.mode)}
+            run["endpoints"] = run_endpoints(client, args.requests)
+            results["runs"][str(rows)] = run
+            print_run(rows, run)
+
+            # Written after every dataset, so a long run keeps what it measured
+            with open(args.output, "w") as f:
+                json.dump(results, f, indent=2)
+
+    print(f"\nResults written to {args.output}")
+    if args.baseline and not compare(results, args.baseline, args.tolerance):
+        sys.exit(1)
@@ -0,0 +1,72 @@
+"""
+Normalization Benchmark
+Compares the legacy iterrows() row builder with the column-wise
+normalization stage used by process_csv_upload.
+
+Run from the acme-service directory:
+    python benchmarks/normalize_benchmark.py [num_records]
+"""
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from SAMPLE_CSV_GENERATOR import generate_sample_csv  # noqa: E402
+from app.ingest import normalize_chunk, to_upsert_params  # noqa: E402
+
+CHUNK_SIZE = 1000
+
+
+def legacy_rows(df_chunk):
+    """Row-by-row builder that process_csv_upload used before vectorization"""
+    df_chunk.columns = df_chunk.columns.str.strip().str.lower()
+    products_data = []
+    for _, row in df_chunk.iterrows():
+        product_dict = {
+            'sku': str(row.get('sku', '')).strip(),
+            'name': str(row.get('name', '')).strip(),
+            'description': str(row.get('description', '')) if pd.notna(row.get('description')) else None,
+            'price': float(row.get('price', 0)) if pd.notna(row.get('price')) else None,
+            'active': True
+        }
+        if product_dict['sku']:
+            products_data.append(product_dict)
+    return products_data
+
+
+def vectorized_rows(df_chunk):
+    return to_upsert_params(normalize_chunk(df_chunk))
+
+
+def run(label, file_path, builder, read_kwargs):
+    start = time.perf_counter()
+    rows = 0
+    for df_chunk in pd.read_csv(file_path, chunksize=CHUNK_SIZE, **read_kwargs):
+        rows += len(builder(df_chunk))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<12} {rows:>10,} rows  {elapsed:8.2f} s  {rows / elapsed:>12,.0f} rows/s")
+    return rows / elapsed
+
+
+if __name__ == '__main__':
+    num_records = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = os.path.join(tmp_dir, 'products.csv')
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_sample_csv(file_path, num_records)
+
+        print("=" * 60)
+        print(f"Normalization benchmark ({num_records:,} rows, chunk size {CHUNK_SIZE})")
+        print("=" * 60)
+        before = run('iterrows', file_path, legacy_rows, {})
+        after = run('vectorized', file_path, vectorized_rows, {'dtype': str})
+        print("-" * 60)
+        print(f"Speedup: {after / before:.1f}x")
@@ -19,8 +19,42 @@ class Settings(BaseSettings):
     celery_result_backend: str = "redis://localhost:6379/0"
     secret_key: str = "dev-secret-key-change-in-production"
     environment: str = "development"
+    async_reads: bool = True  # serve read-heavy endpoints from the asyncpg engine
+    product_cache_backend: str = "memory"  # product read cache: memory (per process), redis (shared) or none
+    product_cache_ttl: float = 30.0  # seconds a cached product response is served at most
+    product_cache_max_entries: int = 10_000  # responses per process with the memory backend
+    product_cache_generation_ttl: float = 1.0  # seconds a process reuses the cache generation before rereading it
+    redis_socket_timeout: float = 5.0  # connect/read timeout of the shared Redis client, so an outage fails fast
     upload_dir: str = "uploads"
+    export_dir: str = "uploads/exports"
+    rejected_dir: str = "uploads/rejected"  # rejected-rows reports of imports
     max_upload_size: int = 100 * 1024 * 1024  # 100MB
+    bulk_max_items: int = 50_000  # products per batch write request
+    bulk_delete_batch_size: int = 5000  # products per bulk delete transaction
+    import_block_size: int = 1024 * 1024  # bytes of CSV in the first committed batch, then sized adaptively
+    copy_block_size: int = 16 * 1024 * 1024  # same for the first COPY + merge
+    import_min_batch_rows: int = 1_000  # rows per committed batch, lower bound of adaptive sizing
+    import_max_batch_rows: int = 200_000  # upper bound, also the max rows per upsert statement
+    import_target_batch_seconds: float = 1.0  # adaptive sizing aims for batches taking this long to load and commit
+    import_max_statement_bytes: int = 8 * 1024 * 1024  # estimated SQL size per upsert statement
+    parallel_import_ranges: int = 16  # max byte ranges per parallel import
+    parallel_import_min_range_size: int = 8 * 1024 * 1024
+    import_max_retries: int = 5  # automatic resumes after hitting the soft time limit
+    import_retry_delay: int = 5  # seconds
+    import_stalled_after: int = 3660  # seconds without progress before a processing import counts as crashed (past task_time_limit)
+    progress_interval_ms: int = 500  # min time between import progress updates to Celery and watchers
+    webhook_timeout: float = 10.0  # seconds per delivery
+    webhook_connect_timeout: float = 3.0  # seconds to establish a connection
+    webhook_max_concurrency: int = 50  # deliveries in flight per worker process
+    webhook_max_per_host: int = 5  # deliveries in flight per receiving host
+    webhook_coalesce_window_ms: int = 500  # buffer events for batch_enabled webhooks this long per flush task; 0 = one task per event
+    webhook_batch_max_events: int = 500  # events per batched payload (default) and per flush
+    webhook_subscription_ttl: float = 60.0  # seconds before a process reloads cached subscriptions
+    webhook_max_attempts: int = 8  # attempts before a delivery is dead-lettered
+    webhook_retry_base_delay: float = 10.0  # seconds before the first retry, doubled each time
+    webhook_retry_max_delay: float = 3600.0
+    webhook_breaker_threshold: int = 5  # consecutive failures that open a URL's circuit
+    webhook_breaker_cooldown: float = 60.0  # seconds a circuit stays open
 
     @computed_field
     @property
@@ -30,6 +64,7 @@ class Settings(BaseSettings):
             username=self.postgres_user,
             password=self.postgres_password,
             host=self.postgres_host,
+            port=self.postgres_port,
             path=self.postgres_db,
         ).unicode_string()
 
@@ -41,6 +76,7 @@ class Settings(BaseSettings):
             username=self.postgres_user,
             password=self.postgres_password,
             host=self.postgres_host,
+            port=self.postgres_port,
             path=self.postgres_db,
         ).unicode_string()
 
@@ -1,7 +1,18 @@
 """
-Synchronous database session for all operations
+Database sessions
+
+Routes and tasks use the synchronous psycopg2 engine. Read-heavy endpoints
+can run on an asyncpg engine instead (settings.async_reads), so they wait
+on the database without holding one of Starlette's threadpool slots.
+
+init_db creates missing tables and brings tables of an older release up
+to date: create_all never alters existing tables, so columns added since
+then are listed in SCHEMA_UPGRADES and every model index is created if
+missing. All of it is idempotent and runs on every startup.
 """
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
+from sqlalchemy.schema import CreateIndex
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from config import settings
 
@@ -19,6 +30,23 @@ engine = create_engine(
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine, created on first use so Celery workers never open an asyncpg pool
+_async_engine = None
+_AsyncSessionLocal = None
+
+
+def get_async_engine() -> AsyncEngine:
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is None:
+        _async_engine = create_async_engine(
+            settings.asyncpg_url,
+            pool_pre_ping=True,
+            pool_size=10,
+            max_overflow=20
+        )
+        _AsyncSessionLocal = async_sessionmaker(_async_engine, autoflush=False, expire_on_commit=False)
+    return _async_engine
+
 
 def get_db():
     """Get database session for routes and tasks"""
@@ -29,6 +57,66 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    """Get async database session for async routes"""
+    get_async_engine()
+    async with _AsyncSessionLocal() as db:
+        yield db
+
+
+async def dispose_async_engine():
+    """Close the async connection pool, if one was opened"""
+    if _async_engine is not None:
+        await _async_engine.dispose()
+
+
+# Columns added to tables that existed before; NOT NULL columns need a
+# server default here so existing rows can be filled
+SCHEMA_UPGRADES = [
+    # Delta imports (content hashes) and indexed search
+    "ALTER TABLE products ADD COLUMN IF NOT EXISTS content_hash varchar(32) GENERATED ALWAYS AS "
+    "(md5(name || chr(31) || coalesce(description, '') || chr(31) || coalesce(price::text, ''))) STORED",
+    "ALTER TABLE products ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS "
+    "(to_tsvector('simple'::regconfig, sku || ' ' || name || ' ' || coalesce(description, ''))) STORED",
+    # Batched payloads and delivery health
+    "ALTER TABLE webhooks ADD COLUMN IF NOT EXISTS batch_enabled boolean NOT NULL DEFAULT false",
+    "ALTER TABLE webhooks ADD COLUMN IF NOT EXISTS batch_max_events integer",
+    "ALTER TABLE webhooks ADD COLUMN IF NOT EXISTS last_status_code integer",
+    "ALTER TABLE webhooks ADD COLUMN IF NOT EXISTS last_latency_ms integer",
+    "ALTER TABLE webhooks ADD COLUMN IF NOT EXISTS last_error text",
+    "ALTER TABLE webhooks ADD COLUMN IF NOT EXISTS last_delivered_at timestamptz",
+    # Import modes, byte progress, checkpoints, rejected rows and batch stats
+    "ALTER TABLE upload_tasks ADD COLUMN IF NOT EXISTS ingest_mode varchar(20) NOT NULL DEFAULT 'upsert'",
+    "ALTER TABLE upload_tasks ADD COLUMN IF NOT EXISTS parallel boolean NOT NULL DEFAULT false",
+    "ALTER TABLE upload_tasks ADD COLUMN IF NOT EXISTS delta boolean NOT NULL DEFAULT false",
+    "ALTER TABLE upload_tasks ADD COLUMN IF NOT EXISTS ranges_total integer DEFAULT 0",
+    "ALTER TABLE upload_tasks ADD COLUMN IF NOT EXISTS ranges_completed integer DEFAULT 0",
+    "ALTER TABLE upload_tasks ADD COLUMN IF NOT EXISTS inserted_rows integer DEFAULT 0",
+    "ALTER TABLE upload_tasks ADD COLUMN IF NOT EXISTS updated_rows integer DEFAULT 0",
+    "ALTER TABLE upload_tasks ADD COLUMN IF NOT EXISTS unchanged_rows integer DEFAULT 0",
+    "ALTER TABLE upload_tasks ADD COLUMN IF NOT EXISTS rejected_rows integer NOT NULL DEFAULT 0",
+    "ALTER TABLE upload_tasks ADD COLUMN IF NOT EXISTS rows_read integer NOT NULL DEFAULT 0",
+    "ALTER TABLE upload_tasks ADD COLUMN IF NOT EXISTS total_bytes bigint DEFAULT 0",
+    "ALTER TABLE upload_tasks ADD COLUMN IF NOT EXISTS processed_bytes bigint DEFAULT 0",
+    "ALTER TABLE upload_tasks ADD COLUMN IF NOT EXISTS checkpoint_offset bigint NOT NULL DEFAULT 0",
+    "ALTER TABLE upload_tasks ADD COLUMN IF NOT EXISTS checkpoint_chunk integer NOT NULL DEFAULT 0",
+    "ALTER TABLE upload_tasks ADD COLUMN IF NOT EXISTS rejected_bytes bigint NOT NULL DEFAULT 0",
+    "ALTER TABLE upload_tasks ADD COLUMN IF NOT EXISTS chunk_stats jsonb",
+    "ALTER TABLE upload_tasks ADD COLUMN IF NOT EXISTS attempts integer NOT NULL DEFAULT 0",
+    "ALTER TABLE upload_tasks ADD COLUMN IF NOT EXISTS content_sha256 varchar(64)",
+]
+
+
 def init_db():
-    """Initialize database tables"""
+    """Create missing tables, and upgrade existing ones to the current models"""
+    # Trigram indexes for product search need pg_trgm
+    with engine.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
     Base.metadata.create_all(bind=engine)
+
+    with engine.begin() as conn:
+        for statement in SCHEMA_UPGRADES:
+            conn.execute(text(statement))
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                conn.execute(CreateIndex(index, if_not_exists=True))
@@ -0,0 +1,13 @@
+"""
+Shared Redis client for application state outside the Celery broker
+"""
+import redis
+
+from config import settings
+
+# Connection pool is created lazily and shared by all users in the process
+redis_client = redis.Redis.from_url(
+    settings.redis_url,
+    socket_connect_timeout=settings.redis_socket_timeout,
+    socket_timeout=settings.redis_socket_timeout
+)
@@ -4,8 +4,9 @@ from starlette.middleware.cors import CORSMiddleware
 from pathlib import Path
 
 from config import settings
-from dependencies.database import init_db
-from routes import products, upload, webhooks
+from dependencies.database import init_db, dispose_async_engine
+from app.progress import progress_hub
+from routes import exports, products, upload, webhooks
 
 # Create uploads directory
 Path(settings.upload_dir).mkdir(exist_ok=True)
@@ -28,6 +29,7 @@ def create_app() -> FastAPI:
     # Routers
     app.include_router(products.router)
     app.include_router(upload.router)
+    app.include_router(exports.router)
     app.include_router(webhooks.router)
 
     return app
@@ -42,6 +44,13 @@ def startup_event():
     init_db()
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close the async connection pool and the progress subscription"""
+    await dispose_async_engine()
+    await progress_hub.close()
+
+
 @app.get("/")
 def welcome_user():
     return {
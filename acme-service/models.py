@@ -1,11 +1,19 @@
 import uuid
 
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, Float, Index
+from sqlalchemy import Column, Integer, BigInteger, String, Text, Boolean, DateTime, Float, Index, Computed, text
 from sqlalchemy.sql import func
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import UUID, TSVECTOR, JSONB
 from dependencies.database import Base
 
 
+def content_hash_sql(name: str, description: str, price: str) -> str:
+    """SQL expression hashing a product's normalized content (name, description, price)"""
+    return (
+        f"md5({name} || chr(31) || coalesce({description}, '') || chr(31) || "
+        f"coalesce({price}::text, ''))"
+    )
+
+
 class Product(Base):
     __tablename__ = "products"
 
@@ -16,12 +24,23 @@ class Product(Base):
     description = Column(Text, nullable=True)
     price = Column(Float, nullable=True)
     active = Column(Boolean, default=True, nullable=False, index=True)
+    # Maintained by PostgreSQL so it always matches the stored row, used by delta imports
+    content_hash = Column(String(32), Computed(content_hash_sql('name', 'description', 'price'), persisted=True))
+    # Full-text document over SKU, name and description, see app/search.py
+    search_vector = Column(TSVECTOR, Computed(
+        "to_tsvector('simple'::regconfig, sku || ' ' || name || ' ' || coalesce(description, ''))",
+        persisted=True
+    ))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
-    # Create case-insensitive index for SKU
+    # Create case-insensitive index for SKU, the keyset pagination order and search indexes
     __table_args__ = (
         Index('idx_sku_lower', func.lower(sku), unique=True),
+        Index('idx_products_created_at_id', created_at, id),
+        Index('idx_products_search_vector', search_vector, postgresql_using='gin'),
+        Index('idx_products_sku_trgm', text('lower(sku) gin_trgm_ops'), postgresql_using='gin'),
+        Index('idx_products_name_trgm', text('lower(name) gin_trgm_ops'), postgresql_using='gin'),
     )
 
 
@@ -34,6 +53,12 @@ class Webhook(Base):
     event_type = Column(String(100), nullable=False, index=True)
     enabled = Column(Boolean, default=True, nullable=False)
     description = Column(Text, nullable=True)
+    batch_enabled = Column(Boolean, default=False, nullable=False)  # deliver events as arrays
+    batch_max_events = Column(Integer, nullable=True)  # None = settings.webhook_batch_max_events
+    last_status_code = Column(Integer, nullable=True)
+    last_latency_ms = Column(Integer, nullable=True)
+    last_error = Column(Text, nullable=True)
+    last_delivered_at = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -46,8 +71,110 @@ class UploadTask(Base):
     task_id = Column(String(255), unique=True, nullable=False, index=True)
     filename = Column(String(500), nullable=False)
     status = Column(String(50), nullable=False, default="pending", index=True)  # pending, processing, completed, failed
+    ingest_mode = Column(String(20), nullable=False, default="upsert")  # upsert, copy
+    parallel = Column(Boolean, default=False, nullable=False)
+    delta = Column(Boolean, default=False, nullable=False)
+    ranges_total = Column(Integer, default=0)
+    ranges_completed = Column(Integer, default=0)
     total_rows = Column(Integer, default=0)
     processed_rows = Column(Integer, default=0)
+    inserted_rows = Column(Integer, default=0)
+    updated_rows = Column(Integer, default=0)
+    unchanged_rows = Column(Integer, default=0)
+    rejected_rows = Column(Integer, default=0, nullable=False)  # rows that failed validation, see app/validation.py
+    rows_read = Column(Integer, default=0, nullable=False)
+    total_bytes = Column(BigInteger, default=0)
+    processed_bytes = Column(BigInteger, default=0)
+    checkpoint_offset = Column(BigInteger, default=0, nullable=False)  # reader position after the last committed block (byte offset; row group for Parquet)
+    checkpoint_chunk = Column(Integer, default=0, nullable=False)
+    rejected_bytes = Column(BigInteger, default=0, nullable=False)  # committed size of the rejected-rows report
+    chunk_stats = Column(JSONB, nullable=True)  # adaptive batch sizes and throughput (app/chunking.py)
+    attempts = Column(Integer, default=0, nullable=False)
+    content_sha256 = Column(String(64), nullable=True, index=True)
+    error_message = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+
+class UploadRange(Base):
+    __tablename__ = "upload_ranges"
+
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, unique=True, nullable=False)
+    task_id = Column(String(255), nullable=False, index=True)  # UploadTask.task_id
+    start_offset = Column(BigInteger, nullable=False)
+    end_offset = Column(BigInteger, nullable=False)
+    checkpoint_offset = Column(BigInteger, nullable=False)
+    rejected_bytes = Column(BigInteger, default=0, nullable=False)  # committed size of this range's report part
+    chunk_stats = Column(JSONB, nullable=True)  # adaptive batch sizes and throughput of this range
+    status = Column(String(50), nullable=False, default="pending")  # pending, processing, completed, failed
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+
+class CatalogState(Base):
+    __tablename__ = "catalog_state"
+
+
+    id = Column(Integer, primary_key=True)  # single row, id = 1
+    version = Column(BigInteger, nullable=False, default=0)  # bumped on every product write, see app/catalog.py
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class ExportTask(Base):
+    __tablename__ = "export_tasks"
+
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, unique=True, nullable=False)
+    task_id = Column(String(255), unique=True, nullable=False, index=True)
+    export_format = Column(String(20), nullable=False)  # excel, csv, ndjson
+    search = Column(String(500), nullable=True)
+    search_mode = Column(String(20), nullable=False, default="contains")
+    active = Column(Boolean, nullable=True)
+    filter_key = Column(String(64), nullable=False, index=True)  # hash of format + filters
+    catalog_version = Column(BigInteger, nullable=False)
+    status = Column(String(50), nullable=False, default="pending", index=True)  # pending, processing, completed, failed, expired
+    total_rows = Column(Integer, default=0)  # planner estimate until completed
+    processed_rows = Column(Integer, default=0)
+    file_path = Column(String(1000), nullable=True)
     error_message = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
\ No newline at end of file
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+
+class WebhookDelivery(Base):
+    __tablename__ = "webhook_deliveries"
+
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, unique=True, nullable=False)
+    webhook_id = Column(UUID(as_uuid=True), nullable=False, index=True)  # Webhook.id
+    event_type = Column(String(100), nullable=False)
+    url = Column(String(2048), nullable=False)
+    body = Column(JSONB, nullable=False)  # exact JSON body sent, replayed as-is
+    status = Column(String(50), nullable=False, default="pending", index=True)  # pending, delivered, retrying, dead
+    attempts = Column(Integer, nullable=False, default=0)
+    last_status_code = Column(Integer, nullable=True)
+    last_latency_ms = Column(Integer, nullable=True)
+    last_error = Column(Text, nullable=True)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=True)
+    delivered_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+
+class DeleteTask(Base):
+    __tablename__ = "delete_tasks"
+
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, unique=True, nullable=False)
+    task_id = Column(String(255), unique=True, nullable=False, index=True)
+    search = Column(String(500), nullable=True)
+    search_mode = Column(String(20), nullable=False, default="contains")
+    active = Column(Boolean, nullable=True)
+    status = Column(String(50), nullable=False, default="pending", index=True)  # pending, processing, completed, failed
+    total_rows = Column(Integer, default=0)  # planner estimate until completed
+    deleted_rows = Column(Integer, default=0)
+    last_product_id = Column(UUID(as_uuid=True), nullable=True)  # keyset checkpoint, batches walk ids in order
+    error_message = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
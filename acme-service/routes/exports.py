@@ -0,0 +1,141 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+from typing import Optional
+import hashlib
+import json
+import os
+import uuid
+
+from dependencies.database import get_db
+from dependencies.celery_app import celery_app
+from models import ExportTask
+from schemas import ExportTaskResponse, TaskStatusResponse
+from app.catalog import get_catalog_version
+from app.exporters import EXPORT_FORMATS
+from app.search import SEARCH_MODES
+from app.tasks import export_products_task
+
+router = APIRouter(prefix="/api/exports", tags=["exports"])
+
+EXPORT_FORMAT_PATTERN = f"^({'|'.join(EXPORT_FORMATS)})$"
+SEARCH_MODE_PATTERN = f"^({'|'.join(SEARCH_MODES)})$"
+
+
+def _filter_key(export_format: str, search: Optional[str], search_mode: str, active: Optional[bool]) -> str:
+    """Stable hash of everything that determines an export's content, apart from the catalog version"""
+    raw = json.dumps([export_format, search or None, search_mode if search else None, active])
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _download_url(export_task: ExportTask) -> str:
+    return f"{router.prefix}/{export_task.task_id}/download"
+
+
+@router.post("", response_model=ExportTaskResponse, status_code=202)
+def create_export(
+    export_format: str = Query("excel", pattern=EXPORT_FORMAT_PATTERN),
+    search: Optional[str] = None,
+    search_mode: str = Query("contains", pattern=SEARCH_MODE_PATTERN),
+    active: Optional[bool] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Start a background product export
+
+    Exports are cached by (format, filters, catalog version): while the
+    catalog is unchanged, requesting the same export again returns the
+    finished or in-flight job instead of starting a new one.
+    """
+    filter_key = _filter_key(export_format, search, search_mode, active)
+    catalog_version = get_catalog_version(db)
+    
+    existing = db.query(ExportTask).filter(
+        ExportTask.filter_key == filter_key,
+        ExportTask.catalog_version == catalog_version,
+        ExportTask.status.in_(["pending", "processing", "completed"])
+    ).order_by(ExportTask.created_at.desc()).first()
+    
+    if existing and (existing.status != "completed" or os.path.exists(existing.file_path or "")):
+        return existing
+    
+    task_id = str(uuid.uuid4())
+    export_task = ExportTask(
+        task_id=task_id,
+        export_format=export_format,
+        search=search or None,
+        search_mode=search_mode,
+        active=active,
+        filter_key=filter_key,
+        catalog_version=catalog_version,
+        status="pending"
+    )
+    db.add(export_task)
+    db.commit()
+    db.refresh(export_task)
+    
+    export_products_task.apply_async(args=[task_id], task_id=task_id)
+    
+    return export_task
+
+
+@router.get("/status/{task_id}", response_model=TaskStatusResponse)
+def get_export_status(task_id: str, db: Session = Depends(get_db)):
+    """Get export task status"""
+    export_task = db.query(ExportTask).filter(ExportTask.task_id == task_id).first()
+    if not export_task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    
+    if export_task.status == "completed":
+        return TaskStatusResponse(
+            status="completed",
+            current=export_task.processed_rows,
+            total=export_task.total_rows,
+            percentage=100,
+            message="Export completed successfully",
+            download_url=_download_url(export_task)
+        )
+    elif export_task.status in ("failed", "expired"):
+        return TaskStatusResponse(
+            status=export_task.status,
+            current=export_task.processed_rows,
+            total=export_task.total_rows,
+            percentage=0,
+            message=export_task.error_message or "Export is out of date, request a new one"
+        )
+    
+    celery_task = celery_app.AsyncResult(task_id)
+    if celery_task.state == 'PROGRESS':
+        info = celery_task.info
+        return TaskStatusResponse(
+            status="processing",
+            current=info.get('current', 0),
+            total=info.get('total', 0),
+            percentage=info.get('percentage', 0)
+        )
+    
+    return TaskStatusResponse(
+        status=export_task.status,
+        current=export_task.processed_rows,
+        total=export_task.total_rows,
+        percentage=0
+    )
+
+
+@router.get("/{task_id}/download")
+def download_export(task_id: str, db: Session = Depends(get_db)):
+    """Download a finished export file"""
+    export_task = db.query(ExportTask).filter(ExportTask.task_id == task_id).first()
+    if not export_task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    
+    if export_task.status != "completed":
+        raise HTTPException(status_code=409, detail=f"Export is {export_task.status}")
+    
+    if not export_task.file_path or not os.path.exists(export_task.file_path):
+        raise HTTPException(status_code=410, detail="Export file is no longer available")
+    
+    extension, media_type = EXPORT_FORMATS[export_task.export_format]
+    filename = f"products_export_{export_task.created_at.strftime('%Y%m%d_%H%M%S')}.{extension}"
+    
+    return FileResponse(export_task.file_path, media_type=media_type, filename=filename)
@@ -1,58 +1,169 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import func, or_
+from sqlalchemy import func, select, tuple_
 from typing import Optional
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment
-from io import BytesIO
 from datetime import datetime
+import os
+import tempfile
+import uuid
 
-from dependencies.database import get_db
-from models import Product
-from schemas import ProductCreate, ProductUpdate, ProductResponse
-from app.tasks import trigger_webhooks_async
+from config import settings
+from dependencies.database import get_db, get_async_db
+from dependencies.celery_app import celery_app
+from models import Product, DeleteTask
+from schemas import (
+    ProductCreate, ProductUpdate, ProductResponse, ProductListResponse, ProductBatchResponse, TaskStatusResponse
+)
+from app.tasks import enqueue_webhook_event, bulk_delete_products_task
+from app.catalog import bump_catalog_version
+from app.cache import product_cache
+from app.pagination import encode_cursor, decode_cursor, estimate_count
+from app.search import filter_products, SEARCH_MODES
+from app.exporters import EXPORT_FORMATS, iter_product_rows, iter_csv, iter_ndjson, write_xlsx, iter_file
+from app.bulk import BATCH_OPERATIONS, parse_batch_body, validate_batch, apply_batch
 
 router = APIRouter(prefix="/api/products", tags=["products"])
 
+SEARCH_MODE_PATTERN = f"^({'|'.join(SEARCH_MODES)})$"
+BATCH_OPERATION_PATTERN = f"^({'|'.join(BATCH_OPERATIONS)})$"
+
+
+def _page_query(query, rank, cursor: Optional[str], skip: int, limit: int):
+    """Order and bound a filtered product Query or select(); fetches one extra row to detect a next page"""
+    if rank is not None:
+        if cursor:
+            raise HTTPException(status_code=400, detail="Cursor pagination is not available for ranked search")
+        page = query.order_by(rank.desc(), Product.created_at.desc(), Product.id.desc())
+    else:
+        page = query.order_by(Product.created_at.desc(), Product.id.desc())
+    
+    if cursor:
+        try:
+            created_at, product_id = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        page = page.filter(tuple_(Product.created_at, Product.id) < (created_at, product_id))
+    else:
+        page = page.offset(skip)
+    
+    return page.limit(limit + 1)
+
+
+def _list_params(skip, limit, search, search_mode, active, cursor, count) -> dict:
+    """Cache key parameters of a list request; skip is ignored with a cursor, search_mode without a search"""
+    return {
+        "skip": None if cursor else skip,
+        "limit": limit,
+        "search": search or None,
+        "search_mode": search_mode if search else None,
+        "active": active,
+        "cursor": cursor,
+        "count": count
+    }
+
+
+def _page_response(products: list, total: Optional[int], count: str, skip: int, limit: int, rank) -> ProductListResponse:
+    has_more = len(products) > limit
+    products = products[:limit]
+    
+    return ProductListResponse(
+        items=products,
+        total=total,
+        total_is_estimate=count == "estimated",
+        skip=skip,
+        limit=limit,
+        next_cursor=encode_cursor(products[-1].created_at, products[-1].id) if has_more and rank is None else None
+    )
+
 
-@router.get("", response_model=dict)
 def get_products(
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=1000),
     search: Optional[str] = None,
+    search_mode: str = Query("contains", pattern=SEARCH_MODE_PATTERN),
     active: Optional[bool] = None,
+    cursor: Optional[str] = None,
+    count: str = Query("exact", pattern="^(exact|estimated|none)$"),
     db: Session = Depends(get_db)
 ):
-    """Get paginated list of products with filtering"""
-    query = db.query(Product)
+    """
+    Get paginated list of products with filtering
+
+    Products are ordered newest first by (created_at, id). Pass the returned
+    next_cursor as cursor to fetch the following page without an OFFSET
+    scan; skip is ignored when a cursor is given. count picks how total is
+    computed: "exact" (COUNT), "estimated" (planner statistics) or "none".
+
+    search_mode picks the indexed search backend (see app/search.py); the
+    ranked modes "fulltext" and "fuzzy" order by relevance and page with
+    skip/limit only. Pages are served from the product cache until the
+    next product write.
+    """
+    cache_key, cached = product_cache.lookup("list", _list_params(skip, limit, search, search_mode, active, cursor, count))
+    if cached is not None:
+        return cached
     
     # Apply filters
-    if search:
-        search_filter = f"%{search}%"
-        query = query.filter(
-            or_(
-                func.lower(Product.sku).like(func.lower(search_filter)),
-                func.lower(Product.name).like(func.lower(search_filter)),
-                func.lower(Product.description).like(func.lower(search_filter))
-            )
-        )
-    
-    if active is not None:
-        query = query.filter(Product.active == active)
+    query, rank = filter_products(db.query(Product), search, search_mode, active)
     
     # Get total count
-    total = query.count()
+    if count == "exact":
+        total = query.count()
+    elif count == "estimated":
+        total = estimate_count(db, query)
+    else:
+        total = None
+    
+    products = _page_query(query, rank, cursor, skip, limit).all()
+    response = _page_response(products, total, count, skip, limit, rank)
+    product_cache.store("list", cache_key, response.model_dump(mode="json"))
+    return response
+
+
+async def get_products_async(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=1000),
+    search: Optional[str] = None,
+    search_mode: str = Query("contains", pattern=SEARCH_MODE_PATTERN),
+    active: Optional[bool] = None,
+    cursor: Optional[str] = None,
+    count: str = Query("exact", pattern="^(exact|estimated|none)$"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get paginated list of products with filtering, on the async engine
+
+    Same parameters and response as get_products.
+    """
+    cache_key, cached = await product_cache.lookup_async(
+        "list", _list_params(skip, limit, search, search_mode, active, cursor, count)
+    )
+    if cached is not None:
+        return cached
     
-    # Get paginated results
-    products = query.order_by(Product.id.desc()).offset(skip).limit(limit).all()
+    # Apply filters
+    query, rank = filter_products(select(Product), search, search_mode, active)
     
-    return {
-        "items": products,
-        "total": total,
-        "skip": skip,
-        "limit": limit
-    }
+    # Get total count
+    if count == "exact":
+        total = await db.scalar(select(func.count()).select_from(query.subquery()))
+    elif count == "estimated":
+        total = await db.run_sync(estimate_count, query)
+    else:
+        total = None
+    
+    products = (await db.scalars(_page_query(query, rank, cursor, skip, limit))).all()
+    response = _page_response(products, total, count, skip, limit, rank)
+    await product_cache.store_async("list", cache_key, response.model_dump(mode="json"))
+    return response
+
+
+# Read endpoints are served by the async or the sync handler depending on settings.async_reads
+router.get("", response_model=ProductListResponse)(get_products_async if settings.async_reads else get_products)
 
 
 @router.post("", response_model=ProductResponse, status_code=201)
@@ -68,27 +179,118 @@ def create_product(product: ProductCreate, db: Session = Depends(get_db)):
     
     db_product = Product(**product.model_dump())
     db.add(db_product)
+    bump_catalog_version(db)
     db.commit()
     db.refresh(db_product)
     
     # Trigger webhooks
-    trigger_webhooks_async.delay('product.created', {'product_id': db_product.id, 'sku': db_product.sku})
+    enqueue_webhook_event('product.created', {'product_id': db_product.id, 'sku': db_product.sku})
     
     return db_product
 
 
-@router.get("/{product_id}", response_model=ProductResponse)
-def get_product(product_id: int, db: Session = Depends(get_db)):
+def _write_batch(db: Session, operation: str, raw_items: list) -> ProductBatchResponse:
+    """Validate and apply a batch in one transaction, then emit one aggregated webhook event"""
+    valid, results = validate_batch(operation, raw_items)
+    counts = apply_batch(db, operation, valid, results)
+    
+    changed = counts["created"] + counts["updated"] + counts["deleted"]
+    if changed:
+        bump_catalog_version(db)
+    db.commit()
+    
+    if changed:
+        enqueue_webhook_event('products.batch', {
+            'operation': operation,
+            **counts,
+            'skus': [r["sku"] for r in results if r["status"] in ("created", "updated", "deleted")]
+        })
+    
+    return ProductBatchResponse(
+        operation=operation,
+        total=len(results),
+        failed=sum(1 for r in results if r["status"] in ("failed", "invalid")),
+        results=results,
+        **counts
+    )
+
+
+@router.post(
+    "/batch",
+    response_model=ProductBatchResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": {"type": "array", "items": {"type": "object"}}},
+                "application/x-ndjson": {"schema": {"type": "string"}}
+            }
+        }
+    }
+)
+async def batch_write_products(
+    request: Request,
+    operation: str = Query("upsert", pattern=BATCH_OPERATION_PATTERN),
+    db: Session = Depends(get_db)
+):
+    """
+    Create, upsert, update or delete many products in one request
+
+    The body is a JSON array, or NDJSON with Content-Type
+    application/x-ndjson, of product objects keyed by SKU (case-insensitive).
+    update changes only the fields given; delete needs only the SKU. Items
+    are applied with one set-based statement and every item gets a result;
+    invalid items do not stop the rest of the batch.
+    """
+    ndjson = request.headers.get("content-type", "").startswith("application/x-ndjson")
+    try:
+        raw_items = parse_batch_body(await request.body(), ndjson)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Malformed batch body: {e}")
+    
+    if len(raw_items) > settings.bulk_max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch exceeds the maximum of {settings.bulk_max_items} products"
+        )
+    
+    return await run_in_threadpool(_write_batch, db, operation, raw_items)
+
+
+def get_product(product_id: uuid.UUID, db: Session = Depends(get_db)):
     """Get a single product by ID"""
+    cache_key, cached = product_cache.lookup("detail", {"id": product_id})
+    if cached is not None:
+        return cached
+    
     product = db.query(Product).filter(Product.id == product_id).first()
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
+    
+    product_cache.store("detail", cache_key, ProductResponse.model_validate(product).model_dump(mode="json"))
+    return product
+
+
+async def get_product_async(product_id: uuid.UUID, db: AsyncSession = Depends(get_async_db)):
+    """Get a single product by ID"""
+    cache_key, cached = await product_cache.lookup_async("detail", {"id": product_id})
+    if cached is not None:
+        return cached
+    
+    product = await db.get(Product, product_id)
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    
+    await product_cache.store_async("detail", cache_key, ProductResponse.model_validate(product).model_dump(mode="json"))
     return product
 
 
+router.get("/{product_id}", response_model=ProductResponse)(get_product_async if settings.async_reads else get_product)
+
+
 @router.put("/{product_id}", response_model=ProductResponse)
 def update_product(
-    product_id: int,
+    product_id: uuid.UUID,
     product_update: ProductUpdate,
     db: Session = Depends(get_db)
 ):
@@ -110,17 +312,18 @@ def update_product(
     for field, value in update_data.items():
         setattr(product, field, value)
     
+    bump_catalog_version(db)
     db.commit()
     db.refresh(product)
     
     # Trigger webhooks
-    trigger_webhooks_async.delay('product.updated', {'product_id': product.id, 'sku': product.sku})
+    enqueue_webhook_event('product.updated', {'product_id': product.id, 'sku': product.sku})
     
     return product
 
 
 @router.delete("/{product_id}")
-def delete_product(product_id: int, db: Session = Depends(get_db)):
+def delete_product(product_id: uuid.UUID, db: Session = Depends(get_db)):
     """Delete a single product"""
     product = db.query(Product).filter(Product.id == product_id).first()
     if not product:
@@ -128,113 +331,146 @@ def delete_product(product_id: int, db: Session = Depends(get_db)):
     
     sku = product.sku
     db.delete(product)
+    bump_catalog_version(db)
     db.commit()
     
     # Trigger webhooks
-    trigger_webhooks_async.delay('product.deleted', {'product_id': product_id, 'sku': sku})
+    enqueue_webhook_event('product.deleted', {'product_id': product_id, 'sku': sku})
     
     return {"message": "Product deleted successfully"}
 
 
-@router.delete("")
-def bulk_delete_products(db: Session = Depends(get_db)):
-    """Delete all products"""
-    count = db.query(Product).count()
-    db.query(Product).delete()
+@router.delete("", status_code=202)
+def bulk_delete_products(
+    search: Optional[str] = None,
+    search_mode: str = Query("contains", pattern=SEARCH_MODE_PATTERN),
+    active: Optional[bool] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Delete all products, or those matching the listing filters, in the background
+
+    Rows are deleted in key-range batches with a short transaction each;
+    follow progress through /api/products/bulk-delete/status/{task_id}.
+    count is an estimate of the rows that will be deleted.
+    """
+    query, _ = filter_products(db.query(Product), search, search_mode, active)
+    count = estimate_count(db, query)
+    
+    task_id = str(uuid.uuid4())
+    delete_task = DeleteTask(
+        task_id=task_id,
+        search=search or None,
+        search_mode=search_mode,
+        active=active,
+        status="pending",
+        total_rows=count
+    )
+    db.add(delete_task)
     db.commit()
     
-    # Trigger webhooks
-    trigger_webhooks_async.delay('products.bulk_deleted', {'count': count})
+    bulk_delete_products_task.apply_async(args=[task_id], task_id=task_id)
+    
+    return {"message": f"Deleting about {count} products", "count": count, "task_id": task_id}
+
+
+@router.get("/bulk-delete/status/{task_id}", response_model=TaskStatusResponse)
+def get_bulk_delete_status(task_id: str, db: Session = Depends(get_db)):
+    """Get bulk delete task status"""
+    delete_task = db.query(DeleteTask).filter(DeleteTask.task_id == task_id).first()
+    if not delete_task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    
+    if delete_task.status == "completed":
+        return TaskStatusResponse(
+            status="completed",
+            current=delete_task.deleted_rows,
+            total=delete_task.total_rows,
+            percentage=100,
+            message=f"Deleted {delete_task.deleted_rows} products"
+        )
+    elif delete_task.status == "failed":
+        return TaskStatusResponse(
+            status="failed",
+            current=delete_task.deleted_rows,
+            total=delete_task.total_rows,
+            percentage=0,
+            message=delete_task.error_message
+        )
+    
+    celery_task = celery_app.AsyncResult(task_id)
+    if celery_task.state == 'PROGRESS':
+        info = celery_task.info
+        return TaskStatusResponse(
+            status="processing",
+            current=info.get('current', 0),
+            total=info.get('total', 0),
+            percentage=info.get('percentage', 0)
+        )
     
-    return {"message": f"Successfully deleted {count} products", "count": count}
+    return TaskStatusResponse(
+        status=delete_task.status,
+        current=delete_task.deleted_rows,
+        total=delete_task.total_rows,
+        percentage=0
+    )
+
 
+@router.get("/cache/stats")
+def get_cache_stats():
+    """Product read cache hit/miss counters of the process serving the request"""
+    return product_cache.stats()
 
-@router.get("/export/excel")
-def export_products_to_excel(
+
+@router.get("/export/{export_format}")
+def export_products(
+    export_format: str,
     search: Optional[str] = None,
+    search_mode: str = Query("contains", pattern=SEARCH_MODE_PATTERN),
     active: Optional[bool] = None,
     db: Session = Depends(get_db)
 ):
-    """Export products to Excel file"""
+    """
+    Export products as excel (.xlsx), csv or ndjson
+
+    Rows are read through a server-side cursor. CSV and NDJSON bytes are
+    sent as rows arrive; the workbook is written in openpyxl write-only
+    mode to a temporary file, which is streamed and then removed by a
+    background task, also when the client disconnects early.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=404, detail="Unknown export format")
+    extension, media_type = EXPORT_FORMATS[export_format]
     
     # Query products with filters
-    query = db.query(Product)
-    
-    # Apply filters
-    if search:
-        search_filter = f"%{search}%"
-        query = query.filter(
-            or_(
-                func.lower(Product.sku).like(func.lower(search_filter)),
-                func.lower(Product.name).like(func.lower(search_filter)),
-                func.lower(Product.description).like(func.lower(search_filter))
-            )
-        )
-    
-    if active is not None:
-        query = query.filter(Product.active == active)
-    
-    # Get all products
-    products = query.order_by(Product.id).all()
-    
-    # Create workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Products"
-    
-    # Define headers
-    headers = ["ID", "SKU", "Name", "Description", "Price", "Status", "Created At"]
-    
-    # Style for headers
-    header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF", size=12)
-    header_alignment = Alignment(horizontal="center", vertical="center")
-    
-    # Write headers
-    for col_num, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col_num)
-        cell.value = header
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = header_alignment
-    
-    # Write data
-    for row_num, product in enumerate(products, 2):
-        ws.cell(row=row_num, column=1, value=product.id)
-        ws.cell(row=row_num, column=2, value=product.sku)
-        ws.cell(row=row_num, column=3, value=product.name)
-        ws.cell(row=row_num, column=4, value=product.description or "")
-        ws.cell(row=row_num, column=5, value=product.price or 0.0)
-        ws.cell(row=row_num, column=6, value="Active" if product.active else "Inactive")
-        ws.cell(row=row_num, column=7, value=product.created_at.strftime("%Y-%m-%d %H:%M:%S") if product.created_at else "")
-    
-    # Auto-adjust column widths
-    column_widths = {
-        'A': 10,
-        'B': 15,
-        'C': 30,
-        'D': 40,
-        'E': 12,
-        'F': 12,
-        'G': 20
-    }
-    
-    for col, width in column_widths.items():
-        ws.column_dimensions[col].width = width
-    
-    # Save to BytesIO
-    excel_file = BytesIO()
-    wb.save(excel_file)
-    excel_file.seek(0)
+    query, _ = filter_products(db.query(Product), search, search_mode, active)
+    
+    rows = iter_product_rows(db, query)
+    cleanup = None
+    
+    if export_format == "csv":
+        body = iter_csv(rows)
+    elif export_format == "ndjson":
+        body = iter_ndjson(rows)
+    else:
+        fd, path = tempfile.mkstemp(suffix=".xlsx", dir=settings.upload_dir)
+        os.close(fd)
+        try:
+            write_xlsx(rows, path)
+        except Exception:
+            os.unlink(path)
+            raise
+        body = iter_file(path)
+        cleanup = BackgroundTask(os.unlink, path)
     
     # Generate filename with timestamp
-    filename = f"products_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+    filename = f"products_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
     
-    # Return as streaming response
     return StreamingResponse(
-        excel_file,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        body,
+        media_type=media_type,
         headers={
             "Content-Disposition": f"attachment; filename={filename}"
-        }
+        },
+        background=cleanup
     )
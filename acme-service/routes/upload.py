@@ -1,15 +1,25 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from typing import Iterator, List, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+import asyncio
+import json
 import uuid
 import os
-import shutil
 from pathlib import Path
 
-from dependencies.database import get_db
+from dependencies.database import SessionLocal, get_db, get_async_db
 from dependencies.celery_app import celery_app
-from models import UploadTask
+from models import UploadTask, UploadRange
 from schemas import UploadTaskResponse, TaskStatusResponse
-from app.tasks import process_csv_upload
+from app.tasks import process_csv_upload, is_stalled
+from app.upload_stream import receive_file
+from app.progress import TERMINAL_STATUSES, upload_status, progress_hub
+from app.validation import rejected_path
+from app.readers import IMPORT_FORMATS, import_format
 from config import settings
 
 # Create uploads directory
@@ -17,41 +27,95 @@ Path(settings.upload_dir).mkdir(exist_ok=True)
 
 router = APIRouter(prefix="/api/upload", tags=["upload"])
 
+PROGRESS_HEARTBEAT = 15  # seconds between keep-alive comments on an idle progress stream
 
-@router.post("", response_model=UploadTaskResponse)
-def upload_csv(
-    file: UploadFile = File(...),
-    db: Session = Depends(get_db)
-):
-    """Upload CSV file for processing"""
-    if not file.filename.endswith('.csv'):
-        raise HTTPException(status_code=400, detail="Only CSV files are allowed")
-    
-    # Generate unique task ID
-    task_id = str(uuid.uuid4())
-    
-    # Save uploaded file
-    file_path = os.path.join(settings.upload_dir, f"{task_id}_{file.filename}")
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    
-    # Create upload task record
+
+def _upload_path(task_id: str, filename: str) -> str:
+    """Where an uploaded file is stored"""
+    return os.path.join(settings.upload_dir, f"{task_id}_{filename}")
+
+
+def _create_upload_task(db: Session, task_id: str, upload, mode: str, parallel: bool, delta: bool) -> UploadTask:
+    """Record the upload and start async processing"""
     upload_task = UploadTask(
         task_id=task_id,
-        filename=file.filename,
-        status="pending"
+        filename=upload.filename,
+        status="pending",
+        ingest_mode=mode,
+        parallel=parallel,
+        delta=delta,
+        total_bytes=upload.size,
+        content_sha256=upload.sha256
     )
     db.add(upload_task)
     db.commit()
     db.refresh(upload_task)
     
-    # Start async processing
-    process_csv_upload.delay(file_path, task_id)
+    # Start async processing; the Celery task shares our task ID so its
+    # progress state can be looked up by the status endpoint
+    process_csv_upload.apply_async(args=[upload.path, task_id], task_id=task_id)
     
     return upload_task
 
 
-@router.get("/status/{task_id}", response_model=TaskStatusResponse)
+@router.post(
+    "",
+    response_model=UploadTaskResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "required": ["file"],
+                        "properties": {"file": {"type": "string", "format": "binary"}}
+                    }
+                }
+            }
+        }
+    }
+)
+async def upload_csv(
+    request: Request,
+    mode: str = Query("upsert", pattern="^(upsert|copy)$"),
+    parallel: bool = Query(False),
+    delta: bool = Query(False),
+    db: Session = Depends(get_db)
+):
+    """
+    Upload a product file for processing
+
+    Accepted formats: CSV, gzip or zstd compressed CSV (.csv.gz, .csv.zst),
+    Parquet and NDJSON (.ndjson, .jsonl), recognized by file name.
+
+    The multipart "file" field is streamed straight to the uploads directory
+    and hashed on the way; uploads over max_upload_size are rejected with 413
+    as soon as the limit is crossed.
+
+    mode selects the ingest engine: "upsert" (batched INSERT ... ON CONFLICT)
+    or "copy" (COPY into a staging table, then a set-based merge).
+    parallel splits the file into byte ranges imported by separate workers
+    (plain CSV only; other formats are imported sequentially).
+    delta skips rows whose name, description and price are unchanged.
+    """
+    # Generate unique task ID
+    task_id = str(uuid.uuid4())
+    
+    def destination(filename: str) -> str:
+        if import_format(filename) is None:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unsupported file type, allowed: {', '.join(IMPORT_FORMATS)}"
+            )
+        return _upload_path(task_id, filename)
+    
+    # Save uploaded file
+    upload = await receive_file(request, "file", destination, settings.max_upload_size)
+    
+    return await run_in_threadpool(_create_upload_task, db, task_id, upload, mode, parallel, delta)
+
+
 def get_upload_status(task_id: str, db: Session = Depends(get_db)):
     """Get upload task status"""
     # Check database for task info
@@ -61,35 +125,169 @@ def get_upload_status(task_id: str, db: Session = Depends(get_db)):
     
     # Get Celery task status
     celery_task = celery_app.AsyncResult(task_id)
+    return upload_status(upload_task, celery_task.state, celery_task.info)
+
+
+async def get_upload_status_async(task_id: str, db: AsyncSession = Depends(get_async_db)):
+    """Get upload task status"""
+    upload_task = await db.scalar(select(UploadTask).where(UploadTask.task_id == task_id))
+    if not upload_task:
+        raise HTTPException(status_code=404, detail="Task not found")
     
-    if celery_task.state == 'PROGRESS':
-        info = celery_task.info
-        return TaskStatusResponse(
-            status="processing",
-            current=info.get('current', 0),
-            total=info.get('total', 0),
-            percentage=info.get('percentage', 0)
-        )
-    elif upload_task.status == "completed":
-        return TaskStatusResponse(
-            status="completed",
-            current=upload_task.processed_rows,
-            total=upload_task.total_rows,
-            percentage=100,
-            message="Upload completed successfully"
-        )
-    elif upload_task.status == "failed":
-        return TaskStatusResponse(
-            status="failed",
-            current=upload_task.processed_rows,
-            total=upload_task.total_rows,
-            percentage=0,
-            message=upload_task.error_message
-        )
+    # The result backend client is blocking, only this lookup goes to the threadpool
+    celery_task = celery_app.AsyncResult(task_id)
+    state, info = await run_in_threadpool(lambda: (celery_task.state, celery_task.info))
+    return upload_status(upload_task, state, info)
+
+
+router.get("/status/{task_id}", response_model=TaskStatusResponse)(
+    get_upload_status_async if settings.async_reads else get_upload_status
+)
+
+
+def _read_upload_status(task_id: str):
+    """Current status from a short-lived session, or None if the task does not exist"""
+    db = SessionLocal()
+    try:
+        upload_task = db.query(UploadTask).filter(UploadTask.task_id == task_id).first()
+        if not upload_task:
+            return None
+        celery_task = celery_app.AsyncResult(task_id)
+        return upload_status(upload_task, celery_task.state, celery_task.info)
+    finally:
+        db.close()
+
+
+@router.get("/progress/{task_id}", response_class=StreamingResponse)
+async def stream_upload_progress(task_id: str):
+    """
+    Stream upload progress as Server-Sent Events
+
+    Sends the current status, then every status the import publishes, and
+    ends after the completed or failed status. Each event's data is a
+    TaskStatusResponse. Watchers of the same task share one Redis
+    subscription per API process.
+    """
+    # Subscribe before reading the snapshot so no update falls in between
+    queue = await progress_hub.subscribe(task_id)
+    try:
+        status = await run_in_threadpool(_read_upload_status, task_id)
+    except BaseException:
+        progress_hub.unsubscribe(task_id, queue)
+        raise
+    if status is None:
+        progress_hub.unsubscribe(task_id, queue)
+        raise HTTPException(status_code=404, detail="Task not found")
+    
+    async def events():
+        try:
+            event = status.model_dump()
+            yield f"data: {json.dumps(event)}\n\n"
+            while event["status"] not in TERMINAL_STATUSES:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=PROGRESS_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"data: {json.dumps(event)}\n\n"
+        finally:
+            progress_hub.unsubscribe(task_id, queue)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _report_name(filename: str) -> str:
+    """The uploaded file's name with its format suffix (.parquet, .csv.zst, ...) replaced by .csv"""
+    suffix = import_format(filename)
+    stem = filename[:-len(suffix)] if suffix else os.path.splitext(filename)[0]
+    return f"{stem}.csv"
+
+
+def _iter_report(parts: List[Tuple[str, int]]) -> Iterator[bytes]:
+    """Concatenate the committed bytes of report parts, keeping only the first part's header"""
+    for index, (path, size) in enumerate(parts):
+        with open(path, 'rb') as f:
+            remaining = size
+            if index > 0:
+                remaining -= len(f.readline())
+            while remaining > 0:
+                chunk = f.read(min(64 * 1024, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+
+@router.get("/{task_id}/rejected")
+def download_rejected_rows(task_id: str, db: Session = Depends(get_db)):
+    """
+    Download the rows an import rejected, as CSV with an error column
+
+    Available while the import runs and covers the committed blocks;
+    parallel imports are assembled from their per-range parts.
+    """
+    upload_task = db.query(UploadTask).filter(UploadTask.task_id == task_id).first()
+    if not upload_task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    
+    if upload_task.parallel:
+        ranges = db.query(UploadRange).filter(
+            UploadRange.task_id == task_id,
+            UploadRange.rejected_bytes > 0
+        ).order_by(UploadRange.start_offset).all()
+        parts = [(rejected_path(task_id, r.start_offset), r.rejected_bytes) for r in ranges]
+    elif upload_task.rejected_bytes:
+        parts = [(rejected_path(task_id), upload_task.rejected_bytes)]
     else:
-        return TaskStatusResponse(
-            status=upload_task.status,
-            current=upload_task.processed_rows,
-            total=upload_task.total_rows,
-            percentage=0
-        )
+        parts = []
+    
+    parts = [(path, size) for path, size in parts if os.path.exists(path)]
+    if not parts:
+        raise HTTPException(status_code=404, detail="No rejected rows")
+    
+    return StreamingResponse(
+        _iter_report(parts),
+        media_type="text/csv",
+        headers={"Content-Disposition": f"attachment; filename=rejected_{_report_name(upload_task.filename)}"}
+    )
+
+
+@router.post("/{task_id}/resume", response_model=UploadTaskResponse)
+def resume_upload(task_id: str, db: Session = Depends(get_db)):
+    """
+    Resume a failed import from its last committed checkpoint
+
+    An import still "processing" that has not moved for
+    import_stalled_after seconds lost its worker (hard time limit, OOM
+    kill) and can be resumed as well.
+    """
+    upload_task = db.query(UploadTask).filter(UploadTask.task_id == task_id).first()
+    if not upload_task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    
+    if upload_task.status != "failed" and not is_stalled(upload_task):
+        raise HTTPException(status_code=409, detail="Only failed or stalled uploads can be resumed")
+    
+    file_path = _upload_path(task_id, upload_task.filename)
+    if not os.path.exists(file_path):
+        raise HTTPException(status_code=410, detail="Uploaded file is no longer available")
+    
+    upload_task.status = "pending"
+    upload_task.error_message = None
+    # Ranges still processing belong to a live worker and are not dispatched again
+    for upload_range in db.query(UploadRange).filter(
+        UploadRange.task_id == task_id,
+        UploadRange.status.in_(["failed", "processing"])
+    ).all():
+        if upload_range.status == "failed" or is_stalled(upload_range):
+            upload_range.status = "pending"
+    db.commit()
+    db.refresh(upload_task)
+    
+    process_csv_upload.apply_async(args=[file_path, task_id], task_id=task_id)
+    
+    return upload_task
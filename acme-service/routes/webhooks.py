@@ -1,23 +1,37 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
-import httpx
+from typing import List, Optional
 import time
+import uuid
 
-from dependencies.database import get_db
-from models import Webhook
-from schemas import WebhookCreate, WebhookUpdate, WebhookResponse
+from config import settings
+from dependencies.database import get_db, get_async_db
+from app.delivery import delivery_engine
+from app.subscriptions import invalidate_subscriptions
+from app.tasks import retry_webhook_delivery
+from models import Webhook, WebhookDelivery
+from schemas import WebhookCreate, WebhookUpdate, WebhookResponse, WebhookDeliveryResponse
 
 router = APIRouter(prefix="/api/webhooks", tags=["webhooks"])
 
 
-@router.get("", response_model=List[WebhookResponse])
 def get_webhooks(db: Session = Depends(get_db)):
     """Get all webhooks"""
     webhooks = db.query(Webhook).order_by(Webhook.id.desc()).all()
     return webhooks
 
 
+async def get_webhooks_async(db: AsyncSession = Depends(get_async_db)):
+    """Get all webhooks"""
+    webhooks = (await db.scalars(select(Webhook).order_by(Webhook.id.desc()))).all()
+    return webhooks
+
+
+router.get("", response_model=List[WebhookResponse])(get_webhooks_async if settings.async_reads else get_webhooks)
+
+
 @router.post("", response_model=WebhookResponse, status_code=201)
 def create_webhook(webhook: WebhookCreate, db: Session = Depends(get_db)):
     """Create a new webhook"""
@@ -25,12 +39,13 @@ def create_webhook(webhook: WebhookCreate, db: Session = Depends(get_db)):
     db.add(db_webhook)
     db.commit()
     db.refresh(db_webhook)
+    invalidate_subscriptions()
     return db_webhook
 
 
 @router.put("/{webhook_id}", response_model=WebhookResponse)
 def update_webhook(
-    webhook_id: int,
+    webhook_id: uuid.UUID,
     webhook_update: WebhookUpdate,
     db: Session = Depends(get_db)
 ):
@@ -45,11 +60,12 @@ def update_webhook(
     
     db.commit()
     db.refresh(webhook)
+    invalidate_subscriptions()
     return webhook
 
 
 @router.delete("/{webhook_id}")
-def delete_webhook(webhook_id: int, db: Session = Depends(get_db)):
+def delete_webhook(webhook_id: uuid.UUID, db: Session = Depends(get_db)):
     """Delete a webhook"""
     webhook = db.query(Webhook).filter(Webhook.id == webhook_id).first()
     if not webhook:
@@ -57,11 +73,12 @@ def delete_webhook(webhook_id: int, db: Session = Depends(get_db)):
     
     db.delete(webhook)
     db.commit()
+    invalidate_subscriptions()
     return {"message": "Webhook deleted successfully"}
 
 
 @router.post("/{webhook_id}/test")
-def test_webhook(webhook_id: int, db: Session = Depends(get_db)):
+def test_webhook(webhook_id: uuid.UUID, db: Session = Depends(get_db)):
     """Test a webhook by sending a test payload"""
     webhook = db.query(Webhook).filter(Webhook.id == webhook_id).first()
     if not webhook:
@@ -75,20 +92,76 @@ def test_webhook(webhook_id: int, db: Session = Depends(get_db)):
         }
     }
     
-    try:
-        start_time = time.time()
-        with httpx.Client(timeout=10.0) as client:
-            response = client.post(webhook.url, json=test_payload)
-        response_time = int((time.time() - start_time) * 1000)
-        
-        return {
-            "success": True,
-            "status_code": response.status_code,
-            "response_time_ms": response_time,
-            "message": "Webhook test successful"
-        }
-    except Exception as e:
+    result = delivery_engine.deliver([(webhook.id, webhook.url)], test_payload)[0]
+    if result.error:
         return {
             "success": False,
-            "message": str(e)
+            "response_time_ms": result.latency_ms,
+            "message": result.error
         }
+    
+    return {
+        "success": True,
+        "status_code": result.status_code,
+        "response_time_ms": result.latency_ms,
+        "message": "Webhook test successful"
+    }
+
+
+@router.get("/deliveries", response_model=List[WebhookDeliveryResponse])
+def get_deliveries(
+    webhook_id: Optional[uuid.UUID] = None,
+    status: Optional[str] = Query(None, pattern="^(pending|delivered|retrying|dead)$"),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    """Get the most recent webhook deliveries, e.g. status=dead for the dead-letter queue"""
+    query = db.query(WebhookDelivery)
+    if webhook_id:
+        query = query.filter(WebhookDelivery.webhook_id == webhook_id)
+    if status:
+        query = query.filter(WebhookDelivery.status == status)
+    return query.order_by(WebhookDelivery.created_at.desc()).limit(limit).all()
+
+
+def _replay(deliveries: List[WebhookDelivery], db: Session) -> None:
+    """Queue dead deliveries for a fresh round of attempts"""
+    for delivery in deliveries:
+        delivery.status = "retrying"
+        delivery.attempts = 0
+        delivery.next_attempt_at = None
+    db.commit()
+    
+    for delivery in deliveries:
+        retry_webhook_delivery.delay(str(delivery.id))
+
+
+@router.post("/deliveries/{delivery_id}/replay", response_model=WebhookDeliveryResponse)
+def replay_delivery(delivery_id: uuid.UUID, db: Session = Depends(get_db)):
+    """Send a dead-lettered delivery again"""
+    delivery = db.query(WebhookDelivery).filter(WebhookDelivery.id == delivery_id).first()
+    if not delivery:
+        raise HTTPException(status_code=404, detail="Delivery not found")
+    
+    if delivery.status != "dead":
+        raise HTTPException(status_code=409, detail="Only dead deliveries can be replayed")
+    
+    _replay([delivery], db)
+    db.refresh(delivery)
+    return delivery
+
+
+@router.post("/{webhook_id}/replay")
+def replay_dead_deliveries(webhook_id: uuid.UUID, db: Session = Depends(get_db)):
+    """Send every dead-lettered delivery of a webhook again"""
+    webhook = db.query(Webhook).filter(Webhook.id == webhook_id).first()
+    if not webhook:
+        raise HTTPException(status_code=404, detail="Webhook not found")
+    
+    deliveries = db.query(WebhookDelivery).filter(
+        WebhookDelivery.webhook_id == webhook_id,
+        WebhookDelivery.status == "dead"
+    ).all()
+    _replay(deliveries, db)
+    
+    return {"message": f"Replaying {len(deliveries)} deliveries", "count": len(deliveries)}
@@ -1,13 +1,14 @@
 from pydantic import BaseModel, Field, HttpUrl
-from typing import Optional
+from typing import Any, Dict, List, Optional
 from datetime import datetime
+from uuid import UUID
 
 
 class ProductBase(BaseModel):
     sku: str = Field(..., min_length=1, max_length=255)
     name: str = Field(..., min_length=1, max_length=500)
     description: Optional[str] = None
-    price: Optional[float] = None
+    price: Optional[float] = Field(None, allow_inf_nan=False)
     active: bool = True
 
 
@@ -19,12 +20,41 @@ class ProductUpdate(BaseModel):
     sku: Optional[str] = Field(None, min_length=1, max_length=255)
     name: Optional[str] = Field(None, min_length=1, max_length=500)
     description: Optional[str] = None
-    price: Optional[float] = None
+    price: Optional[float] = Field(None, allow_inf_nan=False)
     active: Optional[bool] = None
 
 
+class ProductBatchUpdate(BaseModel):
+    sku: str = Field(..., min_length=1, max_length=255)
+    name: Optional[str] = Field(None, min_length=1, max_length=500)
+    description: Optional[str] = None
+    price: Optional[float] = Field(None, allow_inf_nan=False)
+    active: Optional[bool] = None
+
+
+class ProductBatchDelete(BaseModel):
+    sku: str = Field(..., min_length=1, max_length=255)
+
+
+class ProductBatchItemResult(BaseModel):
+    index: int
+    sku: Optional[str] = None
+    status: str  # created, updated, deleted, failed, invalid, skipped
+    error: Optional[str] = None
+
+
+class ProductBatchResponse(BaseModel):
+    operation: str
+    total: int
+    created: int = 0
+    updated: int = 0
+    deleted: int = 0
+    failed: int = 0
+    results: List[ProductBatchItemResult]
+
+
 class ProductResponse(ProductBase):
-    id: int
+    id: UUID
     created_at: datetime
     updated_at: Optional[datetime] = None
     
@@ -32,11 +62,22 @@ class ProductResponse(ProductBase):
         from_attributes = True
 
 
+class ProductListResponse(BaseModel):
+    items: List[ProductResponse]
+    total: Optional[int] = None
+    total_is_estimate: bool = False
+    skip: int
+    limit: int
+    next_cursor: Optional[str] = None
+
+
 class WebhookBase(BaseModel):
     url: str = Field(..., max_length=2048)
     event_type: str = Field(..., max_length=100)
     enabled: bool = True
     description: Optional[str] = None
+    batch_enabled: bool = False
+    batch_max_events: Optional[int] = Field(None, ge=1, le=10000)
 
 
 class WebhookCreate(WebhookBase):
@@ -48,10 +89,16 @@ class WebhookUpdate(BaseModel):
     event_type: Optional[str] = Field(None, max_length=100)
     enabled: Optional[bool] = None
     description: Optional[str] = None
+    batch_enabled: Optional[bool] = None
+    batch_max_events: Optional[int] = Field(None, ge=1, le=10000)
 
 
 class WebhookResponse(WebhookBase):
-    id: int
+    id: UUID
+    last_status_code: Optional[int] = None
+    last_latency_ms: Optional[int] = None
+    last_error: Optional[str] = None
+    last_delivered_at: Optional[datetime] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
     
@@ -59,13 +106,46 @@ class WebhookResponse(WebhookBase):
         from_attributes = True
 
 
+class WebhookDeliveryResponse(BaseModel):
+    id: UUID
+    webhook_id: UUID
+    event_type: str
+    url: str
+    status: str
+    attempts: int
+    last_status_code: Optional[int] = None
+    last_latency_ms: Optional[int] = None
+    last_error: Optional[str] = None
+    next_attempt_at: Optional[datetime] = None
+    delivered_at: Optional[datetime] = None
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
 class UploadTaskResponse(BaseModel):
-    id: int
+    id: UUID
     task_id: str
     filename: str
     status: str
+    ingest_mode: str
+    parallel: bool = False
+    delta: bool = False
+    ranges_total: int = 0
+    ranges_completed: int = 0
     total_rows: int
     processed_rows: int
+    inserted_rows: int = 0
+    updated_rows: int = 0
+    unchanged_rows: int = 0
+    rejected_rows: int = 0
+    total_bytes: int = 0
+    processed_bytes: int = 0
+    checkpoint_offset: int = 0
+    chunk_stats: Optional[Dict[str, Any]] = None
+    attempts: int = 0
+    content_sha256: Optional[str] = None
     error_message: Optional[str] = None
     created_at: datetime
     
@@ -78,5 +158,28 @@ class TaskStatusResponse(BaseModel):
     current: int
     total: int
     percentage: int
+    bytes_processed: int = 0
+    bytes_total: int = 0
     message: Optional[str] = None
+    download_url: Optional[str] = None
+    rejected_rows: int = 0
+    rejected_url: Optional[str] = None
+
+
+class ExportTaskResponse(BaseModel):
+    id: UUID
+    task_id: str
+    export_format: str
+    search: Optional[str] = None
+    search_mode: str
+    active: Optional[bool] = None
+    catalog_version: int
+    status: str
+    total_rows: int
+    processed_rows: int
+    error_message: Optional[str] = None
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
 
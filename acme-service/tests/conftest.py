@@ -0,0 +1,16 @@
+"""
+Settings for importing the app in unit tests
+
+config.Settings requires the PostgreSQL connection settings; the tests
+never connect, so placeholders are enough when no .env provides them.
+"""
+import os
+
+for name, value in {
+    'POSTGRES_DB': 'test',
+    'POSTGRES_HOST': 'localhost',
+    'POSTGRES_PORT': '5432',
+    'POSTGRES_USER': 'test',
+    'POSTGRES_PASSWORD': 'test',
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,42 @@
+"""
+Tests for batch item validation: bad items are reported per item and never
+reach the batch statement.
+"""
+import json
+
+import pytest
+
+from app.bulk import parse_batch_body, validate_batch
+
+
+@pytest.mark.parametrize('operation', ['create', 'upsert', 'update'])
+@pytest.mark.parametrize('token', ['NaN', 'Infinity', '-Infinity'])
+def test_non_finite_price_is_rejected_per_item(operation, token):
+    body = f'[{{"sku": "A1", "name": "a", "price": 5}}, {{"sku": "B1", "name": "b", "price": {token}}}]'
+    raw_items = parse_batch_body(body.encode(), ndjson=False)
+
+    valid, results = validate_batch(operation, raw_items)
+
+    assert list(valid) == ['a1']
+    assert results[0]['status'] is None
+    assert results[1]['status'] == 'invalid'
+    assert results[1]['error'].startswith('price:')
+    # What reaches jsonb_to_recordset is plain JSON
+    json.dumps([item.model_dump() for _, item in valid.values()], allow_nan=False)
+
+
+def test_non_finite_price_in_ndjson_is_rejected_per_item():
+    body = b'{"sku": "A1", "name": "a", "price": 1.5}\n{"sku": "B1", "name": "b", "price": NaN}\n'
+
+    valid, results = validate_batch('upsert', parse_batch_body(body, ndjson=True))
+
+    assert list(valid) == ['a1']
+    assert [r['status'] for r in results] == [None, 'invalid']
+
+
+def test_sku_is_stripped_before_validation():
+    valid, results = validate_batch('create', [{'sku': '   ', 'name': 'blank'}, {'sku': ' C1 ', 'name': 'c'}])
+
+    assert list(valid) == ['c1']
+    assert valid['c1'][1].sku == 'C1'
+    assert results[0]['status'] == 'invalid'
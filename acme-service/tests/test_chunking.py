@@ -0,0 +1,147 @@
+"""
+Tests for adaptive batch sizing
+
+BlockSizer: the next block grows or shrinks with the measured throughput,
+stays within the configured row bounds and block memory cap, and a
+resumed import continues from the recorded stats. statement_bounds: the
+upsert statements of a block stay under import_max_statement_bytes.
+
+Run from acme-service: python -m pytest tests
+"""
+import pandas as pd
+import pytest
+
+from app.chunking import MAX_BLOCK_BYTES, RECENT_BATCHES, BlockSizer
+from app.loaders import ROW_OVERHEAD_BYTES, statement_bounds
+from config import settings
+
+
+@pytest.fixture(autouse=True)
+def sizing_settings(monkeypatch):
+    monkeypatch.setattr(settings, 'import_min_batch_rows', 1_000)
+    monkeypatch.setattr(settings, 'import_max_batch_rows', 200_000)
+    monkeypatch.setattr(settings, 'import_target_batch_seconds', 1.0)
+
+
+def test_starts_unsized():
+    sizer = BlockSizer()
+
+    assert sizer() is None
+    assert sizer.summary()['batches'] == 0
+
+
+def test_grows_with_throughput_at_most_doubling():
+    sizer = BlockSizer()
+
+    # 10,000 rows/s would fill the 1 s target with 10,000 rows
+    sizer.observe(1_000, 100_000, 0.1)
+    assert sizer() == 2_000 * 100
+    sizer.observe(2_000, 200_000, 0.2)
+    assert sizer() == 4_000 * 100
+    sizer.observe(4_000, 400_000, 0.4)
+    sizer.observe(8_000, 800_000, 0.8)
+    assert sizer() == 10_000 * 100
+
+
+def test_shrinks_when_blocks_are_slow():
+    sizer = BlockSizer()
+
+    sizer.observe(10_000, 1_000_000, 5.0)
+
+    assert sizer() == 2_000 * 100
+
+
+def test_stays_within_row_bounds(monkeypatch):
+    sizer = BlockSizer()
+    sizer.observe(1_000, 100_000, 10.0)
+    assert sizer() == settings.import_min_batch_rows * 100
+
+    monkeypatch.setattr(settings, 'import_max_batch_rows', 5_000)
+    sizer = BlockSizer()
+    sizer.observe(100_000, 10_000_000, 0.1)
+    assert sizer() == 5_000 * 100
+
+
+def test_block_bytes_are_capped():
+    sizer = BlockSizer()
+
+    # 200,000 rows of 10 kB each would be a 2 GB block
+    sizer.observe(100_000, 1_000_000_000, 0.1)
+
+    assert sizer() == MAX_BLOCK_BYTES
+
+
+def test_row_width_is_a_moving_average():
+    sizer = BlockSizer()
+
+    sizer.observe(1_000, 100_000, 1.0)
+    sizer.observe(1_000, 1_100_000, 1.0)
+
+    # Wider rows make the next block larger in bytes, but by less than
+    # the newest block alone would suggest
+    assert sizer.bytes_per_row == pytest.approx(400)
+    assert sizer() == 1_000 * 400
+
+
+def test_empty_or_instant_blocks_keep_the_size():
+    sizer = BlockSizer()
+    sizer.observe(1_000, 100_000, 0.5)
+    size = sizer()
+
+    sizer.observe(0, 0, 0.2)
+    sizer.observe(500, 50_000, 0.0)
+
+    assert sizer() == size
+    assert sizer.summary()['batches'] == 3
+    assert sizer.summary()['min_batch_rows'] == 0
+
+
+def test_summary_keeps_recent_batches():
+    sizer = BlockSizer()
+    for n in range(RECENT_BATCHES + 5):
+        sizer.observe(1_000 + n, 100_000, 0.5)
+
+    summary = sizer.summary()
+
+    assert len(summary['recent']) == RECENT_BATCHES
+    assert summary['recent'][-1] == [1_000 + RECENT_BATCHES + 4, 100_000, 500]
+    assert summary['min_batch_rows'] == 1_000
+    assert summary['max_batch_rows'] == 1_000 + RECENT_BATCHES + 4
+
+
+def test_resumes_from_previous_stats():
+    uninterrupted = BlockSizer()
+    first = BlockSizer()
+    for sizer in (uninterrupted, first):
+        sizer.observe(1_000, 100_000, 0.5)
+        sizer.observe(2_000, 200_000, 1.0)
+
+    resumed = BlockSizer(previous=first.summary())
+
+    assert resumed() == first()
+    for sizer in (uninterrupted, resumed):
+        sizer.observe(4_000, 400_000, 1.0)
+    assert resumed() == uninterrupted()
+    assert resumed.summary() == uninterrupted.summary()
+
+
+def products(*lengths):
+    return pd.DataFrame({
+        'sku': [f'{n:04d}' for n in range(len(lengths))],
+        'name': ['n' * length for length in lengths],
+        'description': [None] * len(lengths),
+    })
+
+
+def test_statements_stay_under_max_bytes():
+    row_bytes = 4 + 96 + ROW_OVERHEAD_BYTES
+    frame = products(*[96] * 10)
+
+    assert statement_bounds(frame, 100, row_bytes * 4) == [(0, 4), (4, 8), (8, 10)]
+    assert statement_bounds(frame, 3, row_bytes * 4) == [(0, 3), (3, 6), (6, 9), (9, 10)]
+
+
+def test_oversized_row_gets_its_own_statement():
+    frame = products(10, 10_000, 10)
+
+    assert statement_bounds(frame, 100, 1_000) == [(0, 1), (1, 2), (2, 3)]
@@ -0,0 +1,41 @@
+"""
+Tests for the streaming export encoders
+"""
+import csv
+import io
+import json
+import uuid
+from datetime import datetime, timezone
+
+from openpyxl import load_workbook
+
+from app.exporters import iter_csv, iter_ndjson, write_xlsx
+
+CREATED_AT = datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+ROWS = [
+    (uuid.UUID(int=1), 'A1', 'Priced', 'd', 9.5, True, CREATED_AT),
+    (uuid.UUID(int=2), 'B1', 'Unpriced', None, None, False, CREATED_AT),
+    (uuid.UUID(int=3), 'C1', 'Free', None, 0.0, True, CREATED_AT),
+]
+
+
+def test_csv_leaves_a_null_price_empty():
+    lines = list(csv.reader(io.StringIO(b''.join(iter_csv(ROWS)).decode())))
+
+    assert lines[0][4] == 'Price'
+    assert [line[4] for line in lines[1:]] == ['9.5', '', '0.0']
+
+
+def test_ndjson_keeps_a_null_price_null():
+    records = [json.loads(line) for line in b''.join(iter_ndjson(ROWS)).decode().splitlines()]
+
+    assert [record['price'] for record in records] == [9.5, None, 0.0]
+
+
+def test_xlsx_keeps_showing_a_null_price_as_zero(tmp_path):
+    path = tmp_path / 'products.xlsx'
+
+    assert write_xlsx(ROWS, str(path)) == 3
+
+    sheet = load_workbook(path).active
+    assert [row[4] for row in sheet.iter_rows(min_row=2, values_only=True)] == [9.5, 0, 0]
@@ -0,0 +1,141 @@
+"""
+Tests for the import readers
+
+split_record_ranges: parallel import ranges must start on record
+boundaries, also when a quoted field with embedded newlines straddles the
+offset a range was aimed at. as_text and the typed readers: NDJSON and
+Parquet values must come out as the same strings a CSV of the same data
+gives.
+
+Run from acme-service: python -m pytest tests
+"""
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.readers import (
+    CsvReader, NdjsonReader, ParquetReader, as_text, parse_block, read_header, split_record_ranges
+)
+
+COLUMNS = ['sku', 'name', 'description', 'price']
+
+
+def make_csv(rows):
+    return pd.DataFrame(rows, columns=COLUMNS).to_csv(index=False).encode()
+
+
+def read_ranges(data, ranges):
+    """Parse every range on its own, as import_csv_range does, and concatenate the frames"""
+    frames = [parse_block(data[start:end], COLUMNS) for start, end in ranges if end > start]
+    return pd.concat(frames, ignore_index=True)
+
+
+def assert_covers(data, data_start, ranges):
+    assert ranges[0][0] == data_start
+    assert ranges[-1][1] == len(data)
+    for (_, end), (start, _) in zip(ranges, ranges[1:]):
+        assert end == start
+
+
+def straddling_csv():
+    """A CSV whose middle record has a long multi-line quoted description across the halfway offset"""
+    short = [[f'K{i}', f'Name {i}', 'short', f'{i}.5'] for i in range(20)]
+    description = '\n'.join(f'line {n}, with "quotes"' for n in range(200))
+    rows = short[:10] + [['LONG', 'Long, name', description, '1']] + short[10:]
+    return rows, make_csv(rows)
+
+
+def test_boundary_skips_quoted_newlines_across_target():
+    rows, data = straddling_csv()
+    _, data_start = read_header(io.BytesIO(data))
+
+    # The halfway target falls inside the long quoted field
+    target = data_start + (len(data) - data_start) // 2
+    field_start = data.index(b'"line 0')
+    field_end = data.index(b'"', data.index(b'line 199')) + 1
+    assert field_start < target < field_end
+
+    ranges = split_record_ranges(io.BytesIO(data), data_start, 2)
+
+    assert_covers(data, data_start, ranges)
+    for start, _ in ranges[1:]:
+        assert not field_start < start < field_end
+    assert read_ranges(data, ranges).values.tolist() == rows
+
+
+@pytest.mark.parametrize('scan_size', [7, 64, 1000])
+def test_quote_parity_carries_across_scan_blocks(scan_size):
+    rows, data = straddling_csv()
+    _, data_start = read_header(io.BytesIO(data))
+
+    ranges = split_record_ranges(io.BytesIO(data), data_start, 4, scan_size=scan_size)
+
+    assert_covers(data, data_start, ranges)
+    assert ranges == split_record_ranges(io.BytesIO(data), data_start, 4)
+    assert read_ranges(data, ranges).values.tolist() == rows
+
+
+@pytest.mark.parametrize('parts', [2, 3, 8, 50])
+def test_every_range_starts_on_a_record(parts):
+    rows = [[f'K{i}', f'Name, {i}', f'multi\nline\n"{i}"', f'{i}.5'] for i in range(300)]
+    data = make_csv(rows)
+    _, data_start = read_header(io.BytesIO(data))
+
+    ranges = split_record_ranges(io.BytesIO(data), data_start, parts)
+
+    assert_covers(data, data_start, ranges)
+    assert read_ranges(data, ranges).values.tolist() == rows
+    for start, end in ranges:
+        assert start < end
+        assert data[start:start + 1] == b'K'
+
+
+def test_single_part_is_the_whole_data_section():
+    _, data = straddling_csv()
+    _, data_start = read_header(io.BytesIO(data))
+
+    assert split_record_ranges(io.BytesIO(data), data_start, 1) == [(data_start, len(data))]
+
+
+def test_as_text_writes_integral_floats_as_integers():
+    df = pd.DataFrame({
+        'sku': [1.0, np.nan, 2.5],
+        'name': pd.array([7, None, 9], dtype='Int64'),
+        'price': [1.0, None, 2.0],
+    })
+
+    text = as_text(df, keep_numeric=('price',))
+
+    assert text['sku'].tolist() == ['1', None, '2.5']
+    assert text['name'].tolist() == ['7', None, '9']
+    assert text['price'].dtype == np.float64
+
+
+def first_block(reader_class, path):
+    with reader_class(str(path)) as reader:
+        frame, _, _ = next(iter(reader.blocks(0, None, 1024 * 1024)))
+    return frame
+
+
+def test_numeric_skus_read_as_in_csv(tmp_path):
+    csv_path = tmp_path / 'p.csv'
+    csv_path.write_bytes(b'sku,name,price\n1,One,1.5\n2,Two,\nA3,Three,3\n')
+    ndjson_path = tmp_path / 'p.ndjson'
+    ndjson_path.write_bytes(
+        b'{"sku": 1, "name": "One", "price": 1.5}\n'
+        b'{"sku": 2, "name": "Two", "price": null}\n'
+        b'{"sku": "A3", "name": "Three", "price": 3}\n'
+    )
+    # An integer SKU column with a null, which pandas turns into floats
+    pa = pytest.importorskip('pyarrow')
+    pq = pytest.importorskip('pyarrow.parquet')
+    parquet_path = tmp_path / 'p.parquet'
+    pq.write_table(pa.table({'sku': pa.array([1, 2, None]), 'name': ['One', 'Two', 'Three']}), str(parquet_path))
+
+    with CsvReader(str(csv_path)) as reader:
+        csv_frame, _, _ = next(iter(reader.blocks(reader.data_start, None, 1024 * 1024)))
+
+    assert first_block(NdjsonReader, ndjson_path)['sku'].tolist() == csv_frame['sku'].tolist() == ['1', '2', 'A3']
+    assert first_block(ParquetReader, parquet_path)['sku'].tolist() == ['1', '2', None]
@@ -0,0 +1,162 @@
+"""
+Tests for how import tasks record failures, with a fake session instead
+of a database.
+"""
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from celery.exceptions import SoftTimeLimitExceeded
+
+import app.tasks as tasks
+from config import settings
+from models import UploadRange, UploadTask
+
+RANGE_ID = '00000000-0000-0000-0000-000000000001'
+
+
+class FakeQuery:
+    def __init__(self, session, model):
+        self.session = session
+        self.model = model
+
+    def filter(self, *criteria):
+        return self
+
+    def first(self):
+        return self.session.rows.get(self.model)
+
+    def update(self, values, synchronize_session=None):
+        self.session.events.append(('update', self.model, values))
+        return 1
+
+
+class FakeSession:
+    """Records updates and transaction boundaries in order"""
+
+    def __init__(self, rows=None):
+        self.rows = rows or {}
+        self.events = []
+
+    def query(self, model):
+        return FakeQuery(self, model)
+
+    def commit(self):
+        self.events.append(('commit',))
+
+    def rollback(self):
+        self.events.append(('rollback',))
+
+    def close(self):
+        pass
+
+    def updates(self, model):
+        return [event[2] for event in self.events if event[0] == 'update' and event[1] is model]
+
+
+@pytest.fixture(autouse=True)
+def no_progress_push(monkeypatch):
+    monkeypatch.setattr(tasks, '_publish_upload_status', lambda db, task_id: None)
+
+
+def test_range_out_of_time_retries_is_marked_failed_with_its_task(monkeypatch):
+    upload_range = SimpleNamespace(
+        status='pending', checkpoint_offset=10, start_offset=10, end_offset=100,
+        rejected_bytes=0, chunk_stats=None
+    )
+    session = FakeSession({UploadRange: upload_range})
+    monkeypatch.setattr(tasks, 'SessionLocal', lambda: session)
+    monkeypatch.setattr(tasks.import_csv_range, 'max_retries', 0)
+
+    def out_of_time(*args, **kwargs):
+        raise SoftTimeLimitExceeded()
+    monkeypatch.setattr(tasks, 'CsvReader', out_of_time)
+
+    with pytest.raises(SoftTimeLimitExceeded):
+        tasks.import_csv_range.run('/tmp/p.csv', 'task-1', RANGE_ID, ['sku', 'name'], 'upsert')
+
+    # Task and range are marked failed in one transaction after the rollback
+    assert [event[:2] for event in session.events[-4:]] == [
+        ('rollback',), ('update', UploadTask), ('update', UploadRange), ('commit',)
+    ]
+    assert session.updates(UploadTask)[-1][UploadTask.status] == 'failed'
+    assert session.updates(UploadRange) == [{UploadRange.status: 'failed'}]
+
+def test_retry_left_does_not_mark_anything_failed():
+    session = FakeSession()
+    task = SimpleNamespace(
+        request=SimpleNamespace(retries=0), max_retries=3,
+        retry=lambda exc, countdown: RuntimeError('retrying')
+    )
+
+    with pytest.raises(RuntimeError, match='retrying'):
+        tasks._retry_from_checkpoint(task, session, 'task-1', SoftTimeLimitExceeded(), RANGE_ID)
+
+    assert session.updates(UploadTask) == []
+    assert session.updates(UploadRange) == []
+
+
+def test_sequential_import_failure_touches_no_range():
+    session = FakeSession()
+    task = SimpleNamespace(request=SimpleNamespace(retries=3), max_retries=3)
+    error = SoftTimeLimitExceeded()
+
+    with pytest.raises(SoftTimeLimitExceeded):
+        tasks._retry_from_checkpoint(task, session, 'task-1', error)
+
+    assert session.updates(UploadTask) == [{UploadTask.status: 'failed', UploadTask.error_message: str(error)}]
+    assert session.updates(UploadRange) == []
+
+
+def moved_ago(status, seconds, updated=True):
+    moved = datetime.now(timezone.utc) - timedelta(seconds=seconds)
+    return SimpleNamespace(status=status, updated_at=moved if updated else None, created_at=moved)
+
+
+def test_processing_row_without_progress_past_the_bound_is_stalled():
+    assert tasks.is_stalled(moved_ago('processing', settings.import_stalled_after + 60))
+    assert tasks.is_stalled(moved_ago('processing', settings.import_stalled_after + 60, updated=False))
+
+
+def test_recent_progress_or_other_status_is_not_stalled():
+    assert not tasks.is_stalled(moved_ago('processing', 10))
+    for status in ('pending', 'failed', 'completed'):
+        assert not tasks.is_stalled(moved_ago(status, settings.import_stalled_after + 60))
+
+
+@pytest.fixture
+def webhook_queue(monkeypatch):
+    """Subscribers to set per test, plus the direct tasks and buffered events enqueue_webhook_event produced"""
+    queue = SimpleNamespace(subscribers=[], direct=[], buffered=[])
+    monkeypatch.setattr(tasks, 'get_subscribers', lambda event_type: queue.subscribers)
+    monkeypatch.setattr(tasks.trigger_webhooks_async, 'delay', lambda *args, **kwargs: queue.direct.append(kwargs))
+    monkeypatch.setattr(tasks, 'push_event', lambda *args: (queue.buffered.append(args) or len(queue.buffered), False))
+    monkeypatch.setattr(settings, 'webhook_coalesce_window_ms', 500)
+    return queue
+
+
+def test_webhooks_without_batching_are_not_coalesced(webhook_queue):
+    webhook_queue.subscribers = [SimpleNamespace(batch_enabled=False), SimpleNamespace(batch_enabled=None)]
+
+    tasks.enqueue_webhook_event('product.created', {'sku': 'A'})
+
+    assert webhook_queue.direct == [{}]
+    assert webhook_queue.buffered == []
+
+
+def test_only_batching_webhooks_wait_for_the_window(webhook_queue):
+    webhook_queue.subscribers = [SimpleNamespace(batch_enabled=False), SimpleNamespace(batch_enabled=True)]
+
+    tasks.enqueue_webhook_event('product.created', {'sku': 'A'})
+
+    assert webhook_queue.direct == [{'batched': False}]
+    assert len(webhook_queue.buffered) == 1
+
+
+def test_all_batching_webhooks_are_only_buffered(webhook_queue):
+    webhook_queue.subscribers = [SimpleNamespace(batch_enabled=True)]
+
+    tasks.enqueue_webhook_event('product.created', {'sku': 'A'})
+
+    assert webhook_queue.direct == []
+    assert len(webhook_queue.buffered) == 1
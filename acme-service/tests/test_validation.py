@@ -0,0 +1,142 @@
+"""
+Tests for chunk validation and the rejected-rows report
+
+validate_chunk: rows missing a required field, too long for their
+column or with a price that is not a number go to the report instead of
+failing the import. RejectedRowsFile: a resumed run must not repeat rows
+written after the last committed block.
+
+Run from acme-service: python -m pytest tests
+"""
+import pandas as pd
+import pytest
+
+from app.validation import ERROR_COLUMN, MAX_LENGTHS, RejectedRowsFile, validate_chunk
+from models import Product
+
+
+def chunk(**columns):
+    return pd.DataFrame(columns, dtype=object)
+
+
+def test_max_lengths_come_from_the_products_table():
+    assert MAX_LENGTHS == {
+        'sku': Product.__table__.c.sku.type.length,
+        'name': Product.__table__.c.name.type.length,
+    }
+
+
+def test_valid_rows_pass_and_column_names_are_normalized():
+    df = pd.DataFrame({' SKU ': ['A1', 'B1'], 'Name': ['a', 'b'], 'PRICE': ['1.5', '']}, dtype=object)
+
+    valid, rejected = validate_chunk(df)
+
+    assert list(valid.columns) == ['sku', 'name', 'price']
+    assert valid['sku'].tolist() == ['A1', 'B1']
+    assert rejected.empty
+
+
+def test_required_sku_and_name():
+    df = chunk(sku=['A1', None, '  ', 'D1'], name=['a', 'b', 'c', ''])
+
+    valid, rejected = validate_chunk(df)
+
+    assert valid['sku'].tolist() == ['A1']
+    assert rejected[ERROR_COLUMN].tolist() == ['sku is required', 'sku is required', 'name is required']
+
+
+def test_missing_column_rejects_every_row():
+    valid, rejected = validate_chunk(chunk(sku=['A1', 'B1']))
+
+    assert valid.empty
+    assert rejected[ERROR_COLUMN].tolist() == ['name is required'] * 2
+
+
+def test_values_longer_than_the_column():
+    sku_max, name_max = MAX_LENGTHS['sku'], MAX_LENGTHS['name']
+    df = chunk(sku=['s' * sku_max, 's' * (sku_max + 1)], name=['n' * (name_max + 1), 'n'])
+
+    valid, rejected = validate_chunk(df)
+
+    assert valid.empty
+    assert rejected[ERROR_COLUMN].tolist() == [
+        f'name is longer than {name_max} characters',
+        f'sku is longer than {sku_max} characters',
+    ]
+
+
+def test_non_numeric_price():
+    df = chunk(sku=['A1', 'B1', 'C1', 'D1'], name=['a'] * 4, price=['12.5', ' 3 ', '12,99', 'abc'])
+
+    valid, rejected = validate_chunk(df)
+
+    assert valid['sku'].tolist() == ['A1', 'B1']
+    assert rejected[ERROR_COLUMN].tolist() == ['price is not a number'] * 2
+    # Raw values are kept so the report can be fixed and uploaded again
+    assert rejected['price'].tolist() == ['12,99', 'abc']
+
+
+def test_typed_numeric_price_passes_as_is():
+    df = pd.DataFrame({'sku': ['A1', 'B1'], 'name': ['a', 'b'], 'price': [1.5, float('nan')]})
+
+    valid, rejected = validate_chunk(df)
+
+    assert len(valid) == 2
+    assert rejected.empty
+
+
+def test_every_failed_check_is_reported():
+    df = chunk(sku=[''], name=[None], price=['x'])
+
+    _, rejected = validate_chunk(df)
+
+    assert rejected[ERROR_COLUMN].tolist() == ['sku is required; name is required; price is not a number']
+
+
+def rejected_block(*skus):
+    return chunk(sku=list(skus), name=['n'] * len(skus), error=['name is required'] * len(skus))
+
+
+def read_report(path):
+    return pd.read_csv(path, dtype=str, keep_default_na=False)
+
+
+def test_report_has_one_header_and_fixed_columns(tmp_path):
+    path = tmp_path / 'rejected' / 'task.csv'
+    rejects = RejectedRowsFile(str(path), 0, ['SKU', 'Name', 'Description', 'Price'])
+
+    rejects.append(rejected_block('A1'))
+    rejects.append(chunk(sku=['B1'], price=['abc'], error=['price is not a number']))
+    rejects.append(rejected_block().iloc[0:0])
+
+    assert rejects.size == path.stat().st_size
+    report = read_report(path)
+    assert list(report.columns) == ['sku', 'name', 'description', 'price', 'error']
+    assert report['sku'].tolist() == ['A1', 'B1']
+    assert report['price'].tolist() == ['', 'abc']
+
+
+def test_resumed_run_truncates_to_the_committed_size(tmp_path):
+    path = tmp_path / 'task.csv'
+    first = RejectedRowsFile(str(path), 0, ['sku', 'name'])
+    first.append(rejected_block('A1'))
+    committed = first.size
+    # Written by the crashed attempt, never committed
+    first.append(rejected_block('B1'))
+
+    resumed = RejectedRowsFile(str(path), committed, ['sku', 'name'])
+
+    assert path.stat().st_size == committed == resumed.size
+    resumed.append(rejected_block('B1', 'C1'))
+    assert read_report(path)['sku'].tolist() == ['A1', 'B1', 'C1']
+
+
+@pytest.mark.parametrize('committed_size', [0, None])
+def test_nothing_committed_starts_a_new_report(tmp_path, committed_size):
+    path = tmp_path / 'task.csv'
+    path.write_bytes(b'sku,name,error\nX1,n,stale\n')
+
+    rejects = RejectedRowsFile(str(path), committed_size, ['sku', 'name'])
+    rejects.append(rejected_block('A1'))
+
+    assert read_report(path)['sku'].tolist() == ['A1']